@@ -1,23 +1,22 @@
 from typing import List
 from crewai import Agent
-from langchain_openai import ChatOpenAI
-from crewai_tools import SerperDevTool
+from tools.search_tools import SearchTools
 from tools.youtube_search_tools import YoutubeVideoSearchTool
+from llm_registry import get_llm, get_tool
 import global_config  # 导入全局配置
 
 class CompanyResearchAgents():
 
     def __init__(self):
-        self.searchInternetTool = SerperDevTool()
-        self.youtubeSearchTool = YoutubeVideoSearchTool()
-        self.llm = ChatOpenAI(model="gpt-4-turbo-preview")
+        self.searchInternetTool = SearchTools.search_internet
+        self.youtubeSearchTool = get_tool(YoutubeVideoSearchTool)
 
     def research_manager(self, companies: List[str], positions: List[str]) -> Agent:
         return Agent(
             role=global_config.research_manager_role,
             goal=f"{global_config.research_manager_goal}\n\nCompanies: {companies}\nPositions: {positions}",
             backstory=global_config.research_manager_backstory,
-            llm=self.llm,
+            llm=get_llm("gpt-4-turbo-preview"),
             tools=[self.searchInternetTool, self.youtubeSearchTool],
             verbose=True,
             allow_delegation=True
@@ -29,29 +28,28 @@ class CompanyResearchAgents():
             goal=global_config.research_agent_goal,
             backstory=global_config.research_agent_backstory,
             tools=[self.searchInternetTool, self.youtubeSearchTool],
-            llm=self.llm,
+            llm=get_llm("gpt-4-turbo-preview"),
             verbose=True
         )
 from typing import List
 from crewai import Agent
-from langchain_openai import ChatOpenAI
-from crewai_tools import SerperDevTool
+from tools.search_tools import SearchTools
 from tools.youtube_search_tools import YoutubeVideoSearchTool
+from llm_registry import get_llm, get_tool
 import global_config  # 导入全局配置
 
 class CompanyResearchAgents():
 
     def __init__(self):
-        self.searchInternetTool = SerperDevTool()
-        self.youtubeSearchTool = YoutubeVideoSearchTool()
-        self.llm = ChatOpenAI(model="gpt-4-turbo-preview")
+        self.searchInternetTool = SearchTools.search_internet
+        self.youtubeSearchTool = get_tool(YoutubeVideoSearchTool)
 
     def research_manager(self, companies: List[str], positions: List[str]) -> Agent:
         return Agent(
             role=global_config.research_manager_role,
             goal=f"{global_config.research_manager_goal}\n\nCompanies: {companies}\nPositions: {positions}",
             backstory=global_config.research_manager_backstory,
-            llm=self.llm,
+            llm=get_llm("gpt-4-turbo-preview"),
             tools=[self.searchInternetTool, self.youtubeSearchTool],
             verbose=True,
             allow_delegation=True
@@ -63,6 +61,6 @@ class CompanyResearchAgents():
             goal=global_config.research_agent_goal,
             backstory=global_config.research_agent_backstory,
             tools=[self.searchInternetTool, self.youtubeSearchTool],
-            llm=self.llm,
+            llm=get_llm("gpt-4-turbo-preview"),
             verbose=True
         )
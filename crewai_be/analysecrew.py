@@ -8,7 +8,8 @@ from macroeconomic_tasks import MacroEconomicTasks
 from trip_agents import TripAgents
 from trip_tasks import TripTasks
 from job_manager import append_event
-from langchain_openai import ChatOpenAI
+import usage
+from model_router import model_router
 from dotenv import load_dotenv
 load_dotenv()
 class CompanyCrew:
@@ -17,7 +18,6 @@ class CompanyCrew:
     def __init__(self, job_id: str):
         self.job_id = job_id
         self.crew = None
-        self.llm = ChatOpenAI(model="gpt-4-turbo-preview")
 
     def setup_crew(self, company_name: str):
         agents = CompanyAnalysisAgents()
@@ -40,6 +40,11 @@ class CompanyCrew:
             tasks=[collect_company_task, analyze_task],
             verbose=True
         )
+        model_router.apply(type(self).__name__, [
+            ("collect_company_information_task", collect_company_task),
+            ("analyze_task", analyze_task),
+        ])
+        usage.attach(self.job_id, type(self).__name__, self.crew)
 
     def kickoff(self):
         if not self.crew:
@@ -61,7 +66,6 @@ class IndustryCrew:
     def __init__(self, job_id: str):
         self.job_id = job_id
         self.crew = None
-        self.llm = ChatOpenAI(model="gpt-4-turbo-preview")
 
     def setup_crew(self, industry_name: str):
         agents = IndustryAnalysisAgents()
@@ -84,6 +88,11 @@ class IndustryCrew:
             tasks=[collect_industry_task, analyze_task],
             verbose=True
         )
+        model_router.apply(type(self).__name__, [
+            ("collect_industry_information_task", collect_industry_task),
+            ("analyze_industry_task", analyze_task),
+        ])
+        usage.attach(self.job_id, type(self).__name__, self.crew)
 
     def kickoff(self):
         if not self.crew:
@@ -105,7 +114,6 @@ class MacroeconomicCrew:
     def __init__(self, job_id: str):
         self.job_id = job_id
         self.crew = None
-        self.llm = ChatOpenAI(model="gpt-4-turbo-preview")
 
     def setup_crew(self, country: str):
         agents = MacroeconomicAnalysisAgents()
@@ -128,6 +136,11 @@ class MacroeconomicCrew:
             tasks=[collect_macroeconomic_task, analyze_task],
             verbose=True
         )
+        model_router.apply(type(self).__name__, [
+            ("collect_macroeconomic_task", collect_macroeconomic_task),
+            ("analyze_task", analyze_task),
+        ])
+        usage.attach(self.job_id, type(self).__name__, self.crew)
 
     def kickoff(self):
         if not self.crew:
@@ -147,7 +160,6 @@ class TripPlannerCrew:
     def __init__(self, job_id: str):
         self.job_id = job_id
         self.crew = None
-        self.llm = ChatOpenAI(model="gpt-4-turbo-preview")
 
     def setup_crew(self, location:str,travelto:str,date:str,hobby:str):
         agents = TripAgents()
@@ -169,6 +181,12 @@ class TripPlannerCrew:
       tasks=[identify_task, gather_task, plan_task],
       verbose=True
     )
+        model_router.apply(type(self).__name__, [
+            ("identify_task", identify_task),
+            ("gather_task", gather_task),
+            ("plan_task", plan_task),
+        ])
+        usage.attach(self.job_id, type(self).__name__, self.crew)
 
 
     def kickoff(self):
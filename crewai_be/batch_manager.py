@@ -0,0 +1,128 @@
+import os
+import time
+from collections import Counter, deque
+from threading import Lock, Timer
+from typing import Callable, Dict, List
+
+from job_manager import finish_job, on_finish
+from scheduler import QueueFullError
+from utils.cache import TTLCache
+from utils.logging import logger
+
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+# 批次信息在内存中保留的时间（秒），子任务本身由 job_manager/job_archive 管理
+BATCH_TTL_SECONDS = int(os.getenv("BATCH_TTL_SECONDS", "86400"))
+
+
+class Batch:
+    """A list of analysis inputs run as child jobs, at most `max_parallel` at a time."""
+
+    def __init__(self, batch_id: str, inputs: List[str], job_ids: List[str], max_parallel: int,
+                 start_child: Callable[[str, str], None]):
+        self.batch_id = batch_id
+        self.inputs = inputs
+        self.job_ids = job_ids
+        self.max_parallel = max_parallel
+        self.start_child = start_child
+        self.created_at = time.time()
+        self.lock = Lock()
+        self.pending = deque(range(len(inputs)))
+        self.started = set()
+        self.running = 0
+        self.finished = 0
+        self.pumping = False
+        self.retry_timer = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished == len(self.inputs)
+
+
+class BatchManager:
+    """Fans batch items out to child jobs and starts the next item whenever one finishes."""
+
+    def __init__(self):
+        self._batches = TTLCache(maxsize=10000, ttl=BATCH_TTL_SECONDS)
+        self._children: Dict[str, Batch] = {}
+        self._lock = Lock()
+
+    def submit(self, batch: Batch) -> Batch:
+        self._batches.set(batch.batch_id, batch)
+        with self._lock:
+            for job_id in batch.job_ids:
+                self._children[job_id] = batch
+        self._pump(batch)
+        return batch
+
+    def get(self, batch_id: str):
+        return self._batches.get(batch_id)
+
+    def _pump(self, batch: Batch):
+        with batch.lock:
+            # 已有线程在派发（例如缓存命中的子任务在 start_child 内同步结束并回调到这里），
+            # 由它的循环继续；退出判断和清除 pumping 在同一把锁内完成，不会漏掉唤醒
+            if batch.pumping:
+                return
+            batch.pumping = True
+        while True:
+            with batch.lock:
+                if batch.running >= batch.max_parallel or not batch.pending:
+                    batch.pumping = False
+                    return
+                index = batch.pending.popleft()
+                batch.running += 1
+                batch.started.add(index)
+            try:
+                batch.start_child(batch.job_ids[index], batch.inputs[index])
+            except QueueFullError as e:
+                with batch.lock:
+                    batch.pending.appendleft(index)
+                    batch.started.discard(index)
+                    batch.running -= 1
+                    batch.pumping = False
+                    self._retry_later(batch, e.retry_after)
+                return
+            except Exception as e:
+                logger.error(f"Failed to start batch {batch.batch_id} item {index}: {e}")
+                # 子任务以 ERROR 结束，计数和派发下一项交给 _on_finish
+                finish_job(batch.job_ids[index], 'ERROR', f"Failed to start: {e}")
+
+    def _retry_later(self, batch: Batch, delay: float):
+        if batch.retry_timer is not None and batch.retry_timer.is_alive():
+            return
+        batch.retry_timer = Timer(delay, self._pump, args=(batch,))
+        batch.retry_timer.daemon = True
+        batch.retry_timer.start()
+
+    def _on_finish(self, job_id: str, *_):
+        with self._lock:
+            batch = self._children.pop(job_id, None)
+        if batch is None:
+            return
+        with batch.lock:
+            batch.running -= 1
+            batch.finished += 1
+        if batch.done:
+            logger.info("Batch %s complete", batch.batch_id)
+        else:
+            self._pump(batch)
+
+    def progress(self, batch: Batch, statuses: List[str]) -> dict:
+        """Aggregate progress given the current status of every child job (None if not started)."""
+        counts = Counter('PENDING' if status is None else status for status in statuses)
+        total = len(batch.inputs)
+        return {
+            "batch_id": batch.batch_id,
+            "status": 'COMPLETE' if batch.done else 'RUNNING',
+            "total": total,
+            "finished": batch.finished,
+            "running": batch.running,
+            "progress": batch.finished / total if total else 1.0,
+            "counts": dict(counts),
+            "max_parallel": batch.max_parallel,
+        }
+
+
+batch_manager = BatchManager()
+on_finish(batch_manager._on_finish)
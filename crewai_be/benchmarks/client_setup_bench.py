@@ -0,0 +1,98 @@
+"""Per-job setup time and first-call latency: fresh clients per job vs llm_registry.
+
+Points the OpenAI client at a local stub server so only client construction and
+connection setup are measured.
+
+Run from crewai_be/:  python -m benchmarks.client_setup_bench --jobs 20
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+COMPLETION = json.dumps({
+    "id": "bench", "object": "chat.completion", "created": 0, "model": "bench",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": "ok"}}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 头和正文分两次写出，不关 Nagle 的话长连接上每次响应都会多等一个延迟 ACK
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('content-length', 0)))
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(COMPLETION)))
+        self.end_headers()
+        self.wfile.write(COMPLETION)
+
+    def log_message(self, *args):
+        pass
+
+
+def fresh_setup():
+    from crewai_tools import SerperDevTool
+    from langchain_openai import ChatOpenAI
+
+    from tools.youtube_search_tools import YoutubeVideoSearchTool
+    # 改造前每个任务的做法：crew 和 agents 各建一个 ChatOpenAI，工具也重新创建
+    ChatOpenAI(model="gpt-4-turbo-preview")
+    llm = ChatOpenAI(model="gpt-4-turbo-preview")
+    SerperDevTool()
+    YoutubeVideoSearchTool()
+    return llm
+
+
+def pooled_setup():
+    import llm_cache
+    from llm_registry import get_llm, get_tool
+    from tools.youtube_search_tools import YoutubeVideoSearchTool
+    # 每次都发同一个 prompt，走 LLM 缓存的话除第一次外测到的都是缓存命中
+    with llm_cache.bypass():
+        llm = get_llm("gpt-4-turbo-preview")
+    # 搜索工具现在是模块级的 SearchTools.search_internet，不再每次创建
+    get_tool(YoutubeVideoSearchTool)
+    return llm
+
+
+def measure(setup, jobs: int) -> dict:
+    setups, first_calls = [], []
+    for _ in range(jobs):
+        started = time.perf_counter()
+        llm = setup()
+        setups.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        llm.invoke("ping")
+        first_calls.append(time.perf_counter() - started)
+    return {"setup_ms": statistics.median(setups) * 1000,
+            "first_call_ms": statistics.median(first_calls) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=20)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_API_BASE"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("SERPER_API_KEY", "bench")
+    # 先各跑一次，把导入和首次构建的开销排除在外
+    fresh_setup()
+    pooled_setup().invoke("warmup")
+    for name, setup in (("fresh", fresh_setup), ("pooled", pooled_setup)):
+        result = measure(setup, args.jobs)
+        print(f"{name:6} setup {result['setup_ms']:7.2f} ms   first call {result['first_call_ms']:7.2f} ms")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Throughput and peak memory of HTML-to-text extraction: tools.html_text fast path vs partition_html.
+
+Runs both extractors on the saved pages in --fixtures (*.html; the committed
+benchmarks/fixtures has a news article, a company page, a Chinese finance
+article and an inline-XBRL 10-K excerpt) and on synthetic filing-like pages
+of 500 KB and 5 MB, and prints how the fast path compares with
+partition_html on each page. Peak memory is how far the RSS of a fresh
+worker process rises above its level before extraction, so lxml's native
+allocations are included (Linux only).
+
+partition_html needs NLTK tokenizer data; without it (e.g. offline) the
+comparison reports the missing resource instead of numbers.
+
+Run from crewai_be/:  python -m benchmarks.html_extract_bench --fixtures benchmarks/fixtures
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import re
+import time
+
+EXTRACTORS = ("fast", "partition_html")
+
+
+def synthetic_page(target_bytes: int) -> str:
+    head = ("<html><head><title>Form 10-K</title><style>body{font:12px serif}</style>"
+            "<script>window.dataLayer=[];</script></head><body>"
+            "<nav><ul>" + "".join(f"<li><a href='/s{i}'>Section {i}</a></li>" for i in range(30)) + "</ul></nav>"
+            "<header><h1>ACME Corp</h1></header><main>")
+    parts = [head]
+    size = len(head)
+    i = 0
+    while size < target_bytes:
+        block = (f"<h2>Item {i}. Management's Discussion</h2>"
+                 f"<p>Revenue for fiscal {2000 + i % 24} increased <b>{i % 17}%</b> compared with the prior year, "
+                 "driven by growth in <i>cloud services</i> and higher licensing income. Operating margin "
+                 "improved as cost of revenue declined relative to sales.</p>"
+                 "<table><tr><th>Segment</th><th>Revenue</th><th>Operating income</th></tr>"
+                 + "".join(f"<tr><td>Segment {j}</td><td>{(i + 1) * (j + 3)}.4</td><td>{j + i % 5}.1</td></tr>"
+                           for j in range(6))
+                 + "</table><div class='note'><span>Note:</span> amounts in millions of dollars.</div>")
+        parts.append(block)
+        size += len(block)
+        i += 1
+    parts.append("</main><footer>Copyright ACME Corp</footer></body></html>")
+    return "".join(parts)
+
+
+def load_pages(fixtures: str, synthetic: bool) -> dict:
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(fixtures, "*.html"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages[os.path.basename(path)] = f.read()
+    if synthetic or not pages:
+        for size in (500_000, 5_000_000):
+            pages[f"synthetic-{size // 1000}k"] = synthetic_page(size)
+    return pages
+
+
+def _error(e: Exception) -> str:
+    # NLTK 的 LookupError 消息有十几行，只保留缺少的资源名
+    missing = re.search(r"Resource \W*(\w+)\W* not found", str(e))
+    if isinstance(e, LookupError) and missing:
+        return f"NLTK resource {missing.group(1)} missing (python -m nltk.downloader {missing.group(1)})"
+    return type(e).__name__
+
+
+def _extractor(name: str):
+    from tools import html_text
+    return html_text.fast_extract if name == "fast" else html_text.partition_text
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _peak_memory(name: str, html: str, result):
+    try:
+        extract = _extractor(name)
+        extract("<p>warm up</p>")
+        # 重置 VmHWM，只统计提取期间的峰值（导入时的峰值往往更高）
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        before = _status_kb("VmRSS")
+        extract(html)
+    except Exception as e:
+        result.put((None, _error(e)))
+        return
+    result.put(((_status_kb("VmHWM") - before) / 1024, None))
+
+
+def peak_memory_mb(name: str, html: str):
+    ctx = multiprocessing.get_context("spawn")
+    result = ctx.Queue()
+    worker = ctx.Process(target=_peak_memory, args=(name, html, result))
+    worker.start()
+    worker.join()
+    if result.empty():
+        return None, f"worker exited with {worker.exitcode}"
+    return result.get()
+
+
+def throughput(name: str, html: str, repeats: int):
+    extract = _extractor(name)
+    try:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            text = extract(html)
+        seconds = (time.perf_counter() - started) / repeats
+    except Exception as e:
+        return None, None, None, _error(e)
+    return seconds, len(html) / seconds / 1e6, len(text), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(__file__), "fixtures"))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-synthetic", action="store_true", help="only run the saved fixtures")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    import unstructured.partition.html  # noqa: F401
+    print(f"import unstructured.partition.html: {time.perf_counter() - started:.2f}s")
+
+    print(f"{'page':<22}{'extractor':<16}{'KB':>8}{'ms':>10}{'MB/s':>8}{'chars':>10}{'peak MB':>9}")
+    for page, html in load_pages(args.fixtures, not args.no_synthetic).items():
+        measured = {}
+        for name in EXTRACTORS:
+            seconds, rate, chars, error = throughput(name, html, args.repeats)
+            peak, peak_error = peak_memory_mb(name, html)
+            if error or peak_error:
+                print(f"{page:<22}{name:<16}{len(html) // 1024:>8}  failed: {error or peak_error}")
+                continue
+            measured[name] = (seconds, chars, peak)
+            print(f"{page:<22}{name:<16}{len(html) // 1024:>8}{seconds * 1000:>10.1f}{rate:>8.2f}"
+                  f"{chars:>10}{peak:>9.1f}")
+        if len(measured) == len(EXTRACTORS):
+            (fast_s, fast_chars, fast_peak), (slow_s, slow_chars, slow_peak) = (measured[n] for n in EXTRACTORS)
+            print(f"{'':<22}fast vs partition_html: {slow_s / fast_s:.1f}x faster, "
+                  f"peak {fast_peak:.1f} vs {slow_peak:.1f} MB, {fast_chars / max(slow_chars, 1):.0%} of the text")
+        else:
+            print(f"{'':<22}no comparison: not every extractor ran on this page")
+
+
+if __name__ == "__main__":
+    main()
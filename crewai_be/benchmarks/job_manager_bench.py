@@ -0,0 +1,73 @@
+"""Append/poll throughput of job_manager with many concurrent jobs.
+
+Run from crewai_be/:  python -m benchmarks.job_manager_bench --jobs 200 --seconds 5
+"""
+import argparse
+import logging
+import time
+from threading import Thread
+
+import job_manager
+
+
+def run(num_jobs: int, writers: int, pollers: int, seconds: float, payload: int) -> dict:
+    job_ids = [f"bench-{i}" for i in range(num_jobs)]
+    for job_id in job_ids:
+        job_manager.create_job(job_id, status='STARTED')
+    data = "x" * payload
+    appends = [0] * writers
+    polls = [0] * pollers
+
+    def writer(n):
+        mine = job_ids[n::writers]
+        i = 0
+        while time.monotonic() < deadline:
+            job_manager.append_event(mine[i % len(mine)], data)
+            appends[n] += 1
+            i += 1
+
+    def poller(n):
+        cursors = dict.fromkeys(job_ids, -1)
+        i = n
+        while time.monotonic() < deadline:
+            job_id = job_ids[i % num_jobs]
+            snapshot = job_manager.get_snapshot(job_id, cursors[job_id])
+            if snapshot.events:
+                cursors[job_id] = snapshot.events[-1].seq
+            polls[n] += 1
+            i += 1
+
+    threads = [Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [Thread(target=poller, args=(n,)) for n in range(pollers)]
+    # 每个线程自己判断截止时间，避免主线程在锁竞争下抢不到 GIL
+    deadline = time.monotonic() + seconds
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for job_id in job_ids:
+        job_manager.discard_job(job_id)
+    return {
+        "appends_per_sec": sum(appends) / seconds,
+        "polls_per_sec": sum(polls) / seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--pollers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--payload", type=int, default=2000)
+    args = parser.parse_args()
+    # append_event 每次都会记日志，基准测试时关掉以免测成日志吞吐
+    logging.disable(logging.INFO)
+    result = run(args.jobs, args.writers, args.pollers, args.seconds, args.payload)
+    print(f"jobs={args.jobs} writers={args.writers} pollers={args.pollers} payload={args.payload}B")
+    print(f"append: {result['appends_per_sec']:,.0f} ops/s")
+    print(f"poll:   {result['polls_per_sec']:,.0f} ops/s")
+
+
+if __name__ == '__main__':
+    main()
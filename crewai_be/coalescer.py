@@ -0,0 +1,68 @@
+import hashlib
+import json
+from threading import Lock
+from typing import Dict, Optional
+
+import global_config
+from job_manager import attach_follower, create_job, on_finish
+
+# 每种分析意图所依赖的 global_config 提示词，提示词变化后不再合并到旧任务
+INTENT_PROMPTS = {
+    'company': ('company_analyse_searchTask', 'company_analyse_analyseTask'),
+    'industry': ('industry_analyse_searchTask', 'industry_analyse_analyseTask'),
+    'macroeconomic': ('macroeconomy_analyse_searchTask', 'macroeconomy_analyse_analyseTask'),
+}
+
+
+def normalize_input(text: str) -> str:
+    return ' '.join(str(text).split()).casefold()
+
+
+def config_version(intent: str) -> str:
+    """Short hash of the prompts the crew for `intent` is built from."""
+    prompts = [getattr(global_config, name) for name in INTENT_PROMPTS.get(intent, ())]
+    return hashlib.sha256(json.dumps(prompts).encode('utf-8')).hexdigest()[:16]
+
+
+def analysis_key(intent: str, subject: str) -> str:
+    payload = json.dumps([intent, normalize_input(subject), config_version(intent)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Coalescer:
+    """Singleflight for crew jobs: identical submissions share one running job."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._inflight: Dict[str, str] = {}
+        self._keys: Dict[str, str] = {}
+
+    def join(self, key: str, job_id: str) -> Optional[str]:
+        """Attach `job_id` to the in-flight job for `key` and return the leader's id.
+
+        Returns None when there is nothing to join; `job_id` then becomes the
+        leader, its job is created in QUEUED state and the caller must start it.
+        """
+        with self._lock:
+            leader_id = self._inflight.get(key)
+            if leader_id is not None and attach_follower(leader_id, job_id):
+                return leader_id
+            # 先建好 leader 的任务再登记，之后加入的 follower 一定能挂到它上面
+            create_job(job_id)
+            self._inflight[key] = job_id
+            self._keys[job_id] = key
+            return None
+
+    def abandon(self, job_id: str):
+        """Forget a leader that was never started, e.g. because the queue was full."""
+        self._release(job_id)
+
+    def _release(self, job_id: str, *_):
+        with self._lock:
+            key = self._keys.pop(job_id, None)
+            if key is not None and self._inflight.get(key) == job_id:
+                del self._inflight[key]
+
+
+coalescer = Coalescer()
+on_finish(coalescer._release)
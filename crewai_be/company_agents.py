@@ -3,6 +3,7 @@ from crewai_tools import FileReadTool
 from tools.browser_tools import BrowserTools
 from tools.search_tools import SearchTools
 from crewai import Agent
+from llm_registry import get_llm
 from tools.search_one_website import SearchWebsiteTools
 class CompanyAnalysisAgents:
 
@@ -15,8 +16,9 @@ class CompanyAnalysisAgents:
             tools=[
                 BrowserTools.scrape_and_summarize_website,
                 SearchTools.search_internet,
-                #SearchWebsiteTools.search_authoritative_websites
+                SearchWebsiteTools.search_authoritative_websites
             ],
+            llm=get_llm(),
             verbose=True
         )
 
@@ -28,7 +30,8 @@ class CompanyAnalysisAgents:
             tools=[
                 BrowserTools.scrape_and_summarize_website,
                 SearchTools.search_internet,
-                #SearchWebsiteTools.search_authoritative_websites
+                SearchWebsiteTools.search_authoritative_websites
             ],
+            llm=get_llm(),
             verbose=True
         )
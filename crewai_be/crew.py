@@ -1,8 +1,9 @@
 from datetime import datetime
 from typing import Callable
-from langchain_openai import ChatOpenAI
 from agents import CompanyResearchAgents
 from job_manager import append_event
+import usage
+from model_router import model_router
 from tasks import CompanyResearchTasks
 from crewai import Crew
 
@@ -11,7 +12,6 @@ class CompanyResearchCrew:
     def __init__(self, job_id: str):
         self.job_id = job_id
         self.crew = None
-        self.llm = ChatOpenAI(model="gpt-4-turbo-preview")
 
     def setup_crew(self, companies: list[str], positions: list[str]):
         agents = CompanyResearchAgents()
@@ -35,6 +35,11 @@ class CompanyResearchCrew:
             tasks=[*company_research_tasks, manage_research_task],
             verbose=2,
         )
+        model_router.apply(type(self).__name__, [
+            *(("company_research", task) for task in company_research_tasks),
+            ("manage_research", manage_research_task),
+        ])
+        usage.attach(self.job_id, type(self).__name__, self.crew)
 
     def kickoff(self):
         if not self.crew:
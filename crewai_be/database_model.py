@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 
+
 class Job(db.Model):
     __tablename__ = 'jobs'
     id = db.Column(db.Integer, primary_key=True)
@@ -8,6 +9,11 @@ class Job(db.Model):
     status = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    # /api/jobs 按 (created_at, id) 做游标分页，可再按 status 过滤
+    __table_args__ = (
+        db.Index('ix_jobs_created_at_id', 'created_at', 'id'),
+        db.Index('ix_jobs_status_created_at_id', 'status', 'created_at', 'id'),
+    )
 
 class JobResult(db.Model):
     __tablename__ = 'job_results'
@@ -16,6 +22,24 @@ class JobResult(db.Model):
     result = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+class JobEvent(db.Model):
+    __tablename__ = 'job_events'
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(36), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    data = db.Column(db.Text)
+    __table_args__ = (db.UniqueConstraint('job_id', 'seq', name='_job_event_seq_uc'),)
+
+class CachedResult(db.Model):
+    __tablename__ = 'result_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), unique=True, nullable=False)
+    intent = db.Column(db.String(20), nullable=False)
+    result = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
 class Agent(db.Model):
     __tablename__ = 'agents'
     id = db.Column(db.Integer, primary_key=True)
@@ -52,4 +76,16 @@ class CrewAgent(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     crew_id = db.Column(db.Integer, db.ForeignKey('crews.id'), nullable=False)
     agent_id = db.Column(db.Integer, db.ForeignKey('agents.id'), nullable=False)
-    __table_args__ = (db.UniqueConstraint('crew_id', 'agent_id', name='_crew_agent_uc'),)
\ No newline at end of file
+    __table_args__ = (db.UniqueConstraint('crew_id', 'agent_id', name='_crew_agent_uc'),)
+
+
+def ensure_schema():
+    """Create missing tables and indexes; safe to run on every start against an existing database.
+
+    create_all() skips tables that already exist, so indexes added to existing
+    tables later are created here one by one.
+    """
+    db.create_all()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
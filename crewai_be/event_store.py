@@ -0,0 +1,40 @@
+from typing import List
+
+from database_model import JobEvent
+from job_manager import Event
+from persistence import persistence_writer
+from utils.logging import logger
+
+
+class EventStore:
+    """Reads job events that no longer fit in the in-memory ring buffer from the job_events table.
+
+    The events themselves are written by persistence_writer when job_manager spills them.
+    """
+
+    def __init__(self):
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+
+    def load(self, job_id: str, after_seq: int, before_seq: int) -> List[Event]:
+        """Stored events with `after_seq < seq < before_seq`, in order."""
+        if self._app is None:
+            return []
+        # 刚转存的事件可能还在写入队列里
+        persistence_writer.flush()
+        try:
+            with self._app.app_context():
+                rows = JobEvent.query.filter(
+                    JobEvent.job_id == job_id,
+                    JobEvent.seq > after_seq,
+                    JobEvent.seq < before_seq,
+                ).order_by(JobEvent.seq).all()
+                return [Event(timestamp=row.timestamp, data=row.data, seq=row.seq) for row in rows]
+        except Exception as e:
+            logger.error(f"Failed to load spilled events for job {job_id}: {e}")
+            return []
+
+
+event_store = EventStore()
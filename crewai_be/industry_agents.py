@@ -1,4 +1,5 @@
 from crewai import Agent
+from llm_registry import get_llm
 from langchain_community.llms import OpenAI
 
 from tools.browser_tools import BrowserTools
@@ -20,6 +21,7 @@ class IndustryAnalysisAgents:
                 BrowserTools.scrape_and_summarize_website,
                 SearchTools.search_internet,
             ],    #如果要加入设置权威网站地址，可以这里加入tool1,tool2。
+            llm=get_llm(),
             verbose=True
         )
 
@@ -32,6 +34,7 @@ class IndustryAnalysisAgents:
                 BrowserTools.scrape_and_summarize_website,
                 SearchTools.search_internet,
             ],
+            llm=get_llm(),
             verbose=True
         )
 
@@ -0,0 +1,113 @@
+import json
+import multiprocessing
+import os
+import time
+from threading import Thread
+from typing import Optional
+
+from database_model import Job, JobEvent, JobResult, db
+from job_manager import Event, JobSnapshot, evict, select_evictable
+from persistence import persistence_writer
+from utils.logging import logger
+
+# 任务结束后在内存中保留的时间（秒）和整个任务表的内存预算
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+JOB_MEMORY_BUDGET = int(os.getenv("JOB_MEMORY_BUDGET_MB", "256")) * 1024 * 1024
+JOB_SWEEP_INTERVAL = int(os.getenv("JOB_SWEEP_INTERVAL", "60"))
+
+
+class JobArchive:
+    """Moves finished jobs out of job_manager into the jobs/job_results/job_events tables."""
+
+    def __init__(self, ttl: float, memory_budget: int, interval: float):
+        self.ttl = ttl
+        self.memory_budget = memory_budget
+        self.interval = interval
+        self._app = None
+        self.evicted = 0
+
+    def init_app(self, app):
+        self._app = app
+        # 进程池的子进程里没有需要淘汰的任务
+        if multiprocessing.parent_process() is None:
+            Thread(target=self._run, name="job-archive", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Job archive sweep failed: {e}")
+
+    def sweep(self) -> int:
+        """Persist and evict the jobs job_manager selects; returns how many were evicted."""
+        count = 0
+        evictable = select_evictable(self.ttl, self.memory_budget)
+        if evictable:
+            # 先写完队列里的状态和事件，避免与归档写入冲突
+            persistence_writer.flush()
+        for job_id, finished_at, snapshot in evictable:
+            if self.archive(job_id, snapshot) and evict(job_id, finished_at):
+                count += 1
+        if count:
+            self.evicted += count
+            logger.info("Evicted %d finished jobs from memory", count)
+        return count
+
+    def archive(self, job_id: str, snapshot: JobSnapshot) -> bool:
+        with self._app.app_context():
+            try:
+                job = Job.query.filter_by(job_id=job_id).first()
+                if job is None:
+                    db.session.add(Job(job_id=job_id, status=snapshot.status))
+                    db.session.flush()
+                else:
+                    job.status = snapshot.status
+                if JobResult.query.filter_by(job_id=job_id).first() is None:
+                    # 与 persistence_writer 写入的格式保持一致
+                    db.session.add(JobResult(job_id=job_id, result=json.dumps(snapshot.result)))
+                stored = {seq for (seq,) in db.session.query(JobEvent.seq).filter(
+                    JobEvent.job_id == job_id, JobEvent.seq >= snapshot.first_seq)}
+                db.session.add_all([
+                    JobEvent(job_id=job_id, seq=event.seq, timestamp=event.timestamp, data=event.data)
+                    for event in snapshot.events if event.seq not in stored
+                ])
+                db.session.commit()
+                return True
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to archive job {job_id}: {e}")
+                return False
+
+    def load(self, job_id: str, after_seq: int = -1) -> Optional[JobSnapshot]:
+        """Rebuild a snapshot of an evicted job from the database, or None if it is unknown."""
+        if self._app is None:
+            return None
+        with self._app.app_context():
+            try:
+                job = Job.query.filter_by(job_id=job_id).first()
+                if job is None:
+                    return None
+                job_result = JobResult.query.filter_by(job_id=job_id).first()
+                rows = JobEvent.query.filter(
+                    JobEvent.job_id == job_id, JobEvent.seq > after_seq,
+                ).order_by(JobEvent.seq).all()
+            except Exception as e:
+                logger.error(f"Failed to load archived job {job_id}: {e}")
+                return None
+            result = ''
+            if job_result is not None and job_result.result is not None:
+                try:
+                    result = json.loads(job_result.result)
+                except json.JSONDecodeError:
+                    result = job_result.result
+            events = [Event(timestamp=row.timestamp, data=row.data, seq=row.seq) for row in rows]
+            return JobSnapshot(job.status, result, events, after_seq + 1)
+
+
+job_archive = JobArchive(
+    ttl=JOB_TTL_SECONDS,
+    memory_budget=JOB_MEMORY_BUDGET,
+    interval=JOB_SWEEP_INTERVAL,
+)
@@ -1,35 +1,379 @@
-from dataclasses import dataclass
+import os
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Dict
-from threading import Lock
+from typing import Callable, List, Dict, NamedTuple, Optional, Tuple
+from threading import Condition, Lock
 from utils.logging import logger
 
+# 每个任务在内存中保留的事件条数，更早的事件转存到数据库
+EVENT_BUFFER_SIZE = int(os.getenv("JOB_EVENT_BUFFER_SIZE", "200"))
+
+# jobs_lock 只串行化 jobs/followers 两个字典的写入；查找依赖 CPython 下 dict.get 的原子性，不加锁。
+# 单个任务的状态由它自己的锁保护，加锁顺序固定为先任务锁、后 jobs_lock，leader 的锁先于 follower 的锁。
+# 轮询只读取任务发布的不可变视图 Job.view，不加锁，也就不会与写事件的线程争锁。
 jobs_lock = Lock()
 jobs: Dict[str, "Job"] = {}
+# 合并请求：leader job 的事件和结果会同步给所有 follower job
+followers: Dict[str, List[str]] = {}
+_finish_hooks: List[Callable[[str, str, str], None]] = []
+_spill_hooks: List[Callable[[str, List["Event"]], None]] = []
+_status_hooks: List[Callable[[str, str], None]] = []
+_discard_hooks: List[Callable[[str], None]] = []
+
+# 在子进程中运行时，状态变更会被转发回父进程的 job_manager
+_forwarder = None
+
 
+FINAL_STATUSES = ('COMPLETE', 'ERROR')
 
-@dataclass
+
+@dataclass(slots=True)
 class Event:
     timestamp: datetime
     data: str
+    seq: int = 0
 
 
-@dataclass
-class Job:
+def _event_buffer(events=()) -> List[Event]:
+    return list(events)[-EVENT_BUFFER_SIZE:]
+
+
+class JobView(NamedTuple):
+    """A job's state as pollers read it, replaced on every change so readers never take a lock.
+
+    `events` is only ever appended to while views point at it, so
+    `events[first:end]` stays fixed for the lifetime of the view.
+    """
     status: str
+    result: str
     events: List[Event]
+    first: int
+    end: int
+    next_seq: int
+
+
+@dataclass(slots=True)
+class Job:
+    status: str
+    # 内存中的事件为 events[first:]；超出 EVENT_BUFFER_SIZE 的旧事件转存后由 first 跳过
+    events: List[Event] = field(default_factory=_event_buffer)
+    first: int = 0
+    result: str = ''
+    next_seq: int = 0
+    # 事件和结果占用内存的粗略估计，用于按内存预算淘汰任务
+    size: int = 0
+    finished_at: Optional[float] = None
+    # 任务自己的锁；有新事件或任务结束时唤醒等待中的流式订阅者
+    changed: Condition = field(default_factory=lambda: Condition(Lock()), repr=False, compare=False)
+    # 轮询读取的只读副本，持有 changed 修改状态后调用 publish() 整体替换
+    view: Optional[JobView] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.publish()
+
+    def publish(self):
+        self.view = JobView(self.status, self.result, self.events, self.first, len(self.events), self.next_seq)
+
+
+def _event_size(event: Event) -> int:
+    return len(event.data) + 64
+
+
+class JobSnapshot(NamedTuple):
+    status: str
     result: str
+    events: List[Event]
+    # 内存中最早事件的序号；大于 since + 1 时说明中间的事件已转存到数据库
+    first_seq: int
+
+
+def set_forwarder(forwarder):
+    """Route job updates through `forwarder((name, args))` instead of the local registry."""
+    global _forwarder
+    _forwarder = forwarder
+
+
+def apply_forwarded(message):
+    name, args = message
+    _forwardable[name](*args)
+
+
+def forwardable(name: str, func: Callable):
+    """Make `func` callable from worker processes via `forward(name, ...)`."""
+    _forwardable[name] = func
+
+
+def forward(name: str, *args) -> bool:
+    """In a worker process, hand `name(*args)` to the parent and return True; otherwise return False."""
+    if _forwarder is None:
+        return False
+    _forwarder((name, args))
+    return True
+
+
+def on_finish(hook: Callable[[str, str, str], None]):
+    """Register `hook(job_id, status, result)` to run after a job reaches a final status."""
+    _finish_hooks.append(hook)
+
+
+def on_status(hook: Callable[[str, str], None]):
+    """Register `hook(job_id, status)` to run when a job is created or changes to a non-final status."""
+    _status_hooks.append(hook)
+
+
+def _notify_status(job_ids: List[str], status: str):
+    for job_id in job_ids:
+        for hook in _status_hooks:
+            hook(job_id, status)
+
+
+def on_discard(hook: Callable[[str], None]):
+    """Register `hook(job_id)` to run when a job that was never started is discarded."""
+    _discard_hooks.append(hook)
+
+
+def on_spill(hook: Callable[[str, List[Event]], None]):
+    """Register `hook(job_id, events)` to receive events pushed out of a job's ring buffer."""
+    _spill_hooks.append(hook)
+
+
+def _lookup(job_id: str) -> Optional[Job]:
+    return jobs.get(job_id)
+
+
+def _get_or_create(job_id: str, status: str) -> Job:
+    job = jobs.get(job_id)
+    if job is not None:
+        return job
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is not None:
+            return job
+        logger.info("Job %s started", job_id)
+        job = jobs[job_id] = Job(status=status)
+    _notify_status([job_id], status)
+    return job
+
+
+def _followers_of(job_id: str) -> List[Tuple[str, Job]]:
+    # 调用方持有 leader 的锁，follower 列表只会在持有该锁时被修改
+    if job_id not in followers:
+        return []
+    with jobs_lock:
+        return [(follower_id, jobs[follower_id]) for follower_id in followers.get(job_id, ())
+                if follower_id in jobs]
+
+
+def attach_follower(leader_id: str, job_id: str) -> bool:
+    """Mirror the running job `leader_id` into `job_id`; False if the leader is already done."""
+    leader = _lookup(leader_id)
+    if leader is None:
+        return False
+    with leader.changed:
+        if leader.status in FINAL_STATUSES:
+            return False
+        follower = Job(status=leader.status, events=_event_buffer(leader.events[leader.first:]),
+                       result=leader.result, next_seq=leader.next_seq, size=leader.size)
+        with jobs_lock:
+            jobs[job_id] = follower
+            followers.setdefault(leader_id, []).append(job_id)
+    _notify_status([job_id], follower.status)
+    return True
+
+
+def create_job(job_id: str, status: str = 'QUEUED'):
+    with jobs_lock:
+        jobs[job_id] = Job(status=status)
+    _notify_status([job_id], status)
+
+
+def discard_job(job_id: str, reason: str = "Job was not accepted"):
+    """Forget a job the scheduler refused; jobs already mirroring it fail with `reason`."""
+    job = _lookup(job_id)
+    if job is None:
+        return
+    with job.changed, jobs_lock:
+        jobs.pop(job_id, None)
+        follower_ids = followers.pop(job_id, [])
+    for hook in _discard_hooks:
+        hook(job_id)
+    for follower_id in follower_ids:
+        finish_job(follower_id, 'ERROR', reason)
+
+
+def set_status(job_id: str, status: str):
+    if _forwarder is not None:
+        _forwarder(('set_status', (job_id, status)))
+        return
+    job = _lookup(job_id)
+    if job is None:
+        return
+    with job.changed:
+        job.status = status
+        job.publish()
+        targets = [job_id]
+        for follower_id, follower in _followers_of(job_id):
+            with follower.changed:
+                follower.status = status
+                follower.publish()
+                follower.changed.notify_all()
+            targets.append(follower_id)
+        job.changed.notify_all()
+    _notify_status(targets, status)
+
+
+def _finish(job: Job, job_id: str, status: str, result, spilled: list):
+    job.status = status
+    job.result = result
+    job.size += len(result) if isinstance(result, str) else 0
+    job.finished_at = time.monotonic()
+    if status == 'COMPLETE':
+        _append(job_id, job, "Crew complete", spilled)
+    job.publish()
+    job.changed.notify_all()
+
+
+def finish_job(job_id: str, status: str, result):
+    if _forwarder is not None:
+        _forwarder(('finish_job', (job_id, status, result)))
+        return
+    spilled = []
+    job = _get_or_create(job_id, status)
+    with job.changed:
+        targets = [job_id]
+        _finish(job, job_id, status, result, spilled)
+        for follower_id, follower in _followers_of(job_id):
+            with follower.changed:
+                _finish(follower, follower_id, status, result, spilled)
+            targets.append(follower_id)
+        with jobs_lock:
+            followers.pop(job_id, None)
+    _spill(spilled)
+    for target in targets:
+        for hook in _finish_hooks:
+            hook(target, status, result)
 
 
 def append_event(job_id: str, event_data: str):
+    if _forwarder is not None:
+        _forwarder(('append_event', (job_id, event_data)))
+        return
+    logger.info("Appending event for job %s: %s", job_id, event_data)
+    spilled = []
+    job = _get_or_create(job_id, 'STARTED')
+    with job.changed:
+        _append(job_id, job, event_data, spilled)
+        job.publish()
+        job.changed.notify_all()
+        for follower_id, follower in _followers_of(job_id):
+            with follower.changed:
+                _append(follower_id, follower, event_data, spilled)
+                follower.publish()
+                follower.changed.notify_all()
+    _spill(spilled)
+
+
+def _append(job_id: str, job: Job, event_data: str, spilled: list):
+    if len(job.events) - job.first >= EVENT_BUFFER_SIZE:
+        oldest = job.events[job.first]
+        spilled.append((job_id, oldest))
+        job.size -= _event_size(oldest)
+        job.first += 1
+        # 跳过的旧事件攒够四分之一缓冲区再复制成新列表，旧视图仍引用原列表
+        if job.first >= EVENT_BUFFER_SIZE // 4:
+            job.events = job.events[job.first:]
+            job.first = 0
+    event = Event(timestamp=datetime.now(), data=event_data, seq=job.next_seq)
+    job.events.append(event)
+    job.next_seq += 1
+    job.size += _event_size(event)
+
+
+def _spill(spilled: list):
+    if not spilled:
+        return
+    by_job: Dict[str, List[Event]] = {}
+    for job_id, event in spilled:
+        by_job.setdefault(job_id, []).append(event)
+    for job_id, events in by_job.items():
+        for hook in _spill_hooks:
+            hook(job_id, events)
+
+
+def _snapshot(view: JobView, after_seq: int) -> JobSnapshot:
+    first_seq = view.events[view.first].seq if view.end > view.first else view.next_seq
+    # 序号连续，从尾部只取新事件，增量轮询的开销与新事件数成正比
+    count = max(0, min(view.end - view.first, view.next_seq - max(after_seq + 1, first_seq)))
+    return JobSnapshot(view.status, view.result, view.events[view.end - count:view.end], first_seq)
+
+
+def get_snapshot(job_id: str, after_seq: int = -1) -> Optional[JobSnapshot]:
+    """Status, result and the in-memory events with seq > `after_seq`, or None if unknown."""
+    job = _lookup(job_id)
+    if job is None:
+        return None
+    # 读取 job.view 是一次原子的属性读取，轮询不与写事件的线程争锁
+    return _snapshot(job.view, after_seq)
+
+
+def wait_for_events(job_id: str, after_seq: int, timeout: float) -> Optional[JobSnapshot]:
+    """Like get_snapshot, but first block until `job_id` has events newer than
+    `after_seq` or finishes, or `timeout` passes."""
+    job = _lookup(job_id)
+    if job is None:
+        return None
+    with job.changed:
+        job.changed.wait_for(
+            lambda: job.status in FINAL_STATUSES or job.next_seq > after_seq + 1, timeout=timeout)
+        return _snapshot(job.view, after_seq)
+
+
+def select_evictable(ttl: float, memory_budget: int) -> List[Tuple[str, float, JobSnapshot]]:
+    """Pick finished jobs to drop from memory: those finished more than `ttl`
+    seconds ago, then the oldest finished ones until the registry fits `memory_budget` bytes.
+
+    Returns `(job_id, finished_at, snapshot)` so the caller can persist each job
+    before calling `evict`.
+    """
+    now = time.monotonic()
+    with jobs_lock:
+        registry = list(jobs.items())
+    # size/finished_at 是单次赋值的字段，这里读到的近似值足够用来挑选
+    total = sum(job.size for _, job in registry)
+    finished = sorted((job.finished_at, job_id, job) for job_id, job in registry
+                      if job.finished_at is not None)
+    selected = []
+    for finished_at, job_id, job in finished:
+        if now - finished_at < ttl and total <= memory_budget:
+            break
+        total -= job.size
+        selected.append((job_id, finished_at, _snapshot(job.view, -1)))
+    return selected
+
+
+def evict(job_id: str, finished_at: float) -> bool:
+    """Drop `job_id` from memory unless it changed since it was selected."""
     with jobs_lock:
-        if job_id not in jobs:
-            logger.info("Job %s started", job_id)
-            jobs[job_id] = Job(
-                status='STARTED',
-                events=[],
-                result='')
-        else:
-            logger.info("Appending event for job %s: %s", job_id, event_data)
-        jobs[job_id].events.append(
-            Event(timestamp=datetime.now(), data=event_data))
+        job = jobs.get(job_id)
+        if job is None or job.finished_at != finished_at:
+            return False
+        del jobs[job_id]
+        return True
+
+
+def registry_stats() -> dict:
+    with jobs_lock:
+        registry = list(jobs.values())
+    return {
+        "jobs": len(registry),
+        "finished": sum(1 for job in registry if job.finished_at is not None),
+        "estimated_bytes": sum(job.size for job in registry),
+    }
+
+
+_forwardable = {
+    'set_status': set_status,
+    'finish_job': finish_job,
+    'append_event': append_event,
+}
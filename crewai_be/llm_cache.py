@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from threading import Lock, local
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from typing_extensions import override
+
+from utils.logging import logger
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".cache", "llm_cache.sqlite"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024
+# 每写入这么多条检查一次总大小并淘汰
+EVICT_EVERY = 100
+
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass():
+    """Skip the LLM cache for LLMs built (get_llm) or called inside this block."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def bypassed() -> bool:
+    return _bypass.get()
+
+
+def _normalize(node):
+    # 消息内容去掉首尾空白并统一换行，其余字段按原样参与计算
+    if isinstance(node, dict):
+        return {key: (value.replace('\r\n', '\n').strip() if key == 'content' and isinstance(value, str)
+                      else _normalize(value))
+                for key, value in node.items()}
+    if isinstance(node, list):
+        return [_normalize(item) for item in node]
+    return node
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Hash of the model parameters and the normalized message list."""
+    with suppress(ValueError):
+        prompt = json.dumps(_normalize(json.loads(prompt)), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode('utf-8')).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """Exact-match LLM response cache in a local SQLite file, with TTL and LRU eviction by size."""
+
+    def __init__(self, path: str, ttl: float, max_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = local()
+        self._lock = Lock()
+        self._writes_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.bypasses = 0
+        self._schema_ready = False
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                llm_string TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 连接不能跨线程共享，每个 crew 线程各开一个；文件在第一次用到时才创建
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._lock:
+                if not self._schema_ready:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                if not self._schema_ready:
+                    self._create_schema(conn)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if bypassed():
+            self.bypasses += 1
+            return None
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?",
+                               (key, now - self.ttl)).fetchone()
+            if row is not None:
+                with conn:
+                    conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                generations = [loads(item) for item in json.loads(row[0])]
+        except Exception as e:
+            logger.error(f"LLM cache lookup failed: {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if bypassed():
+            return
+        try:
+            value = json.dumps([dumps(generation) for generation in return_val])
+        except Exception as e:
+            logger.error(f"LLM cache could not serialize response: {e}")
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                             (cache_key(prompt, llm_string), llm_string, value, len(value), now, now))
+        except Exception as e:
+            logger.error(f"LLM cache write failed: {e}")
+            return
+        with self._lock:
+            self.writes += 1
+            self._writes_since_evict += 1
+            if self._writes_since_evict < EVICT_EVERY:
+                return
+            self._writes_since_evict = 0
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used ones until the file fits max_bytes."""
+        try:
+            conn = self._connect()
+            with conn:
+                removed = conn.execute("DELETE FROM llm_cache WHERE created_at < ?",
+                                       (time.time() - self.ttl,)).rowcount
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes
+                    cutoff = conn.execute(
+                        """SELECT accessed_at FROM (
+                               SELECT accessed_at, SUM(size) OVER (ORDER BY accessed_at) AS freed
+                               FROM llm_cache) WHERE freed >= ? LIMIT 1""", (excess,)).fetchone()
+                    if cutoff is not None:
+                        removed += conn.execute("DELETE FROM llm_cache WHERE accessed_at <= ?",
+                                                (cutoff[0],)).rowcount
+        except Exception as e:
+            logger.error(f"LLM cache eviction failed: {e}")
+            return 0
+        self.evictions += removed
+        return removed
+
+    @override
+    def clear(self, **kwargs: Any) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        try:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        except Exception:
+            entries, size = None, None
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "bypasses": self.bypasses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+llm_cache = SQLiteLLMCache(LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES) if LLM_CACHE_ENABLED else None
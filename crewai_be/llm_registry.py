@@ -0,0 +1,125 @@
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import openai
+from langchain_core.callbacks import BaseCallbackManager
+from langchain_core.messages import BaseMessageChunk
+from langchain_openai import ChatOpenAI
+
+from llm_cache import bypassed, llm_cache
+from utils.http import get_httpx_client
+
+# crewai 在 Agent 未指定 llm 时使用的模型
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL_NAME", "gpt-4")
+
+
+class PooledChatOpenAI(ChatOpenAI):
+    """ChatOpenAI whose stream() yields the whole response as a single chunk.
+
+    crewai reads agent output through Runnable.stream() but only uses the
+    final text. The streaming path in langchain skips the LLM cache and
+    reports no token usage, so it is routed through invoke() instead.
+    """
+
+    # crewai 的 Agent 每次校验都会把 callbacks 整个替换成它的 TokenCalcHandler，
+    # 需要一直生效的回调（例如 usage）放在这里
+    extra_callbacks: List[Any] = []
+
+    def generate(self, messages, stop=None, callbacks=None, **kwargs: Any):
+        if self.extra_callbacks:
+            if isinstance(callbacks, BaseCallbackManager):
+                callbacks = callbacks.copy()
+                for handler in self.extra_callbacks:
+                    callbacks.add_handler(handler, inherit=False)
+            else:
+                callbacks = [*(callbacks or []), *self.extra_callbacks]
+        return super().generate(messages, stop=stop, callbacks=callbacks, **kwargs)
+
+    def stream(self, input, config=None, *, stop: Optional[list] = None, **kwargs: Any) -> Iterator[BaseMessageChunk]:
+        yield self.invoke(input, config, stop=stop, **kwargs)
+
+
+class ClientRegistry:
+    """Process-wide LLM clients and stateless tools, built once and shared by every job."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._llms: Dict[Hashable, PooledChatOpenAI] = {}
+        self._tools: Dict[Hashable, object] = {}
+        self._openai = None
+        self.llm_builds = 0
+        self.llm_copies = 0
+        self.tool_builds = 0
+        self.build_seconds = 0.0
+
+    def get_llm(self, model: str = DEFAULT_MODEL, **settings) -> PooledChatOpenAI:
+        """Return a ChatOpenAI for `model` that reuses the pooled OpenAI client.
+
+        crewai's Agent overwrites `llm.callbacks` with its own token counter, so
+        each caller gets a shallow copy; the copy shares the underlying client
+        and its keep-alive connections. Responses go through llm_cache unless
+        the copy is made inside `llm_cache.bypass()`.
+        """
+        key = (model, tuple(sorted(settings.items())))
+        base = self._llms.get(key)
+        if base is None:
+            with self._lock:
+                base = self._llms.get(key)
+                if base is None:
+                    started = time.perf_counter()
+                    base = PooledChatOpenAI(model=model, client=self._openai_client().chat.completions,
+                                            cache=llm_cache, **settings)
+                    self.build_seconds += time.perf_counter() - started
+                    self._llms[key] = base
+                    self.llm_builds += 1
+        self.llm_copies += 1
+        # BaseModel.copy() 会丢掉 exclude=True 的字段（client、callbacks），这里直接复制字段值
+        fields = dict(base.__dict__)
+        if bypassed():
+            fields['cache'] = False
+        return PooledChatOpenAI.construct(_fields_set=set(base.__fields_set__), **fields)
+
+    def _openai_client(self) -> openai.OpenAI:
+        # 与 ChatOpenAI 读取相同的环境变量；调用方需持有 self._lock
+        if self._openai is None:
+            self._openai = openai.OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                organization=os.getenv("OPENAI_ORG_ID") or os.getenv("OPENAI_ORGANIZATION"),
+                base_url=os.getenv("OPENAI_API_BASE"),
+                http_client=get_httpx_client(),
+                # 429 和 Retry-After 由 http 客户端里的 rate_governor 统一重试，SDK 再重试会把等待叠加起来
+                max_retries=0,
+            )
+        return self._openai
+
+    def get_tool(self, tool_cls, *args, **kwargs):
+        """Return the shared instance of a stateless tool class for the given arguments."""
+        key: Tuple = (tool_cls, args, tuple(sorted(kwargs.items())))
+        tool = self._tools.get(key)
+        if tool is None:
+            with self._lock:
+                tool = self._tools.get(key)
+                if tool is None:
+                    started = time.perf_counter()
+                    tool = tool_cls(*args, **kwargs)
+                    self.build_seconds += time.perf_counter() - started
+                    self._tools[key] = tool
+                    self.tool_builds += 1
+        return tool
+
+    def stats(self) -> dict:
+        return {
+            "llms": len(self._llms),
+            "tools": len(self._tools),
+            "llm_builds": self.llm_builds,
+            "llm_copies": self.llm_copies,
+            "tool_builds": self.tool_builds,
+            "build_seconds": round(self.build_seconds, 4),
+        }
+
+
+registry = ClientRegistry()
+get_llm = registry.get_llm
+get_tool = registry.get_tool
@@ -0,0 +1,142 @@
+import json
+import os
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from database_model import Agent, Crew, CrewAgent, Task
+from llm_registry import get_llm
+from utils.logging import logger
+
+# 路由表从数据库读取后在内存中缓存的时间（秒）
+MODEL_ROUTES_TTL = int(os.getenv("MODEL_ROUTES_TTL_SECONDS", "60"))
+
+# 每百万 token 的美元价格 (输入, 输出)，可用 MODEL_PRICES='{"model": [in, out]}' 覆盖或补充
+DEFAULT_PRICES = {
+    'gpt-4': (30.0, 60.0),
+    'gpt-4-32k': (60.0, 120.0),
+    'gpt-4-turbo': (10.0, 30.0),
+    'gpt-4-turbo-preview': (10.0, 30.0),
+    'gpt-4-0125-preview': (10.0, 30.0),
+    'gpt-4-1106-preview': (10.0, 30.0),
+    'gpt-4o': (5.0, 15.0),
+    'gpt-4o-mini': (0.15, 0.6),
+    'gpt-3.5-turbo': (0.5, 1.5),
+}
+
+
+def _load_prices() -> Dict[str, Tuple[float, float]]:
+    prices = dict(DEFAULT_PRICES)
+    override = os.getenv("MODEL_PRICES")
+    if override:
+        try:
+            prices.update({model: tuple(price) for model, price in json.loads(override).items()})
+        except (ValueError, TypeError) as e:
+            logger.error(f"Ignoring invalid MODEL_PRICES: {e}")
+    return prices
+
+
+PRICES = _load_prices()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Estimated USD cost of a call, or None for a model without a price."""
+    price = PRICES.get(model)
+    if price is None:
+        # 带日期后缀的快照（如 gpt-4-0125-preview）按最长的前缀匹配
+        matches = [name for name in PRICES if model.startswith(name)]
+        if not matches:
+            return None
+        price = PRICES[max(matches, key=len)]
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+
+
+class ModelRouter:
+    """Chooses the model for each task's agent from the agents/tasks/crews tables.
+
+    A task row uses the llm of its agent row, or failing that the managellm
+    of a crew the agent belongs to. Task rows are matched by
+    "<CrewClass>.<task method>" first, then by the bare method name, since
+    several crews have an `analyze_task`. Without a task row the agent row
+    matched by role (or name) decides. Unconfigured agents keep the model
+    they were built with.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._app = None
+        self._lock = Lock()
+        self._routes = None
+        self._loaded_at = 0.0
+        self.loads = 0
+
+    def init_app(self, app):
+        self._app = app
+
+    def _load(self) -> dict:
+        routes = {"tasks": {}, "agents": {}}
+        if self._app is None:
+            return routes
+        with self._app.app_context():
+            agents = {agent.id: agent for agent in Agent.query.all()}
+            crew_models = {crew.id: crew.managellm for crew in Crew.query.all() if crew.managellm}
+            agent_crews = {}
+            for link in CrewAgent.query.all():
+                if link.crew_id in crew_models:
+                    agent_crews.setdefault(link.agent_id, crew_models[link.crew_id])
+
+            def model_of(agent):
+                return agent.llm or agent_crews.get(agent.id)
+
+            for agent in agents.values():
+                model = model_of(agent)
+                if model:
+                    for key in (agent.role, agent.name):
+                        if key:
+                            routes["agents"].setdefault(key.strip(), model)
+            for task in Task.query.all():
+                agent = agents.get(task.agent_id)
+                model = agent and model_of(agent)
+                if model:
+                    routes["tasks"][task.name] = model
+        return routes
+
+    def routes(self) -> dict:
+        now = time.monotonic()
+        if self._routes is None or now - self._loaded_at > self.ttl:
+            with self._lock:
+                if self._routes is None or now - self._loaded_at > self.ttl:
+                    try:
+                        self._routes = self._load()
+                        self.loads += 1
+                    except Exception as e:
+                        # 数据库不可用时沿用上一次的路由表
+                        logger.error(f"Failed to load model routes: {e}")
+                        if self._routes is None:
+                            self._routes = {"tasks": {}, "agents": {}}
+                    self._loaded_at = now
+        return self._routes
+
+    def resolve(self, crew_name: str, task_name: str, role: str) -> Optional[str]:
+        routes = self.routes()
+        return (routes["tasks"].get(f"{crew_name}.{task_name}") or routes["tasks"].get(task_name)
+                or routes["agents"].get(role.strip()))
+
+    def apply(self, crew_name: str, tasks):
+        """Switch the agent of each `(task_name, task)` pair to its configured model.
+
+        Must run before usage.attach(): assigning Agent.llm makes crewai
+        revalidate the agent and rebuild its callbacks.
+        """
+        for task_name, task in tasks:
+            agent = task.agent
+            model = self.resolve(crew_name, task_name, agent.role)
+            if model and model != getattr(agent.llm, 'model_name', None):
+                agent.llm = get_llm(model)
+
+    def stats(self) -> dict:
+        routes = self.routes()
+        return {**routes, "loads": self.loads, "ttl": self.ttl, "prices": PRICES}
+
+
+model_router = ModelRouter(ttl=MODEL_ROUTES_TTL)
@@ -0,0 +1,200 @@
+import json
+import multiprocessing
+import os
+import queue
+import time
+from threading import Lock, Thread
+from typing import Dict, List, NamedTuple, Set
+
+from database_model import Job, JobEvent, JobResult, db
+from job_manager import Event, on_discard, on_finish, on_spill, on_status
+from utils.logging import logger
+
+# 攒够 PERSIST_BATCH_SIZE 条或距上次写入超过 PERSIST_FLUSH_SECONDS 秒就写一次库
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "200"))
+PERSIST_FLUSH_SECONDS = float(os.getenv("PERSIST_FLUSH_SECONDS", "1.0"))
+# 写库失败后整批重试的次数，间隔从 PERSIST_RETRY_SECONDS 起逐次翻倍
+PERSIST_RETRIES = int(os.getenv("PERSIST_RETRIES", "3"))
+PERSIST_RETRY_SECONDS = float(os.getenv("PERSIST_RETRY_SECONDS", "0.5"))
+
+
+class _Records(NamedTuple):
+    """One batch collapsed to the last status and result per job."""
+    statuses: Dict[str, str]
+    results: Dict[str, str]
+    events: List[dict]
+    discarded: Set[str]
+
+    @classmethod
+    def collapse(cls, batch: list) -> "_Records":
+        records = cls({}, {}, [], set())
+        for kind, job_id, payload in batch:
+            if kind == 'status':
+                records.statuses[job_id] = payload
+            elif kind == 'result':
+                records.results[job_id] = json.dumps(payload)
+            elif kind == 'discard':
+                # 调度器拒绝的任务：丢掉尚未写入的记录，已写入的行一并删除
+                records.discarded.add(job_id)
+                records.statuses.pop(job_id, None)
+                records.results.pop(job_id, None)
+                records.events[:] = [event for event in records.events if event["job_id"] != job_id]
+            else:
+                records.events.extend({"job_id": job_id, "seq": event.seq, "timestamp": event.timestamp,
+                                       "data": event.data} for event in payload)
+        return records
+
+    def job_ids(self) -> Set[str]:
+        return set(self.statuses) | set(self.results) | {event["job_id"] for event in self.events} | self.discarded
+
+    def only(self, job_id: str) -> "_Records":
+        return _Records({k: v for k, v in self.statuses.items() if k == job_id},
+                        {k: v for k, v in self.results.items() if k == job_id},
+                        [event for event in self.events if event["job_id"] == job_id],
+                        self.discarded & {job_id})
+
+
+class PersistenceWriter:
+    """Writes job status changes, spilled events and results to the database from one background thread.
+
+    Crew threads only enqueue; the writer collapses each batch to the last
+    status and result per job and applies it with bulk inserts and updates.
+    A batch that fails is retried with backoff, then written job by job so
+    one bad record does not take the rest of the batch with it.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        # 串行化后台线程与 flush() 的写库操作
+        self._write_lock = Lock()
+        self._app = None
+        self.batches = 0
+        self.records = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        self._app = app
+        if multiprocessing.parent_process() is None:
+            Thread(target=self._run, name="job-persistence", daemon=True).start()
+
+    def record_status(self, job_id: str, status: str):
+        self._queue.put(('status', job_id, status))
+
+    def record_events(self, job_id: str, events: List[Event]):
+        self._queue.put(('events', job_id, events))
+
+    def record_result(self, job_id: str, status: str, result):
+        self._queue.put(('status', job_id, status))
+        self._queue.put(('result', job_id, result))
+
+    def record_discard(self, job_id: str):
+        self._queue.put(('discard', job_id, None))
+
+    def _drain(self, first=None, deadline=None) -> list:
+        batch = [] if first is None else [first]
+        while len(batch) < self.batch_size:
+            try:
+                if deadline is None:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = self._drain(first, deadline=time.monotonic() + self.flush_interval)
+            with self._write_lock:
+                self._write(batch)
+
+    def flush(self):
+        """Synchronously write everything queued so far."""
+        with self._write_lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    return
+                self._write(batch)
+
+    def _write(self, batch: list):
+        if self._app is None:
+            return
+        records = _Records.collapse(batch)
+        for attempt in range(PERSIST_RETRIES + 1):
+            try:
+                self._apply(records)
+            except Exception as e:
+                error = e
+                if attempt < PERSIST_RETRIES:
+                    time.sleep(PERSIST_RETRY_SECONDS * 2 ** attempt)
+            else:
+                self.batches += 1
+                self.records += len(batch)
+                return
+        # 整批一直失败时逐个任务写入，只丢弃仍然写不进去的那几个任务
+        logger.warning(f"Failed to persist batch of {len(batch)} job records, writing job by job: {error}")
+        for job_id in records.job_ids():
+            try:
+                self._apply(records.only(job_id))
+            except Exception as e:
+                self.dropped += 1
+                logger.error(f"Dropped job records of {job_id} that could not be persisted: {e}")
+        self.batches += 1
+        self.records += len(batch)
+
+    def _apply(self, records: "_Records"):
+        statuses, results, events, discarded = records
+        job_ids = set(statuses) | set(results) | {event["job_id"] for event in events}
+        # 退出 app_context 时会话被移除，未提交的改动随之回滚
+        with self._app.app_context():
+            existing = dict(db.session.query(Job.job_id, Job.id).filter(Job.job_id.in_(job_ids)))
+            new_jobs = [{"job_id": job_id, "status": statuses.get(job_id)}
+                        for job_id in job_ids if job_id not in existing]
+            if new_jobs:
+                db.session.execute(db.insert(Job), new_jobs)
+            updates = [{"id": existing[job_id], "status": status}
+                       for job_id, status in statuses.items() if job_id in existing]
+            if updates:
+                db.session.execute(db.update(Job), updates)
+            if events:
+                db.session.execute(db.insert(JobEvent), events)
+            if results:
+                stored = dict(db.session.query(JobResult.job_id, JobResult.id).filter(
+                    JobResult.job_id.in_(list(results))))
+                new_results = [{"job_id": job_id, "result": result}
+                               for job_id, result in results.items() if job_id not in stored]
+                if new_results:
+                    db.session.execute(db.insert(JobResult), new_results)
+                result_updates = [{"id": stored[job_id], "result": result}
+                                  for job_id, result in results.items() if job_id in stored]
+                if result_updates:
+                    db.session.execute(db.update(JobResult), result_updates)
+            if discarded:
+                db.session.execute(db.delete(JobEvent).where(JobEvent.job_id.in_(discarded)))
+                db.session.execute(db.delete(JobResult).where(JobResult.job_id.in_(discarded)))
+                db.session.execute(db.delete(Job).where(Job.job_id.in_(discarded)))
+            db.session.commit()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "records": self.records,
+            "dropped": self.dropped,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+        }
+
+
+persistence_writer = PersistenceWriter(
+    batch_size=PERSIST_BATCH_SIZE,
+    flush_interval=PERSIST_FLUSH_SECONDS,
+)
+on_status(persistence_writer.record_status)
+on_finish(persistence_writer.record_result)
+on_spill(persistence_writer.record_events)
+on_discard(persistence_writer.record_discard)
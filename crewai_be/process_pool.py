@@ -0,0 +1,81 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock, Thread
+
+import job_manager
+from rate_governor import governor
+from utils.logging import logger
+
+
+def _init_worker(events, workers):
+    job_manager.set_forwarder(events.put)
+    # 每个工作进程各有一份限流器，按进程数平分额度
+    governor.share(workers)
+
+
+def _run_in_child(target, job_id, args):
+    target(job_id, *args)
+
+
+class ProcessJobRunner:
+    """Runs crew kickoffs in worker processes and replays their job updates in this process.
+
+    Workers are replaced after `max_tasks_per_child` jobs so memory leaked by
+    langchain/crewai objects is handed back to the OS.
+    """
+
+    def __init__(self, max_workers: int, max_tasks_per_child: int):
+        self.max_workers = max_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self._ctx = multiprocessing.get_context("spawn")
+        self._events = None
+        self._pool = None
+        self._lock = Lock()
+        self._restarts = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._events is None:
+                self._events = self._ctx.Queue()
+                Thread(target=self._listen, name="crew-process-events", daemon=True).start()
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=self._ctx,
+                    initializer=_init_worker,
+                    initargs=(self._events, self.max_workers),
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+            return self._pool
+
+    def _reset_pool(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None
+                self._restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _listen(self):
+        while True:
+            message = self._events.get()
+            try:
+                job_manager.apply_forwarded(message)
+            except Exception as e:
+                logger.error(f"Failed to apply job update from worker process: {e}")
+
+    def __call__(self, job_id: str, target, args):
+        pool = self._get_pool()
+        try:
+            pool.submit(_run_in_child, target, job_id, args).result()
+        except BrokenProcessPool as e:
+            logger.error(f"Worker process for job {job_id} died: {e}")
+            self._reset_pool(pool)
+            job_manager.finish_job(job_id, 'ERROR', "Worker process exited unexpectedly")
+
+    def stats(self) -> dict:
+        return {
+            "mode": "process",
+            "max_tasks_per_child": self.max_tasks_per_child,
+            "pool_restarts": self._restarts,
+        }
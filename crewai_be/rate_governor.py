@@ -0,0 +1,308 @@
+import json
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from contextlib import suppress
+from email.utils import parsedate_to_datetime
+from threading import Condition
+from typing import Callable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+
+from utils.logging import logger
+
+# 各上游的默认限额：rpm 每分钟请求数，tpm 每分钟 token 数（只对 LLM 有意义）。
+# 可用 RATE_LIMITS='{"openai": {"rpm": 3500, "tpm": 90000}}' 覆盖或新增上游
+DEFAULT_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 150000},
+    "serper": {"rpm": 300},
+    "youtube": {"rpm": 100},
+    "browserless": {"rpm": 60},
+    "sec": {"rpm": 600},
+}
+# 主机名到上游的映射，可用 RATE_LIMIT_HOSTS='{"host": "upstream"}' 补充；未列出的主机不限速
+DEFAULT_HOSTS = {
+    "api.openai.com": "openai",
+    "google.serper.dev": "serper",
+    "www.googleapis.com": "youtube",
+    "chrome.browserless.io": "browserless",
+    "secsearch.sec.gov": "sec",
+    "efts.sec.gov": "sec",
+}
+# 令牌桶最多攒下多少秒的额度，决定突发请求的上限
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "10"))
+# 被 429 拒绝后在这一层重试的次数
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+# 连续被限流时速率最低降到配置值的这个比例
+MIN_SCALE = 0.1
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+Response = TypeVar("Response")
+
+
+def _json_env(name: str) -> dict:
+    value = os.getenv(name)
+    if not value:
+        return {}
+    try:
+        return json.loads(value)
+    except ValueError as e:
+        logger.error(f"Ignoring invalid {name}: {e}")
+        return {}
+
+
+def _seconds(value: Optional[str]) -> Optional[float]:
+    """Parse "20", "1.5s", "6m0s", "250ms" or an HTTP date into seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if parts:
+        return sum(float(number) * _UNITS[unit] for number, unit in parts)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def estimate_tokens(body) -> int:
+    """Rough token cost of an OpenAI request: ~4 bytes per prompt token plus the completion budget."""
+    if not body:
+        return 0
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    tokens = len(body) // 4
+    with suppress(ValueError, TypeError, AttributeError):
+        tokens += int(json.loads(body).get("max_tokens") or 0)
+    return tokens
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.limit = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, per_minute * RATE_LIMIT_BURST_SECONDS / 60.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float) -> float:
+        # 超过桶容量的请求等桶满后放行，否则永远拿不到额度
+        cost = min(cost, self.capacity)
+        return 0.0 if self.level >= cost else (cost - self.level) / self.rate
+
+    def take(self, cost: float):
+        self.level -= min(cost, self.capacity)
+
+    def scale(self, factor: float):
+        self.rate = self.limit * factor / 60.0
+
+
+class Upstream:
+    """Token buckets for one upstream API, shared fairly between the jobs calling it.
+
+    Waiting callers are queued per job and the jobs take turns, so a crew
+    firing many tool calls at once cannot starve another job of the same
+    upstream. The refill rate halves on every 429 and creeps back up with
+    each successful call.
+    """
+
+    def __init__(self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.name = name
+        self.requests = _Bucket(rpm) if rpm else None
+        self.tokens = _Bucket(tpm) if tpm else None
+        self.scale = 1.0
+        self.blocked_until = 0.0
+        self._cond = Condition()
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self.granted = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.throttled = 0
+
+    def _buckets(self):
+        return [bucket for bucket in (self.requests, self.tokens) if bucket is not None]
+
+    def _delay(self, now: float, tokens: int) -> float:
+        delay = self.blocked_until - now
+        for bucket, cost in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                delay = max(delay, bucket.delay(cost))
+        return delay
+
+    def acquire(self, job: str, tokens: int = 0) -> float:
+        """Block until this call may go out; returns the seconds spent waiting."""
+        started = time.monotonic()
+        ticket = object()
+        with self._cond:
+            self._waiting.setdefault(job, deque()).append(ticket)
+            try:
+                while True:
+                    first_job = next(iter(self._waiting))
+                    delay = None
+                    if self._waiting[first_job][0] is ticket:
+                        delay = self._delay(time.monotonic(), tokens)
+                        if delay <= 0:
+                            break
+                    self._cond.wait(delay)
+                if self.requests is not None:
+                    self.requests.take(1)
+                if self.tokens is not None:
+                    self.tokens.take(tokens)
+            finally:
+                queue = self._waiting[job]
+                queue.remove(ticket)
+                if queue:
+                    # 轮到下一个任务，同一任务的其余请求排到队尾
+                    self._waiting.move_to_end(job)
+                else:
+                    del self._waiting[job]
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self.granted += 1
+            if waited > 0.001:
+                self.waits += 1
+                self.wait_seconds += waited
+        return waited
+
+    def observe(self, status: int, headers, attempt: int) -> bool:
+        """Adapt to a response; returns True if it was rate limited and should be retried."""
+        now = time.monotonic()
+        remaining_requests = _int(headers.get("x-ratelimit-remaining-requests") or headers.get("x-ratelimit-remaining"))
+        remaining_tokens = _int(headers.get("x-ratelimit-remaining-tokens"))
+        reset_requests = _seconds(headers.get("x-ratelimit-reset-requests") or headers.get("x-ratelimit-reset"))
+        reset_tokens = _seconds(headers.get("x-ratelimit-reset-tokens"))
+        with self._cond:
+            if status == 429:
+                retry_after = _seconds(headers.get("retry-after-ms"))
+                retry_after = retry_after / 1000 if retry_after is not None else _seconds(headers.get("retry-after"))
+                if retry_after is None:
+                    resets = [reset for reset in (reset_requests, reset_tokens) if reset is not None]
+                    retry_after = max(resets) if resets else 2.0 ** attempt
+                self.throttled += 1
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.scale = max(MIN_SCALE, self.scale / 2)
+                for bucket in self._buckets():
+                    bucket.scale(self.scale)
+                    bucket.level = 0.0
+                logger.warning(f"Rate limited by {self.name}; pausing {retry_after:.1f}s at {self.scale:.0%} of the limit")
+                self._cond.notify_all()
+                return True
+            if self.scale < 1.0:
+                self.scale = min(1.0, self.scale + 0.02)
+                for bucket in self._buckets():
+                    bucket.scale(self.scale)
+            # 服务端报告的剩余额度比本地估算更准
+            for bucket, remaining, reset in ((self.requests, remaining_requests, reset_requests),
+                                             (self.tokens, remaining_tokens, reset_tokens)):
+                if bucket is None or remaining is None:
+                    continue
+                bucket.refill(now)
+                bucket.level = min(bucket.level, float(remaining))
+                if remaining <= 0 and reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+        return False
+
+    def share(self, factor: float):
+        for bucket in self._buckets():
+            bucket.limit *= factor
+            bucket.capacity = max(1.0, bucket.capacity * factor)
+            bucket.level = min(bucket.level, bucket.capacity)
+            bucket.scale(self.scale)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "rpm": self.requests.limit if self.requests else None,
+                "tpm": self.tokens.limit if self.tokens else None,
+                "scale": round(self.scale, 3),
+                "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 3),
+                "waiting": {job or "-": len(queue) for job, queue in self._waiting.items()},
+                "granted": self.granted,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "throttled": self.throttled,
+            }
+
+
+class RateGovernor:
+    """Process-wide rate limiting of outbound calls, keyed by upstream host.
+
+    utils.http mounts it on the shared requests.Session and httpx.Client, so
+    every tool and LLM client using those goes through it.
+    """
+
+    def __init__(self, limits: Dict[str, dict], hosts: Dict[str, str]):
+        self.upstreams = {name: Upstream(name, limit.get("rpm"), limit.get("tpm")) for name, limit in limits.items()}
+        self.hosts = dict(hosts)
+        self.retries = 0
+
+    def upstream_for(self, url: str) -> Optional[Upstream]:
+        host = urlsplit(url).hostname or ''
+        name = self.hosts.get(host)
+        return self.upstreams.get(name) if name else None
+
+    def share(self, workers: int):
+        """Split the limits between `workers` processes, each running its own governor."""
+        if workers > 1:
+            for upstream in self.upstreams.values():
+                upstream.share(1 / workers)
+
+    def call(self, url: str, send: Callable[[], Response], tokens: int = 0) -> Response:
+        """Send through the upstream's buckets, retrying after the server-requested pause on 429."""
+        upstream = self.upstream_for(url)
+        if upstream is None:
+            return send()
+        # 延迟导入：usage 间接依赖 utils.http
+        from usage import current
+        context = current()
+        job = context.job_id if context else ''
+        attempt = 0
+        while True:
+            upstream.acquire(job, tokens if upstream.tokens is not None else 0)
+            response = send()
+            if not upstream.observe(response.status_code, response.headers, attempt) \
+                    or attempt >= RATE_LIMIT_MAX_RETRIES:
+                return response
+            response.close()
+            attempt += 1
+            self.retries += 1
+
+    def stats(self) -> dict:
+        return {
+            "upstreams": {name: upstream.stats() for name, upstream in self.upstreams.items()},
+            "hosts": self.hosts,
+            "retries": self.retries,
+        }
+
+
+def _build() -> RateGovernor:
+    limits = {name: dict(limit) for name, limit in DEFAULT_LIMITS.items()}
+    for name, limit in _json_env("RATE_LIMITS").items():
+        limits.setdefault(name, {}).update(limit)
+    hosts = {**DEFAULT_HOSTS, **_json_env("RATE_LIMIT_HOSTS")}
+    # 通过 OPENAI_API_BASE 指向的代理/网关同样按 openai 的限额计
+    base_host = urlsplit(os.getenv("OPENAI_API_BASE") or '').hostname
+    if base_host:
+        hosts.setdefault(base_host, "openai")
+    return RateGovernor(limits, hosts)
+
+
+governor = _build()
@@ -0,0 +1,116 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from database_model import CachedResult, db
+from job_manager import on_finish
+from utils.cache import TTLCache
+from utils.logging import logger
+
+# 各类分析结果的默认缓存时间（秒），可通过 RESULT_CACHE_TTL_<INTENT> 覆盖
+DEFAULT_TTLS = {
+    'company': 6 * 3600,
+    'industry': 24 * 3600,
+    'macroeconomic': 24 * 3600,
+    'trip': 3600,
+}
+
+
+def _load_ttls() -> Dict[str, int]:
+    return {intent: int(os.getenv(f"RESULT_CACHE_TTL_{intent.upper()}", ttl))
+            for intent, ttl in DEFAULT_TTLS.items()}
+
+
+class ResultCache:
+    """Two-tier cache of completed crew results: an in-memory LRU in front of the result_cache table."""
+
+    def __init__(self, maxsize: int, ttls: Dict[str, int]):
+        self.ttls = ttls
+        self._memory = TTLCache(maxsize=maxsize, ttl=max(ttls.values()))
+        self._pending: Dict[str, Tuple[str, str]] = {}
+        self._lock = Lock()
+        self._app = None
+        self.db_hits = 0
+
+    def init_app(self, app):
+        self._app = app
+
+    def ttl_for(self, intent: str) -> int:
+        return self.ttls.get(intent, 3600)
+
+    def lookup(self, key: str, intent: str, max_age: float) -> Optional[Tuple[str, float]]:
+        """Return `(result, age_seconds)` for a result no older than `max_age` and the intent TTL."""
+        max_age = min(max_age, self.ttl_for(intent))
+        entry = self._memory.get_entry(key, max_age=max_age)
+        if entry is not None:
+            result, stored_at = entry
+            return result, time.time() - stored_at
+        if self._app is None:
+            return None
+        try:
+            with self._app.app_context():
+                row = CachedResult.query.filter(
+                    CachedResult.cache_key == key,
+                    CachedResult.created_at >= datetime.now() - timedelta(seconds=max_age),
+                ).first()
+                if row is None:
+                    return None
+                result, stored_at = row.result, row.created_at.timestamp()
+        except Exception as e:
+            logger.error(f"Result cache lookup failed for {intent}: {e}")
+            return None
+        self.db_hits += 1
+        self._memory.set(key, result, ttl=self.ttl_for(intent), stored_at=stored_at)
+        return result, time.time() - stored_at
+
+    def store(self, key: str, intent: str, result: str):
+        self._memory.set(key, result, ttl=self.ttl_for(intent))
+        if self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                row = CachedResult.query.filter_by(cache_key=key).first()
+                if row is None:
+                    row = CachedResult(cache_key=key, intent=intent)
+                    db.session.add(row)
+                row.result = result
+                row.created_at = datetime.now()
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"Result cache write failed for {intent}: {e}")
+
+    def track(self, job_id: str, key: str, intent: str):
+        """Cache the result of `job_id` under `key` once it completes."""
+        with self._lock:
+            self._pending[job_id] = (key, intent)
+
+    def _on_finish(self, job_id: str, status: str, result):
+        with self._lock:
+            pending = self._pending.pop(job_id, None)
+        if pending is None or status != 'COMPLETE' or not _cacheable(result):
+            return
+        self.store(pending[0], pending[1], result)
+
+    def stats(self) -> dict:
+        return {**self._memory.stats(), "db_hits": self.db_hits, "ttls": self.ttls}
+
+
+def _cacheable(result) -> bool:
+    # crew 出错时 kickoff 会返回错误字符串，只缓存合法的 JSON 报告
+    if not isinstance(result, str) or not result:
+        return False
+    try:
+        json.loads(result)
+    except json.JSONDecodeError:
+        return False
+    return True
+
+
+result_cache = ResultCache(
+    maxsize=int(os.getenv("RESULT_CACHE_SIZE", "256")),
+    ttls=_load_ttls(),
+)
+on_finish(result_cache._on_finish)
@@ -0,0 +1,130 @@
+import math
+import os
+import queue
+import time
+from threading import Lock, Thread
+from typing import Callable
+
+from job_manager import set_status
+from utils.logging import logger
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler cannot admit another job."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def run_inline(job_id: str, target: Callable, args):
+    target(job_id, *args)
+
+
+class JobScheduler:
+    """Runs crew kickoffs on a fixed pool of worker threads fed by a bounded queue.
+
+    Each worker hands its job to `runner`, which either calls the kickoff in
+    this process or dispatches it to a worker process (see process_pool).
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, runner: Callable = run_inline):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.runner = runner
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = Lock()
+        self._workers: list[Thread] = []
+        self._busy = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._avg_duration = None
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.max_workers):
+                worker = Thread(target=self._work, name=f"crew-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, job_id: str, target: Callable, *args):
+        """Queue `target(job_id, *args)`; raises QueueFullError when the queue is full."""
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((job_id, target, args))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(self.retry_after()) from None
+        with self._lock:
+            self._submitted += 1
+        logger.info("Job %s queued (depth %d)", job_id, self._queue.qsize())
+
+    def _work(self):
+        while True:
+            job_id, target, args = self._queue.get()
+            with self._lock:
+                self._busy += 1
+            set_status(job_id, 'STARTED')
+            started = time.monotonic()
+            try:
+                self.runner(job_id, target, args)
+            except Exception as e:
+                logger.error(f"Unhandled error in worker for job {job_id}: {e}")
+            finally:
+                duration = time.monotonic() - started
+                with self._lock:
+                    self._busy -= 1
+                    self._completed += 1
+                    # 指数滑动平均，用于估算 Retry-After
+                    if self._avg_duration is None:
+                        self._avg_duration = duration
+                    else:
+                        self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+                self._queue.task_done()
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        with self._lock:
+            avg = self._avg_duration
+        if avg is None:
+            return 30
+        return max(1, math.ceil(avg * (self._queue.qsize() + 1) / self.max_workers))
+
+    def stats(self) -> dict:
+        runner_stats = self.runner.stats() if hasattr(self.runner, "stats") else {"mode": "thread"}
+        with self._lock:
+            busy = self._busy
+            return {
+                **runner_stats,
+                "workers": self.max_workers,
+                "busy_workers": busy,
+                "utilization": busy / self.max_workers,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self.max_queue,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_job_seconds": self._avg_duration,
+            }
+
+
+_max_workers = int(os.getenv("CREW_MAX_WORKERS", "4"))
+
+if os.getenv("CREW_EXECUTION_MODE", "thread") == "process":
+    from process_pool import ProcessJobRunner
+    _runner = ProcessJobRunner(
+        max_workers=_max_workers,
+        max_tasks_per_child=int(os.getenv("CREW_PROCESS_MAX_TASKS", "20")),
+    )
+else:
+    _runner = run_inline
+
+scheduler = JobScheduler(
+    max_workers=_max_workers,
+    max_queue=int(os.getenv("CREW_MAX_QUEUE", "32")),
+    runner=_runner,
+)
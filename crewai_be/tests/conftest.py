@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+import pytest
+
+# 测试用临时目录里的 SQLite，不连 MySQL
+_tmp = tempfile.mkdtemp(prefix="crewai-be-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp, 'crewai.sqlite')}")
+# 磁盘缓存也放到临时目录，不写进仓库的 .cache
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_tmp, "llm_cache.sqlite"))
+os.environ.setdefault("PAGE_CACHE_PATH", os.path.join(_tmp, "page_cache.sqlite"))
+
+
+@pytest.fixture(scope="session")
+def app():
+    # 导入 api 时会建好表和索引
+    import api
+    return api.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
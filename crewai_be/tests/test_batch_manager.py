@@ -0,0 +1,76 @@
+from uuid import uuid4
+
+from batch_manager import Batch, BatchManager
+from job_manager import create_job, finish_job, get_snapshot, on_finish
+from scheduler import QueueFullError
+
+
+def make_batch(manager, start_child, items=3, max_parallel=2):
+    job_ids = [str(uuid4()) for _ in range(items)]
+    on_finish(manager._on_finish)
+    return manager.submit(Batch(str(uuid4()), [f"company Acme {i}" for i in range(items)], job_ids,
+                                max_parallel, start_child))
+
+
+def test_at_most_max_parallel_items_run_and_each_finish_starts_the_next():
+    started = []
+
+    def start_child(job_id, _input_data):
+        create_job(job_id, status='RUNNING')
+        started.append(job_id)
+
+    manager = BatchManager()
+    batch = make_batch(manager, start_child, items=5, max_parallel=2)
+    assert started == batch.job_ids[:2]
+
+    finish_job(batch.job_ids[0], 'COMPLETE', "report")
+    assert started == batch.job_ids[:3]
+    assert batch.running == 2
+
+    for job_id in batch.job_ids[1:]:
+        finish_job(job_id, 'COMPLETE', "report")
+    assert started == batch.job_ids
+    assert batch.done and batch.running == 0
+    progress = manager.progress(batch, ['COMPLETE'] * 5)
+    assert progress["status"] == 'COMPLETE' and progress["progress"] == 1.0
+
+
+def test_full_queue_puts_the_item_back_and_retries_later():
+    attempts = []
+
+    def start_child(job_id, _input_data):
+        attempts.append(job_id)
+        if len(attempts) == 1:
+            raise QueueFullError(60)
+        create_job(job_id, status='RUNNING')
+
+    manager = BatchManager()
+    batch = make_batch(manager, start_child, items=2, max_parallel=2)
+
+    assert list(batch.pending) == [0, 1]
+    assert batch.running == 0
+    assert batch.retry_timer.is_alive()
+    batch.retry_timer.cancel()
+
+    manager._pump(batch)
+    assert attempts == [batch.job_ids[0]] + batch.job_ids
+    assert batch.running == 2
+
+
+def test_item_that_fails_to_start_is_marked_error_and_the_batch_moves_on():
+    started = []
+
+    def start_child(job_id, input_data):
+        if input_data.endswith("0"):
+            raise RuntimeError("scheduler is shutting down")
+        started.append(job_id)
+        finish_job(job_id, 'COMPLETE', "report")
+
+    manager = BatchManager()
+    batch = make_batch(manager, start_child)
+
+    failed = get_snapshot(batch.job_ids[0])
+    assert failed.status == 'ERROR'
+    assert failed.result == "Failed to start: scheduler is shutting down"
+    assert started == batch.job_ids[1:]
+    assert batch.done and batch.running == 0
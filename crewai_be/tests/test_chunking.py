@@ -0,0 +1,20 @@
+from tools.chunking import ChunkDeduper
+
+FOOTER = "We use cookies to improve your experience. By continuing you accept our cookie policy."
+RELEASE = "Acme Corp reported third quarter revenue of $4.2 billion, up 12% from a year earlier."
+
+
+def test_paragraph_repeated_across_one_site_is_boilerplate():
+    deduper = ChunkDeduper(min_pages=3, ttl=60, max_distance=3)
+    for n in range(3):
+        text = deduper.strip_boilerplate(f"Story {n} of the day.\n\n{FOOTER}", f"https://www.example.com/news/{n}")
+
+    assert text == "Story 2 of the day."
+
+
+def test_syndicated_paragraph_on_different_sites_is_kept():
+    deduper = ChunkDeduper(min_pages=3, ttl=60, max_distance=3)
+    sites = ["https://www.reuters.com/acme", "https://finance.yahoo.com/acme", "https://www.marketwatch.com/acme"]
+    texts = [deduper.strip_boilerplate(RELEASE, page) for page in sites]
+
+    assert texts == [RELEASE] * 3
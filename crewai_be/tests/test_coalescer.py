@@ -0,0 +1,33 @@
+from uuid import uuid4
+
+from coalescer import Coalescer
+from job_manager import append_event, discard_job, finish_job, get_snapshot
+
+
+def test_follower_joining_before_the_leader_starts_gets_its_result():
+    coalescer = Coalescer()
+    leader_id, follower_id = str(uuid4()), str(uuid4())
+
+    assert coalescer.join("key", leader_id) is None
+    assert get_snapshot(leader_id).status == 'QUEUED'
+    assert coalescer.join("key", follower_id) == leader_id
+    append_event(leader_id, "searching")
+    finish_job(leader_id, 'COMPLETE', "report")
+
+    snapshot = get_snapshot(follower_id)
+    assert snapshot.status == 'COMPLETE' and snapshot.result == "report"
+    assert [event.data for event in snapshot.events][-2:] == ["searching", "Crew complete"]
+
+
+def test_followers_of_a_leader_the_queue_refused_fail():
+    coalescer = Coalescer()
+    leader_id, follower_id = str(uuid4()), str(uuid4())
+    coalescer.join("key", leader_id)
+    coalescer.join("key", follower_id)
+
+    discard_job(leader_id, "Job queue is full, retry later")
+    coalescer.abandon(leader_id)
+
+    assert get_snapshot(leader_id) is None
+    assert get_snapshot(follower_id).status == 'ERROR'
+    assert coalescer.join("key", str(uuid4())) is None
@@ -0,0 +1,52 @@
+import job_manager
+from job_archive import JobArchive
+from job_manager import append_event, create_job, finish_job, get_snapshot
+
+
+def test_sweep_archives_expired_then_oldest_jobs_until_under_budget(app, monkeypatch):
+    monkeypatch.setattr(job_manager, "jobs", {})
+    create_job("arc-running", status='RUNNING')
+    append_event("arc-running", "still going")
+    for job_id in ("arc-expired", "arc-older", "arc-newer"):
+        create_job(job_id, status='RUNNING')
+        append_event(job_id, f"{job_id} step")
+        finish_job(job_id, 'COMPLETE', f'{{"id": "{job_id}"}}')
+    job_manager.jobs["arc-expired"].finished_at -= 600
+
+    budget = job_manager.jobs["arc-running"].size + job_manager.jobs["arc-newer"].size
+    archive = JobArchive(ttl=300, memory_budget=budget, interval=60)
+    archive._app = app
+
+    assert archive.sweep() == 2
+    assert set(job_manager.jobs) == {"arc-running", "arc-newer"}
+    assert archive.evicted == 2
+
+
+def test_evicted_job_is_loaded_back_from_the_database(app, client, monkeypatch):
+    monkeypatch.setattr(job_manager, "jobs", {})
+    create_job("arc-load", status='RUNNING')
+    append_event("arc-load", "searching")
+    finish_job("arc-load", 'COMPLETE', '{"report": 1}')
+    archive = JobArchive(ttl=0, memory_budget=1 << 30, interval=60)
+    archive._app = app
+
+    assert archive.sweep() == 1
+    assert get_snapshot("arc-load") is None
+    snapshot = archive.load("arc-load")
+    assert snapshot.status == 'COMPLETE'
+    assert [event.data for event in snapshot.events] == ["searching", "Crew complete"]
+    assert [event.data for event in archive.load("arc-load", after_seq=0).events] == ["Crew complete"]
+
+    import api
+    monkeypatch.setattr(api, "job_archive", archive)
+    response = client.get('/api/crew/arc-load')
+    assert response.status_code == 200
+    assert response.get_json()["status"] == 'COMPLETE'
+
+
+def test_running_jobs_are_never_evicted(monkeypatch):
+    monkeypatch.setattr(job_manager, "jobs", {})
+    create_job("arc-busy", status='RUNNING')
+    append_event("arc-busy", "x" * 4096)
+
+    assert job_manager.select_evictable(ttl=0, memory_budget=0) == []
@@ -0,0 +1,52 @@
+from uuid import uuid4
+
+import job_manager
+from job_manager import (
+    append_event,
+    attach_follower,
+    create_job,
+    finish_job,
+    get_snapshot,
+)
+
+
+def test_snapshot_returns_only_newer_events_after_the_buffer_wraps(monkeypatch):
+    monkeypatch.setattr(job_manager, "EVENT_BUFFER_SIZE", 8)
+    spilled = []
+    monkeypatch.setattr(job_manager, "_spill_hooks", [lambda _job_id, events: spilled.extend(events)])
+    job_id = str(uuid4())
+    create_job(job_id, status='STARTED')
+    for i in range(30):
+        append_event(job_id, f"event {i}")
+
+    snapshot = get_snapshot(job_id)
+    assert snapshot.first_seq == 22
+    assert [event.seq for event in snapshot.events] == list(range(22, 30))
+    assert [event.seq for event in spilled] == list(range(22))
+    assert [event.seq for event in get_snapshot(job_id, 26).events] == [27, 28, 29]
+    assert get_snapshot(job_id, 29).events == []
+
+
+def test_snapshot_taken_earlier_is_not_changed_by_later_events(monkeypatch):
+    monkeypatch.setattr(job_manager, "EVENT_BUFFER_SIZE", 4)
+    job_id = str(uuid4())
+    create_job(job_id, status='STARTED')
+    append_event(job_id, "first")
+    view = job_manager.jobs[job_id].view
+    for i in range(10):
+        append_event(job_id, f"event {i}")
+
+    assert [event.data for event in job_manager._snapshot(view, -1).events] == ["first"]
+
+
+def test_follower_mirrors_leader_events_and_result():
+    leader_id, follower_id = str(uuid4()), str(uuid4())
+    create_job(leader_id, status='STARTED')
+    append_event(leader_id, "searching")
+    assert attach_follower(leader_id, follower_id)
+    append_event(leader_id, "analysing")
+    finish_job(leader_id, 'COMPLETE', "report")
+
+    snapshot = get_snapshot(follower_id)
+    assert snapshot.status == 'COMPLETE' and snapshot.result == "report"
+    assert [event.data for event in snapshot.events] == ["searching", "analysing", "Crew complete"]
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import inspect
+
+from database_model import Job, db
+
+STATUS = 'PAGED'
+
+
+@pytest.fixture(scope="module")
+def listed_jobs(app):
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    # 两条任务的 created_at 相同，翻页时要靠 id 区分先后
+    created = [base, base + timedelta(minutes=1), base + timedelta(minutes=1),
+               base + timedelta(minutes=2), base + timedelta(minutes=3)]
+    with app.app_context():
+        db.session.add_all([Job(job_id=f"paged-{i}", status=STATUS, created_at=at)
+                            for i, at in enumerate(created)])
+        db.session.commit()
+    return [f"paged-{i}" for i in reversed(range(len(created)))]
+
+
+def test_cursor_walks_every_job_once_in_created_order(client, listed_jobs):
+    seen = []
+    cursor = None
+    while True:
+        params = {"status": STATUS, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get('/api/jobs', query_string=params).get_json()
+        assert len(body["jobs"]) <= 2
+        seen += [job["job_id"] for job in body["jobs"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == listed_jobs
+
+
+def test_filters_and_count(client, listed_jobs):
+    body = client.get('/api/jobs', query_string={
+        "status": f"{STATUS},OTHER", "created_after": "2024-01-01T12:01:00",
+        "created_before": "2024-01-01T12:03:00", "count": "true",
+    }).get_json()
+
+    assert [job["job_id"] for job in body["jobs"]] == listed_jobs[1:4]
+    assert body["count"] == 3
+    assert body["next_cursor"] is None
+
+
+@pytest.mark.usefixtures("listed_jobs")
+def test_bad_cursor_and_dates_are_rejected(client):
+    assert client.get('/api/jobs', query_string={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get('/api/jobs', query_string={"created_after": "yesterday"}).status_code == 400
+
+
+def test_app_init_creates_the_job_listing_indexes(app):
+    with app.app_context():
+        indexes = {index["name"] for index in inspect(db.engine).get_indexes("jobs")}
+
+    assert {"ix_jobs_created_at_id", "ix_jobs_status_created_at_id"} <= indexes
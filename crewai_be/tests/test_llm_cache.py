@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from langchain_core.outputs import Generation
+
+import llm_cache as llm_cache_module
+from llm_cache import SQLiteLLMCache, bypass
+
+LLM = "model=gpt-4o-mini temperature=0"
+
+
+def prompt(content):
+    return json.dumps([{"type": "human", "data": {"content": content}}])
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SQLiteLLMCache(str(tmp_path / "llm.sqlite"), ttl=3600, max_bytes=1024 * 1024)
+
+
+def test_hit_ignores_surrounding_whitespace_but_not_model_parameters(cache):
+    cache.update(prompt("Summarise Acme"), LLM, [Generation(text="Acme makes anvils")])
+
+    assert cache.lookup(prompt("  Summarise Acme\r\n"), LLM)[0].text == "Acme makes anvils"
+    assert cache.lookup(prompt("Summarise Acme"), "model=gpt-4o temperature=0") is None
+    assert cache.lookup(prompt("Summarise Acme Corp"), LLM) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_expired_entries_miss_and_are_evicted(cache, clock):
+    cache.update(prompt("old"), LLM, [Generation(text="old answer")])
+    clock.now += 3601
+
+    assert cache.lookup(prompt("old"), LLM) is None
+    assert cache.evict() == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_drops_least_recently_used_entries_over_the_size_budget(cache, clock):
+    for name in ("a", "b", "c"):
+        cache.update(prompt(name), LLM, [Generation(text=name * 100)])
+        clock.now += 1
+    clock.now += 1
+    assert cache.lookup(prompt("a"), LLM) is not None
+    per_entry = cache.stats()["bytes"] // 3
+    cache.max_bytes = per_entry * 2
+
+    assert cache.evict() == 1
+    assert cache.lookup(prompt("b"), LLM) is None
+    assert cache.lookup(prompt("a"), LLM) is not None
+    assert cache.lookup(prompt("c"), LLM) is not None
+
+
+def test_bypass_skips_lookups_and_writes(cache):
+    cache.update(prompt("q"), LLM, [Generation(text="cached")])
+    with bypass():
+        assert cache.lookup(prompt("q"), LLM) is None
+        cache.update(prompt("other"), LLM, [Generation(text="fresh")])
+
+    assert cache.stats()["bypasses"] == 1
+    assert cache.lookup(prompt("other"), LLM) is None
+
+
+def test_cache_file_is_created_on_first_use(tmp_path):
+    path = tmp_path / "nested" / "llm.sqlite"
+    cache = SQLiteLLMCache(str(path), ttl=3600, max_bytes=1024 * 1024)
+    assert not path.exists()
+
+    assert cache.lookup(prompt("q"), LLM) is None
+    assert path.exists()
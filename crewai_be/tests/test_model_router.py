@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+import model_router as model_router_module
+from database_model import Agent, Crew, CrewAgent, Task, db
+from model_router import ModelRouter, estimate_cost
+
+
+@pytest.fixture
+def router(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'routes.sqlite'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        analyst = Agent(name="analyst", role="Financial Analyst", llm="gpt-4o")
+        writer = Agent(name="writer", role="Report Writer")
+        researcher = Agent(name="researcher", role="Researcher", llm="gpt-4o-mini")
+        crew = Crew(managellm="gpt-3.5-turbo")
+        db.session.add_all([analyst, writer, researcher, crew])
+        db.session.flush()
+        db.session.add_all([
+            CrewAgent(crew_id=crew.id, agent_id=writer.id),
+            Task(name="CompanyCrew.analyze_task", agent_id=analyst.id),
+            Task(name="analyze_task", agent_id=researcher.id),
+            Task(name="report_task", agent_id=writer.id),
+        ])
+        db.session.commit()
+    router = ModelRouter(ttl=60)
+    router.init_app(app)
+    return router
+
+
+def test_estimate_cost_matches_dated_snapshots_by_prefix():
+    assert estimate_cost("gpt-4o-mini", 1_000_000, 1_000_000) == pytest.approx(0.75)
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 1_000_000, 0) == pytest.approx(0.15)
+    assert estimate_cost("claude-unknown", 1000, 1000) is None
+
+
+def test_task_rows_win_over_agent_rows_and_crews_supply_a_fallback_model(router):
+    assert router.resolve("CompanyCrew", "analyze_task", "Researcher") == "gpt-4o"
+    assert router.resolve("IndustryCrew", "analyze_task", "Researcher") == "gpt-4o-mini"
+    assert router.resolve("CompanyCrew", "report_task", "Anyone") == "gpt-3.5-turbo"
+    assert router.resolve("CompanyCrew", "other_task", " Financial Analyst ") == "gpt-4o"
+    assert router.resolve("CompanyCrew", "other_task", "Unknown") is None
+
+
+def test_routes_are_cached_for_the_ttl(router):
+    router.routes()
+    router.routes()
+    assert router.loads == 1
+
+    router.ttl = 0
+    router.routes()
+    assert router.loads == 2
+
+
+def test_apply_switches_only_agents_with_a_different_model(router, monkeypatch):
+    monkeypatch.setattr(model_router_module, "get_llm", lambda model: SimpleNamespace(model_name=model))
+    configured = SimpleNamespace(role="Researcher", llm=SimpleNamespace(model_name="gpt-4"))
+    unconfigured_llm = SimpleNamespace(model_name="gpt-4")
+    unconfigured = SimpleNamespace(role="Unknown", llm=unconfigured_llm)
+
+    router.apply("CompanyCrew", [("analyze_task", SimpleNamespace(agent=configured)),
+                                 ("other_task", SimpleNamespace(agent=unconfigured))])
+
+    assert configured.llm.model_name == "gpt-4o"
+    assert unconfigured.llm is unconfigured_llm
@@ -0,0 +1,98 @@
+import pytest
+import requests
+
+from tools.page_cache import PageCache, normalize_url
+
+
+def extract(html):
+    return html.replace("<p>", "").replace("</p>", "")
+
+
+def serving(html):
+    def fetch(_url):
+        return html
+    return fetch
+
+
+def failing(_url):
+    raise requests.HTTPError("502 Server Error: Bad Gateway")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(str(tmp_path / "pages.sqlite"), ttl=3600, max_age=3600, max_bytes=1024 * 1024)
+
+
+def test_normalize_url_drops_tracking_params_fragments_and_default_ports():
+    assert (normalize_url("HTTPS://Example.com:443/a/?utm_source=x&b=2&a=1#top")
+            == "https://example.com/a?a=1&b=2")
+
+
+def test_fresh_page_is_served_without_fetching(cache):
+    cache.get_page("https://example.com/a?utm_source=x", serving("<p>Q3 revenue</p>"), extract)
+    page = cache.get_page("https://example.com/a", failing, extract)
+
+    assert page.text == "Q3 revenue"
+    assert cache.stats()["hits"] == 1
+
+
+def test_unchanged_page_is_revalidated_without_extracting_again(cache):
+    cache.ttl = 0
+    extracted = []
+
+    def counting_extract(html):
+        extracted.append(html)
+        return extract(html)
+
+    cache.get_page("https://example.com/a", serving("<p>same</p>"), counting_extract)
+    cache.get_page("https://example.com/a", serving("<p>same</p>"), counting_extract)
+    page = cache.get_page("https://example.com/a", serving("<p>new</p>"), counting_extract)
+
+    assert page.text == "new"
+    assert extracted == ["<p>same</p>", "<p>new</p>"]
+    assert cache.stats()["revalidated"] == 1
+    assert cache.stats()["changed"] == 1
+
+
+def test_stale_page_is_served_when_the_fetch_fails(cache):
+    cache.ttl = 0
+    cache.get_page("https://example.com/a", serving("<p>Q3 revenue</p>"), extract)
+    page = cache.get_page("https://example.com/a", failing, extract)
+
+    assert page.text == "Q3 revenue"
+    assert cache.stats()["stale_served"] == 1
+
+
+def test_failed_fetch_without_a_cached_copy_is_not_stored(cache):
+    with pytest.raises(requests.HTTPError):
+        cache.get_page("https://example.com/b", failing, extract)
+
+    assert cache.stats()["pages"] == 0
+    assert cache.get_page("https://example.com/b", serving("<p>ok</p>"), extract).text == "ok"
+
+
+def test_summaries_are_keyed_by_kind_model_and_text(cache):
+    cache.put_summary("chunk", "gpt-4o-mini", "text", "summary")
+
+    assert cache.get_summary("chunk", "gpt-4o-mini", "text") == "summary"
+    assert cache.get_summary("chunk", "gpt-4o", "text") is None
+    assert cache.get_summary("page", "gpt-4o-mini", "text") is None
+
+
+def test_evict_keeps_the_cache_under_its_byte_budget(cache):
+    cache.max_bytes = 400
+    for i in range(6):
+        cache.get_page(f"https://example.com/{i}", serving(f"<p>{i}</p>" + "x" * 50), extract)
+
+    assert cache.evict() > 0
+    assert cache.stats()["bytes"] <= 200
+    assert cache.get_page("https://example.com/5", failing, extract).text.startswith("5")
+
+
+def test_cache_file_is_created_on_first_use(tmp_path):
+    path = tmp_path / "nested" / "pages.sqlite"
+    cache = PageCache(str(path), ttl=3600, max_age=3600, max_bytes=1024 * 1024)
+    assert not path.exists()
+
+    cache.get_page("https://example.com/a", serving("<p>Q3 revenue</p>"), extract)
+    assert path.exists()
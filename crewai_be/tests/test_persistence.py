@@ -0,0 +1,113 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from flask import Flask
+
+import persistence
+from database_model import Job, JobEvent, JobResult, db
+from job_manager import Event, create_job, discard_job, finish_job, set_status
+from persistence import PersistenceWriter, persistence_writer
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'jobs.sqlite'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    # job_manager 的钩子写入全局 persistence_writer，这里不启动后台线程，由测试调用 flush()；
+    # 先清掉其他测试留在队列里的记录
+    persistence_writer.flush()
+    monkeypatch.setattr(persistence_writer, "_app", app)
+    monkeypatch.setattr(persistence, "PERSIST_RETRY_SECONDS", 0)
+    return app
+
+
+@pytest.fixture
+def writer(app):
+    writer = PersistenceWriter(batch_size=100, flush_interval=0.1)
+    writer._app = app
+    return writer
+
+
+def rows(app, *columns):
+    with app.app_context():
+        return db.session.query(*columns).all()
+
+
+def test_finished_job_persists_status_and_result(app):
+    job_id = str(uuid4())
+    create_job(job_id)
+    set_status(job_id, 'STARTED')
+    finish_job(job_id, 'COMPLETE', {"summary": "done"})
+    persistence_writer.flush()
+
+    assert rows(app, Job.job_id, Job.status) == [(job_id, 'COMPLETE')]
+    assert rows(app, JobResult.job_id, JobResult.result) == [(job_id, '{"summary": "done"}')]
+
+
+def test_result_of_a_job_finished_twice_is_updated(writer, app):
+    writer.record_result("job-1", 'ERROR', "first")
+    writer.flush()
+    writer.record_result("job-1", 'COMPLETE', "second")
+    writer.flush()
+
+    assert rows(app, Job.job_id, Job.status) == [("job-1", 'COMPLETE')]
+    assert rows(app, JobResult.job_id, JobResult.result) == [("job-1", '"second"')]
+
+
+def test_discarded_job_leaves_no_rows(app):
+    job_id = str(uuid4())
+    create_job(job_id)
+    persistence_writer.flush()
+    assert rows(app, Job.job_id) == [(job_id,)]
+
+    discard_job(job_id, "Job queue is full, retry later")
+    persistence_writer.flush()
+    assert rows(app, Job.job_id) == []
+
+
+def test_discard_drops_records_still_queued(writer, app):
+    writer.record_status("job-1", 'QUEUED')
+    writer.record_status("job-2", 'QUEUED')
+    writer.record_discard("job-1")
+    writer.flush()
+
+    assert rows(app, Job.job_id) == [("job-2",)]
+
+
+def test_failed_batch_is_retried(writer, app, monkeypatch):
+    apply, failures = writer._apply, []
+
+    def flaky(records):
+        if len(failures) < 2:
+            failures.append(records)
+            raise RuntimeError("database is locked")
+        apply(records)
+
+    monkeypatch.setattr(writer, "_apply", flaky)
+    writer.record_status("job-1", 'QUEUED')
+    writer.record_result("job-1", 'COMPLETE', "report")
+    writer.flush()
+
+    assert len(failures) == 2
+    assert rows(app, Job.job_id, Job.status) == [("job-1", 'COMPLETE')]
+    assert writer.stats()["dropped"] == 0
+
+
+def test_failing_job_does_not_drop_the_rest_of_the_batch(writer, app):
+    event = Event(timestamp=datetime.now(), data="Crew complete", seq=0)
+    writer.record_events("bad", [event])
+    writer.flush()
+    # 重复的 (job_id, seq) 违反唯一约束，整批和 bad 单独写入都会失败
+    writer.record_events("bad", [event])
+    writer.record_status("good", 'COMPLETE')
+    writer.record_result("good", 'COMPLETE', "report")
+    writer.flush()
+
+    assert rows(app, Job.job_id, Job.status) == [("bad", None), ("good", 'COMPLETE')]
+    assert rows(app, JobResult.job_id) == [("good",)]
+    assert rows(app, JobEvent.job_id, JobEvent.seq) == [("bad", 0)]
+    assert writer.stats()["dropped"] == 1
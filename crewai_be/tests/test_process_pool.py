@@ -0,0 +1,47 @@
+import os
+import time
+
+import job_manager
+from process_pool import ProcessJobRunner
+
+
+def crash(_job_id):
+    os._exit(1)
+
+
+def succeed(job_id, result):
+    job_manager.append_event(job_id, "started")
+    job_manager.finish_job(job_id, 'COMPLETE', result)
+
+
+def wait_for_status(job_id, status, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_manager.jobs.get(job_id)
+        if job is not None and job.status == status:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+def test_crashed_worker_marks_the_job_error_and_rebuilds_the_pool():
+    runner = ProcessJobRunner(max_workers=1, max_tasks_per_child=10)
+    job_manager.create_job("pp-crash", status='RUNNING')
+    job_manager.create_job("pp-next", status='RUNNING')
+    try:
+        runner("pp-crash", crash, ())
+
+        job = job_manager.jobs["pp-crash"]
+        assert job.status == 'ERROR'
+        assert job.result == "Worker process exited unexpectedly"
+        assert runner.stats()["pool_restarts"] == 1
+
+        # 新建的进程池还能继续跑任务，子进程里的状态变更会转发回来
+        runner("pp-next", succeed, ("done",))
+        job = wait_for_status("pp-next", 'COMPLETE')
+        assert job.result == "done"
+        assert runner.stats()["pool_restarts"] == 1
+    finally:
+        runner._pool.shutdown(wait=True)
+        job_manager.discard_job("pp-crash")
+        job_manager.discard_job("pp-next")
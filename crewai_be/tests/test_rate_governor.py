@@ -0,0 +1,113 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+import rate_governor
+from llm_registry import ClientRegistry
+from rate_governor import RateGovernor, Upstream, _seconds, estimate_tokens
+from utils.http import GovernedTransport
+
+
+def response(status, **headers):
+    return SimpleNamespace(status_code=status, close=lambda: None,
+                           headers=CaseInsensitiveDict({key.replace('_', '-'): value
+                                                        for key, value in headers.items()}))
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_parses_the_reset_formats_upstreams_send():
+    assert _seconds("20") == 20
+    assert _seconds("6m0s") == 360
+    assert _seconds("1.5s") == 1.5
+    assert _seconds("250ms") == 0.25
+    assert _seconds("soon") is None
+    assert estimate_tokens(b'{"max_tokens": 100, "messages": []}') == 35 // 4 + 100
+
+
+def test_jobs_take_turns_instead_of_queueing_behind_a_burst(monkeypatch):
+    # 桶容量为 1、每 0.05 秒补充一次，放行顺序就是排队的轮转顺序
+    monkeypatch.setattr(rate_governor, "RATE_LIMIT_BURST_SECONDS", 0.05)
+    upstream = Upstream("serper", rpm=1200)
+    upstream.requests.level = 0.0
+    granted = []
+
+    def call(job):
+        upstream.acquire(job)
+        granted.append(job)
+
+    threads = []
+    for job in ["A", "A", "A", "B"]:
+        thread = threading.Thread(target=call, args=(job,))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: sum(len(queue) for queue in upstream._waiting.values()) + len(granted) == len(threads))
+    for thread in threads:
+        thread.join(5)
+
+    assert granted == ["A", "B", "A", "A"]
+    assert upstream.stats()["granted"] == 4
+
+
+def test_429_pauses_the_upstream_halves_the_rate_and_retries():
+    governor = RateGovernor({"openai": {"rpm": 600}}, {"api.openai.com": "openai"})
+    responses = iter([response(429, retry_after_ms="100"), response(200)])
+    sent = []
+
+    def send():
+        sent.append(time.monotonic())
+        return next(responses)
+
+    result = governor.call("https://api.openai.com/v1/chat/completions", send)
+
+    assert result.status_code == 200
+    assert sent[1] - sent[0] >= 0.09
+    assert governor.retries == 1
+    stats = governor.stats()["upstreams"]["openai"]
+    assert stats["throttled"] == 1
+    assert stats["scale"] == pytest.approx(0.5 + 0.02)
+
+
+def test_gives_up_after_the_retry_limit(monkeypatch):
+    monkeypatch.setattr(rate_governor, "RATE_LIMIT_MAX_RETRIES", 1)
+    governor = RateGovernor({"serper": {"rpm": 600}}, {"google.serper.dev": "serper"})
+    calls = []
+
+    def send():
+        calls.append(1)
+        return response(429, retry_after="0")
+
+    assert governor.call("https://google.serper.dev/search", send).status_code == 429
+    assert len(calls) == 2
+
+
+def test_unknown_hosts_are_not_governed():
+    governor = RateGovernor({"serper": {"rpm": 1}}, {"google.serper.dev": "serper"})
+
+    assert governor.call("https://example.com/", lambda: response(429)).status_code == 429
+    assert governor.retries == 0
+
+
+def test_remaining_quota_headers_pause_until_the_reset():
+    upstream = Upstream("openai", rpm=600, tpm=10000)
+    upstream.observe(200, CaseInsensitiveDict({"x-ratelimit-remaining-requests": "0",
+                                               "x-ratelimit-reset-requests": "2s"}), 0)
+
+    assert upstream.requests.level == 0
+    assert upstream.stats()["blocked_for"] > 1.5
+
+
+def test_pooled_openai_client_leaves_retries_to_the_governed_transport(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    client = ClientRegistry()._openai_client()
+
+    assert client.max_retries == 0
+    assert isinstance(client._client._transport, GovernedTransport)
@@ -0,0 +1,71 @@
+import json
+import time
+
+from coalescer import analysis_key
+from result_cache import ResultCache
+from utils.cache import TTLCache
+
+
+def test_ttl_cache_expires_entries_and_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+    cache.set("old", 4, stored_at=time.time() - 120)
+    assert cache.get("old") is None
+    cache.set("recent", 5, stored_at=time.time() - 30)
+    assert cache.get("recent", max_age=10) is None
+    assert cache.get("recent") == 5
+
+
+def test_lookup_caps_max_age_at_the_intent_ttl():
+    cache = ResultCache(maxsize=8, ttls={'trip': 60})
+    cache._memory.set("k", "{}", stored_at=time.time() - 120)
+
+    assert cache.lookup("k", 'trip', max_age=3600) is None
+
+    cache.store("k", 'trip', '{"plan": 1}')
+    result, age = cache.lookup("k", 'trip', max_age=3600)
+    assert result == '{"plan": 1}'
+    assert age < 5
+
+
+def test_only_completed_json_results_are_cached(app):
+    cache = ResultCache(maxsize=8, ttls={'company': 3600})
+    cache.init_app(app)
+    for job_id, status, result in [("j-ok", 'COMPLETE', '{"report": 1}'),
+                                   ("j-text", 'COMPLETE', "Error: rate limited"),
+                                   ("j-err", 'ERROR', '{"report": 2}')]:
+        cache.track(job_id, f"key-{job_id}", 'company')
+        cache._on_finish(job_id, status, result)
+
+    assert cache.lookup("key-j-ok", 'company', 60)[0] == '{"report": 1}'
+    assert cache.lookup("key-j-text", 'company', 60) is None
+    assert cache.lookup("key-j-err", 'company', 60) is None
+
+    # 内存层清空后还能从数据库读回来
+    cache._memory.clear()
+    assert cache.lookup("key-j-ok", 'company', 60)[0] == '{"report": 1}'
+    assert cache.db_hits == 1
+
+
+def test_trip_request_with_max_age_is_served_from_the_cache(client):
+    import api
+    key = analysis_key('trip', '|'.join(["Paris", "Rome", "May", "food"]))
+    api.result_cache.store(key, 'trip', json.dumps({"days": 3}))
+    payload = {"travel_from": ["Paris"], "travel_to": ["Rome"], "date": ["May"], "hobby": ["food"]}
+
+    response = client.post('/api/crew-trip', json={**payload, "max_age": 600})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["cached"] is True
+    assert body["status"] == "COMPLETE"
+    assert body["result"] == {"days": 3}
+    assert client.get(f"/api/crew/{body['job_id']}").get_json()["status"] == "COMPLETE"
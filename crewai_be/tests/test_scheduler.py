@@ -0,0 +1,79 @@
+from threading import Event
+
+import pytest
+
+from job_manager import jobs
+from scheduler import JobScheduler, QueueFullError
+
+
+def blocking_job():
+    started, release = Event(), Event()
+
+    def target(_job_id):
+        started.set()
+        release.wait(5)
+    return target, started, release
+
+
+def full_scheduler():
+    """A scheduler with its only worker busy and its one queue slot taken."""
+    scheduler = JobScheduler(max_workers=1, max_queue=1)
+    target, started, release = blocking_job()
+    scheduler.submit("running", target)
+    assert started.wait(5)
+    scheduler.submit("waiting", target)
+    return scheduler, release
+
+
+def test_submit_to_a_full_queue_raises_with_retry_after():
+    scheduler, release = full_scheduler()
+    try:
+        with pytest.raises(QueueFullError) as raised:
+            scheduler.submit("rejected", lambda _job_id: None)
+    finally:
+        release.set()
+
+    # 还没有完成过任务时按默认的 30 秒估算
+    assert raised.value.retry_after == 30
+    stats = scheduler.stats()
+    assert stats["submitted"] == 2 and stats["rejected"] == 1
+
+
+def test_retry_after_follows_the_average_job_duration():
+    scheduler = JobScheduler(max_workers=2, max_queue=4)
+    for n in range(3):
+        scheduler.submit(f"quick-{n}", lambda _job_id: None)
+    scheduler._queue.join()
+
+    assert scheduler.stats()["completed"] == 3
+    assert scheduler.retry_after() == 1
+
+
+def test_failing_job_does_not_stop_the_worker():
+    scheduler = JobScheduler(max_workers=1, max_queue=4)
+    done = Event()
+
+    def fail(_job_id):
+        raise RuntimeError("crew crashed")
+
+    scheduler.submit("failing", fail)
+    scheduler.submit("next", lambda _job_id: done.set())
+
+    assert done.wait(5)
+
+
+def test_api_answers_429_with_retry_after_when_the_queue_is_full(client, monkeypatch):
+    import api
+    scheduler, release = full_scheduler()
+    monkeypatch.setattr(api, "scheduler", scheduler)
+    known = set(jobs)
+    try:
+        response = client.post('/api/crew', json={"companies": ["Acme"], "positions": ["CEO"]})
+    finally:
+        release.set()
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == "30"
+    assert response.get_json()["retry_after"] == 30
+    # 被拒绝的任务不留在内存里
+    assert set(jobs) == known
@@ -0,0 +1,35 @@
+import json
+from types import SimpleNamespace
+
+import llm_cache
+import tools.search_client as search_client_module
+from tools.search_client import SerperClient
+from utils import cache as tool_cache
+
+ORGANIC = {"organic": [{"title": "Tesla 10-K", "link": "https://ir.tesla.com/10k", "snippet": "Annual report"}]}
+
+
+class FakeSession:
+    def __init__(self):
+        self.queries = []
+
+    def post(self, _url, data, **_kwargs):
+        self.queries.append(json.loads(data)["q"])
+        return SimpleNamespace(status_code=200, json=lambda: ORGANIC)
+
+
+def test_tool_cache_bypass_searches_again_and_refreshes_the_cache(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(search_client_module, "get_session", lambda: session)
+    monkeypatch.setenv("SERPER_API_KEY", "test")
+    client = SerperClient(ttl=3600, maxsize=8)
+
+    client.search("Tesla revenue")
+    # 只跳过 LLM 缓存时搜索结果照常命中
+    with llm_cache.bypass():
+        client.search("tesla revenue")
+    with tool_cache.bypass():
+        client.search("tesla revenue")
+    assert client.search("Tesla  Revenue") == ORGANIC
+
+    assert session.queries == ["Tesla revenue", "tesla revenue"]
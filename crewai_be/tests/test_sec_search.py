@@ -0,0 +1,115 @@
+import json
+from html import escape
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import llm_cache
+import tools.sec_search as sec_search_module
+from tools.sec_search import SecSearchClient, format_results, parse_results
+from utils import cache as tool_cache
+
+PROPS_PAGE = """<html><body><div data-react-props="{props}"></div></body></html>""".format(props=escape(json.dumps({
+    "results": [
+        {"title": "Acme Corp Form 10-K", "url": "https://www.sec.gov/acme-10k.htm",
+         "description": "Annual report  for fiscal 2023", "publishedAt": "2024-02-01"},
+        {"title": "Acme Corp 10-K (duplicate)", "url": "https://www.sec.gov/acme-10k.htm", "description": ""},
+        {"title": "Next page", "url": "https://secsearch.sec.gov/search?page=2"},
+    ],
+})))
+
+BLOCKS_PAGE = """<html><body>
+<div class="content-block-item result">
+  <h4><a href="/cgi-bin/browse-edgar?company=acme">Acme filings</a></h4>
+  <p class="description">Mar 3, 2024 - Quarterly report of Acme Corp.</p>
+</div>
+<div class="result"><a href="https://www.sec.gov/news/acme">Acme in the news</a>
+  <span class="snippet">{long}</span><time datetime="2023-12-01">Dec 1</time></div>
+<div class="result"><a href="#"></a></div>
+</body></html>""".format(long="word " * 200)
+
+
+def test_parses_the_react_props_and_drops_duplicates_and_search_links():
+    results = parse_results(PROPS_PAGE)
+
+    assert [(result.title, result.url, result.date) for result in results] == [
+        ("Acme Corp Form 10-K", "https://www.sec.gov/acme-10k.htm", "2024-02-01")]
+    assert results[0].snippet == "Annual report for fiscal 2023"
+
+
+def test_falls_back_to_server_rendered_result_blocks():
+    results = parse_results(BLOCKS_PAGE, "https://secsearch.sec.gov/search?query=acme")
+
+    # 相对链接按搜索页地址补全后指回搜索站本身，不算结果
+    assert [result.url for result in results] == ["https://www.sec.gov/news/acme"]
+    news = results[0]
+    assert news.date == "2023-12-01"
+    assert news.snippet.endswith(" ...")
+    assert len(news.snippet) <= sec_search_module.SEC_SNIPPET_CHARS + 4
+
+
+def test_empty_page_has_no_results():
+    assert parse_results("") == []
+    assert parse_results("   \n") == []
+    assert parse_results("<!-- no results -->") == []
+    assert parse_results('<?xml version="1.0" encoding="utf-8"?><html><body></body></html>') == []
+
+
+def test_format_numbers_results_with_their_dates():
+    results = parse_results(PROPS_PAGE)
+
+    assert format_results(results) == ("1. Acme Corp Form 10-K (2024-02-01)\n"
+                                       "   https://www.sec.gov/acme-10k.htm\n"
+                                       "   Annual report for fiscal 2023")
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(kwargs["params"]["query"])
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return SimpleNamespace(text=response, content=response.encode(), url=url, raise_for_status=lambda: None)
+
+
+def test_results_are_cached_per_normalized_query_and_served_stale_on_errors(monkeypatch):
+    session = FakeSession(PROPS_PAGE, requests.ConnectionError("down"))
+    monkeypatch.setattr(sec_search_module, "get_session", lambda: session)
+    client = SecSearchClient(ttl=3600, maxsize=8, stale=3600)
+
+    first = client.search("Acme  10-K")
+    assert client.search("acme 10-k") == first
+    assert session.calls == ["Acme  10-K"]
+
+    client.ttl = 0
+    assert client.search("acme 10-k") == first
+    assert client.stats()["stale_served"] == 1
+
+
+def test_failure_without_a_cached_copy_raises(monkeypatch):
+    monkeypatch.setattr(sec_search_module, "get_session", lambda: FakeSession(requests.ConnectionError("down")))
+    client = SecSearchClient(ttl=3600, maxsize=8)
+
+    with pytest.raises(requests.ConnectionError):
+        client.search("acme")
+    assert client.stats()["errors"] == 1
+
+
+def test_tool_cache_bypass_searches_again_and_refreshes_the_cache(monkeypatch):
+    session = FakeSession(PROPS_PAGE, PROPS_PAGE)
+    monkeypatch.setattr(sec_search_module, "get_session", lambda: session)
+    client = SecSearchClient(ttl=3600, maxsize=8)
+
+    client.search("Acme 10-K")
+    with llm_cache.bypass():
+        client.search("acme 10-k")
+    with tool_cache.bypass():
+        client.search("acme 10-k")
+    client.search("Acme 10-K")
+
+    assert session.calls == ["Acme 10-K", "acme 10-k"]
@@ -0,0 +1,27 @@
+import api
+
+
+def test_stats_collects_every_component(client):
+    body = client.get('/api/stats').get_json()
+
+    assert set(body) == set(api.STATS_SOURCES)
+    assert body["scheduler"]["queue_capacity"] > 0
+    assert body["llm_cache"]["enabled"] is True
+
+
+def test_component_filter_and_unknown_components(client):
+    body = client.get('/api/stats', query_string={"component": "tool_memo,jobs"}).get_json()
+
+    assert set(body) == {"tool_memo", "jobs"}
+    assert client.get('/api/stats', query_string={"component": "tool_memo,nope"}).status_code == 400
+
+
+def test_failing_component_does_not_hide_the_others(client, monkeypatch):
+    def broken():
+        raise RuntimeError("database is locked")
+    monkeypatch.setitem(api.STATS_SOURCES, "llm_cache", broken)
+
+    body = client.get('/api/stats', query_string={"component": "llm_cache,tool_memo"}).get_json()
+
+    assert body["llm_cache"] == {"error": "database is locked"}
+    assert "calls" in body["tool_memo"]
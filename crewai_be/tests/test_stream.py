@@ -0,0 +1,59 @@
+import json
+import threading
+
+import job_manager
+
+
+def parse_sse(body):
+    messages = []
+    for block in body.strip().split("\n\n"):
+        fields = {}
+        for line in block.split("\n"):
+            name, _, value = line.partition(": ")
+            fields[name] = value
+        if "data" in fields:
+            fields["data"] = json.loads(fields["data"])
+            messages.append(fields)
+    return messages
+
+
+def test_stream_resumes_after_last_event_id(client):
+    job_manager.create_job("sse-resume", status='RUNNING')
+    for step in ("one", "two", "three"):
+        job_manager.append_event("sse-resume", step)
+    job_manager.finish_job("sse-resume", 'COMPLETE', '{"ok": true}')
+
+    response = client.get('/api/crew/sse-resume/stream', headers={'Last-Event-ID': '0'})
+
+    assert response.mimetype == 'text/event-stream'
+    messages = parse_sse(response.get_data(as_text=True))
+    progress = [m for m in messages if m.get("event") == "progress"]
+    assert [m["id"] for m in progress] == ["1", "2", "3"]
+    assert [m["data"]["data"] for m in progress] == ["two", "three", "Crew complete"]
+    assert messages[-1]["event"] == "result"
+    assert messages[-1]["data"] == {"job_id": "sse-resume", "status": "COMPLETE", "result": {"ok": True}}
+
+
+def test_stream_pushes_events_as_they_are_appended(client):
+    job_manager.create_job("sse-live", status='RUNNING')
+
+    def run():
+        job_manager.append_event("sse-live", "working")
+        job_manager.finish_job("sse-live", 'ERROR', "boom")
+
+    timer = threading.Timer(0.2, run)
+    timer.start()
+    response = client.get('/api/crew/sse-live/stream')
+    messages = parse_sse(response.get_data(as_text=True))
+    timer.join()
+
+    assert [m["data"]["data"] for m in messages if m.get("event") == "progress"] == ["working"]
+    assert messages[-1]["data"]["status"] == "ERROR"
+    assert messages[-1]["data"]["result"] == "boom"
+
+
+def test_stream_rejects_unknown_jobs_and_bad_event_ids(client):
+    assert client.get('/api/crew/missing/stream').status_code == 404
+    job_manager.create_job("sse-bad-id", status='RUNNING')
+    response = client.get('/api/crew/sse-bad-id/stream', headers={'Last-Event-ID': 'abc'})
+    assert response.status_code == 400
@@ -0,0 +1,102 @@
+import threading
+import time
+from uuid import uuid4
+
+import pytest
+
+import usage
+from job_manager import create_job, get_snapshot
+from tool_deadline import ToolDeadlines, with_deadline
+
+
+def no_abandoned_calls(deadlines):
+    # 被放弃的调用在后台返回后才会从计数里减掉
+    for _ in range(100):
+        if deadlines.stats()["abandoned"] == 0:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def job_id():
+    job_id = str(uuid4())
+    create_job(job_id, status='RUNNING')
+    return job_id
+
+
+def test_call_within_the_deadline_returns_the_result_and_charges_the_job(job_id):
+    deadlines = ToolDeadlines(default=5, deadlines={}, budget=60)
+
+    assert deadlines.call(job_id, "search", lambda query: f"results for {query}", ("acme",), {}) == "results for acme"
+    assert 0 <= deadlines._spent.get(job_id) < 1
+    assert deadlines.stats()["timeouts"] == 0
+
+
+def test_slow_call_is_abandoned_at_its_deadline_and_charged_the_wait(job_id):
+    deadlines = ToolDeadlines(default=5, deadlines={"scrape": 0.1}, budget=60)
+    release = threading.Event()
+
+    answer = deadlines.call(job_id, "scrape", release.wait, (5,), {})
+
+    assert "did not answer within" in answer
+    assert deadlines.stats()["timeouts"] == 1
+    assert get_snapshot(job_id).events[-1].data.startswith("scrape did not answer")
+    assert deadlines.stats()["abandoned"] == 1
+    assert 0.1 <= deadlines._spent.get(job_id) < 1
+    release.set()
+    assert no_abandoned_calls(deadlines)
+
+
+def test_queued_call_is_cancelled_at_its_deadline(job_id):
+    deadlines = ToolDeadlines(default=0.1, deadlines={}, budget=60, max_workers=1)
+    release = threading.Event()
+    calls = []
+
+    deadlines.call(job_id, "scrape", release.wait, (5,), {})
+    deadlines.call(job_id, "search", calls.append, ("acme",), {})
+    release.set()
+    deadlines._pool.shutdown(wait=True)
+
+    assert calls == []
+    assert deadlines.stats()["timeouts"] == 2 and deadlines.stats()["abandoned"] == 0
+
+
+def test_calls_are_refused_while_too_many_abandoned_calls_are_running(job_id):
+    deadlines = ToolDeadlines(default=0.1, deadlines={}, budget=60, max_abandoned=1)
+    release = threading.Event()
+    calls = []
+
+    deadlines.call(job_id, "scrape", release.wait, (5,), {})
+    answer = deadlines.call(job_id, "search", calls.append, ("acme",), {})
+
+    assert "temporarily unavailable" in answer
+    assert calls == [] and deadlines.stats()["rejected"] == 1
+    release.set()
+    assert no_abandoned_calls(deadlines)
+    deadlines.call(job_id, "search", calls.append, ("acme",), {})
+    assert calls == ["acme"]
+
+
+def test_spent_budget_skips_further_calls_until_the_job_finishes(job_id):
+    deadlines = ToolDeadlines(default=5, deadlines={}, budget=30)
+    deadlines._charge(job_id, 29.5)
+    calls = []
+
+    answer = deadlines.call(job_id, "search", calls.append, ("acme",), {})
+
+    assert "used up its time budget" in answer
+    assert calls == []
+    assert deadlines.stats()["over_budget"] == 1
+    deadlines.release(job_id, 'COMPLETE', '')
+    deadlines.call(job_id, "search", calls.append, ("acme",), {})
+    assert calls == ["acme"]
+
+
+def test_calls_outside_a_job_run_inline():
+    thread_names = []
+    wrapped = with_deadline("search", lambda: thread_names.append(threading.current_thread().name))
+
+    assert usage.current() is None
+    wrapped()
+    assert thread_names == [threading.current_thread().name]
@@ -0,0 +1,48 @@
+from tool_memo import ToolFailure, ToolMemo
+
+
+def counting(answer):
+    calls = []
+
+    def tool(query):
+        calls.append(query)
+        return answer
+    return tool, calls
+
+
+def test_repeated_call_is_served_from_the_memo():
+    memo = ToolMemo(ttl=60, max_entries=10)
+    tool, calls = counting("Title: Tesla 10-K")
+
+    assert memo.call("job", "Search the internet", tool, ("Tesla revenue",), {}) == "Title: Tesla 10-K"
+    assert memo.call("job", "Search the internet", tool, ("tesla  revenue?",), {}) == "Title: Tesla 10-K"
+    assert calls == ["Tesla revenue"]
+
+
+def test_failure_answers_are_not_memoized():
+    memo = ToolMemo(ttl=60, max_entries=10)
+    tool, calls = counting(ToolFailure("Sorry, the search failed (ReadTimeout), please try again."))
+
+    memo.call("job", "Search the internet", tool, ("Tesla revenue",), {})
+    memo.call("job", "Search the internet", tool, ("Tesla revenue",), {})
+    assert len(calls) == 2
+
+
+def test_only_search_queries_are_normalized():
+    memo = ToolMemo(ttl=60, max_entries=10)
+    tool, calls = counting("6")
+    keywords = []
+
+    def search_videos(keyword, max_results):
+        keywords.append(keyword)
+        return [f"video {i}" for i in range(max_results)]
+
+    memo.call("job", "Make a calculation", tool, ("2*3",), {})
+    memo.call("job", "Make a calculation", tool, ("2 * 3",), {})
+    memo.call("job", "Scrape website content", tool, ("https://Example.com/a?utm_source=x",), {})
+    memo.call("job", "Scrape website content", tool, ("https://example.com/a",), {})
+    memo.call("job", "Search YouTube Videos", search_videos, (), {"keyword": "Tesla Q3", "max_results": 2})
+    memo.call("job", "Search YouTube Videos", search_videos, (), {"keyword": "tesla  q3", "max_results": 2})
+
+    assert calls == ["2*3", "2 * 3", "https://Example.com/a?utm_source=x"]
+    assert keywords == ["Tesla Q3"]
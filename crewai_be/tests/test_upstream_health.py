@@ -0,0 +1,80 @@
+import importlib
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import upstream_health as upstream_health_module
+from upstream_health import HealthMonitor, UpstreamUnavailable
+
+SERPER = "https://google.serper.dev/search"
+
+
+def response(status):
+    return SimpleNamespace(status_code=status, close=lambda: None)
+
+
+@pytest.fixture
+def monitor():
+    monitor = HealthMonitor()
+    yield monitor
+    monitor._pool.shutdown(wait=True)
+
+
+def test_breaker_opens_after_consecutive_failures_and_closes_after_a_good_probe(monitor, monkeypatch):
+    monkeypatch.setattr(upstream_health_module, "BREAKER_FAILURES", 2)
+    monkeypatch.setattr(upstream_health_module, "BREAKER_OPEN_SECONDS", 0.1)
+    for _ in range(2):
+        assert monitor.call(SERPER, lambda: response(503)).status_code == 503
+
+    sent = []
+    with pytest.raises(UpstreamUnavailable):
+        monitor.call(SERPER, lambda: sent.append(1))
+    assert sent == []
+    assert monitor.stats()["serper"]["state"] == "open"
+
+    time.sleep(0.15)
+    assert monitor.call(SERPER, lambda: response(200)).status_code == 200
+    stats = monitor.stats()["serper"]
+    assert stats["state"] == "closed" and stats["opened"] == 1 and stats["rejected"] == 1
+
+
+def test_slow_call_is_hedged_and_the_faster_copy_wins(monitor, monkeypatch):
+    monkeypatch.setattr(upstream_health_module, "HEDGE_MIN_DELAY", 0.05)
+    health = monitor.upstream(SERPER)
+    for _ in range(20):
+        health.record(0.01, ok=True)
+    attempts = []
+
+    def send():
+        attempts.append(1)
+        if len(attempts) == 1:
+            time.sleep(1)
+            return response(504)
+        return response(200)
+
+    # 对冲路径里延迟导入 usage，先导入，免得导入耗时算进请求延迟
+    importlib.import_module("usage")
+    started = time.monotonic()
+    assert monitor.call(SERPER, send).status_code == 200
+    assert time.monotonic() - started < 0.5
+    stats = monitor.stats()["serper"]
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_hedging_waits_for_enough_latency_samples(monitor):
+    attempts = []
+
+    def send():
+        attempts.append(1)
+        return response(200)
+
+    monitor.call(SERPER, send)
+    assert attempts == [1]
+    assert monitor.stats()["serper"]["hedges"] == 0
+
+
+def test_hosts_without_a_breaker_pass_straight_through(monitor):
+    assert monitor.upstream("https://api.openai.com/v1/chat/completions") is None
+    assert monitor.call("https://example.com/", lambda: response(500)).status_code == 500
+    assert monitor.stats() == {}
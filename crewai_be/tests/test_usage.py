@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from langchain.tools import Tool
+from langchain_core.outputs import LLMResult
+
+import usage
+from usage import attach, tracker
+
+
+def lookup(query):
+    if query == "fail":
+        raise RuntimeError("upstream down")
+    return f"results for {query}"
+
+
+def make_crew():
+    task = SimpleNamespace(description="Research Acme\nLook at filings", tools=None)
+    agent = SimpleNamespace(role="Researcher", llm=SimpleNamespace(), agent_executor=SimpleNamespace(task=task),
+                            tools=[Tool(name="search", func=lookup, description="search the web")])
+    return SimpleNamespace(agents=[agent], tasks=[task])
+
+
+def llm_result(prompt_tokens=None, completion_tokens=None):
+    llm_output = {"model_name": "gpt-4o-mini"}
+    if prompt_tokens is not None:
+        llm_output["token_usage"] = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+    return LLMResult(generations=[], llm_output=llm_output)
+
+
+def test_llm_tool_and_task_usage_is_charged_to_the_job(client):
+    job_id = str(uuid4())
+    crew = make_crew()
+    attach(job_id, "company", crew)
+    agent = crew.agents[0]
+    handler = agent.callbacks[0]
+
+    chain_run = uuid4()
+    handler.on_chain_start({}, {}, run_id=chain_run)
+    assert usage.current().job_id == job_id
+    for tokens in ((120, 30), (None, None)):
+        llm_run = uuid4()
+        handler.on_chat_model_start({}, [], run_id=llm_run, invocation_params={"model_name": "gpt-4o-mini"})
+        handler.on_llm_end(llm_result(*tokens), run_id=llm_run)
+    assert agent.tools[0].func("acme") == "results for acme"
+    with pytest.raises(RuntimeError):
+        agent.tools[0].func("fail")
+    handler.on_chain_end({}, run_id=chain_run)
+    assert usage.current() is None
+
+    breakdown = tracker.get(job_id)
+    totals = breakdown["totals"]
+    assert totals["llm_calls"] == 2 and totals["cached_llm_calls"] == 1
+    assert totals["prompt_tokens"] == 120 and totals["total_tokens"] == 150
+    assert totals["tool_calls"] == 2 and totals["tool_errors"] == 1
+    assert breakdown["tasks"][0]["task"] == "Research Acme"
+    assert breakdown["tasks"][0]["runs"] == 1
+    assert breakdown["agents"]["Researcher"]["llm_calls"] == 2
+    assert breakdown["tools"]["search"]["calls"] == 2
+
+    response = client.get(f'/api/jobs/{job_id}/usage')
+    assert response.status_code == 200
+    assert response.get_json()["crew"] == "company"
+    assert client.get(f'/api/jobs/{uuid4()}/usage').status_code == 404
+
+
+def test_tool_calls_outside_a_job_are_not_recorded():
+    tool = usage.instrument_tools([Tool(name="search", func=lookup, description="search the web")])[0]
+    before = tracker._jobs.stats()["size"]
+
+    assert tool.func("acme") == "results for acme"
+    assert tracker._jobs.stats()["size"] == before
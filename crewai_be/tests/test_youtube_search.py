@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+import llm_cache
+import tools.youtube_search_tools as youtube_module
+from tools.youtube_search_tools import YoutubeSearchClient
+from utils import cache as tool_cache
+
+ITEMS = {"items": [{"id": {"videoId": "abc"}, "snippet": {"title": "Tesla Q3 earnings call"}}]}
+
+
+class FakeSession:
+    def __init__(self):
+        self.keywords = []
+
+    def get(self, _url, params, **_kwargs):
+        self.keywords.append(params["q"])
+        return SimpleNamespace(status_code=200, json=lambda: ITEMS, raise_for_status=lambda: None)
+
+
+def test_tool_cache_bypass_searches_again_and_refreshes_the_cache(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(youtube_module, "get_session", lambda: session)
+    client = YoutubeSearchClient(ttl=3600, maxsize=8)
+
+    client.search("Tesla Q3", 5)
+    # 只跳过 LLM 缓存时搜索结果照常命中，不再消耗配额
+    with llm_cache.bypass():
+        client.search("tesla q3", 5)
+    with tool_cache.bypass():
+        client.search("tesla q3", 5)
+    videos = client.search("Tesla  Q3", 5)
+
+    assert videos == [{"title": "Tesla Q3 earnings call", "video_url": "https://www.youtube.com/watch?v=abc"}]
+    assert session.keywords == ["Tesla Q3", "tesla q3"]
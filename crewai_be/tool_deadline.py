@@ -0,0 +1,147 @@
+import contextvars
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from threading import Lock
+
+from job_manager import append_event, on_finish
+from utils.cache import TTLCache
+from utils.logging import logger
+
+# 单次工具调用的最长等待时间（秒）；抓取网页和 SEC 文件要逐段调用 LLM 总结，单独放宽
+TOOL_CALL_DEADLINE = float(os.getenv("TOOL_CALL_DEADLINE_SECONDS", "120"))
+DEFAULT_TOOL_DEADLINES = {"Scrape website content": 300, "Search on authoritative websites": 300}
+# 一个任务里所有工具调用合计可用的时间（秒），用完后工具直接返回降级结果
+TOOL_JOB_BUDGET = float(os.getenv("TOOL_JOB_BUDGET_SECONDS", "1800"))
+# 运行工具调用的共享线程数
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "32"))
+# 超时后仍在后台运行的调用最多这么多个，超过后新调用直接返回降级结果，给正常的调用留出线程
+TOOL_MAX_ABANDONED = int(os.getenv("TOOL_MAX_ABANDONED", "16"))
+
+
+def _load_deadlines() -> dict:
+    deadlines = dict(DEFAULT_TOOL_DEADLINES)
+    try:
+        deadlines.update(json.loads(os.getenv("TOOL_DEADLINES") or "{}"))
+    except ValueError as e:
+        logger.error(f"Ignoring invalid TOOL_DEADLINES: {e}")
+    return deadlines
+
+
+class ToolDeadlines:
+    """Per-call deadlines and a per-job time budget for tool calls.
+
+    Tools run on a shared bounded thread pool; when the deadline passes the
+    agent gets a short explanation instead of the result and the crew moves
+    on. A call still queued is cancelled; one already running cannot be
+    interrupted, so it is abandoned and finishes (or times out at the HTTP
+    layer) in the background, holding a worker until then. While
+    `max_abandoned` calls are stuck like that, new calls are answered
+    without running.
+
+    The job is charged the time it waited for each call, so an abandoned
+    call costs its deadline and the time it keeps running afterwards is not
+    charged. Once the job's budget is spent further tool calls are answered
+    without running.
+    """
+
+    def __init__(self, default: float, deadlines: dict, budget: float,
+                 max_workers: int = TOOL_MAX_WORKERS, max_abandoned: int = TOOL_MAX_ABANDONED):
+        self.default = default
+        self.deadlines = deadlines
+        self.budget = budget
+        self.max_abandoned = max_abandoned
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._spent = TTLCache(maxsize=10000, ttl=24 * 3600)
+        self._lock = Lock()
+        self.calls = 0
+        self.timeouts = 0
+        self.over_budget = 0
+        self.abandoned = 0
+        self.rejected = 0
+
+    def deadline(self, tool: str) -> float:
+        return float(self.deadlines.get(tool, self.default))
+
+    def _charge(self, job_id: str, seconds: float):
+        with self._lock:
+            self._spent.set(job_id, self._spent.get(job_id, 0.0) + seconds)
+
+    def call(self, job_id: str, tool: str, func, args: tuple, kwargs: dict):
+        self.calls += 1
+        remaining = self.budget - self._spent.get(job_id, 0.0)
+        # 剩余不到一秒时不再启动工具
+        if remaining < 1:
+            self.over_budget += 1
+            append_event(job_id, f"Skipped {tool}: the job's tool time budget of {self.budget:.0f}s is used up")
+            return (f"The {tool} tool is unavailable: this job has used up its time budget for tools. "
+                    "Continue with the information you already have.")
+        if self.abandoned >= self.max_abandoned:
+            self.rejected += 1
+            append_event(job_id, f"Skipped {tool}: {self.abandoned} earlier tool calls are still running "
+                                 "past their deadline")
+            return (f"The {tool} tool is temporarily unavailable. Continue with the information you already "
+                    "have, or try again later.")
+        deadline = min(self.deadline(tool), remaining)
+
+        # 延迟导入：usage 依赖本模块
+        from usage import bind
+        started = time.monotonic()
+        future = self._pool.submit(contextvars.copy_context().run, bind(func), *args, **kwargs)
+        try:
+            return future.result(timeout=deadline)
+        except TimeoutError:
+            self.timeouts += 1
+            # 还在排队的直接取消；已经开始的无法中断，记为放弃的调用，直到它返回
+            if not future.cancel():
+                with self._lock:
+                    self.abandoned += 1
+                future.add_done_callback(self._abandoned_done)
+            append_event(job_id, f"{tool} did not answer within {deadline:.0f}s, moving on without it")
+            return (f"The {tool} tool did not answer within {deadline:.0f} seconds. Continue with the "
+                    "information you already have, or try again later with a different input.")
+        finally:
+            self._charge(job_id, time.monotonic() - started)
+
+    def _abandoned_done(self, _future):
+        with self._lock:
+            self.abandoned -= 1
+
+    def release(self, job_id: str, *_):
+        self._spent.pop(job_id)
+
+    def stats(self) -> dict:
+        return {
+            "default_deadline": self.default,
+            "deadlines": self.deadlines,
+            "job_budget": self.budget,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "over_budget": self.over_budget,
+            "abandoned": self.abandoned,
+            "max_abandoned": self.max_abandoned,
+            "rejected": self.rejected,
+        }
+
+
+tool_deadlines = ToolDeadlines(TOOL_CALL_DEADLINE, _load_deadlines(), TOOL_JOB_BUDGET)
+on_finish(tool_deadlines.release)
+
+
+def with_deadline(name: str, func):
+    """Wrap a tool function so calls made for a job obey the tool's deadline and the job's budget."""
+    if getattr(func, '_tool_deadline', False):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        from usage import current
+        context = current()
+        if context is None:
+            return func(*args, **kwargs)
+        return tool_deadlines.call(context.job_id, name, func, args, kwargs)
+
+    wrapper._tool_deadline = True
+    return wrapper
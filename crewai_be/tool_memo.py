@@ -0,0 +1,169 @@
+import functools
+import json
+import os
+import time
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Dict, Tuple
+
+from job_manager import append_event, on_finish
+from tools.page_cache import normalize_url
+from tools.search_client import normalize_query
+from utils.cache import TTLCache
+
+TOOL_MEMO_ENABLED = os.getenv("TOOL_MEMO_ENABLED", "true").lower() in ("1", "true", "yes")
+# 任务结束时会释放；工作进程里收不到结束通知，靠 TTL 回收
+TOOL_MEMO_TTL = int(os.getenv("TOOL_MEMO_TTL_SECONDS", "7200"))
+TOOL_MEMO_MAX_ENTRIES = int(os.getenv("TOOL_MEMO_MAX_ENTRIES", "1000"))
+
+
+# 搜索工具的查询参数名：只有这些查询按 normalize_query 忽略大小写、空白和首尾标点，其余参数按原值作键
+SEARCH_QUERY_ARGS = {
+    "Search the internet": "query",
+    "Search on authoritative websites": "query",
+    "Search YouTube Videos": "keyword",
+}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        if value.strip().lower().startswith(('http://', 'https://')):
+            return normalize_url(value)
+        return value
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def call_key(tool: str, args: tuple, kwargs: dict) -> Tuple[str, str]:
+    """(tool, arguments): URLs canonical, search tool queries case- and whitespace-insensitive, the rest exact."""
+    args, kwargs = list(args), dict(kwargs)
+    query_arg = SEARCH_QUERY_ARGS.get(tool)
+    if query_arg in kwargs:
+        kwargs[query_arg] = normalize_query(kwargs[query_arg])
+    elif query_arg is not None and args:
+        args[0] = normalize_query(args[0])
+    return tool, json.dumps([_normalize(args), _normalize(kwargs)], sort_keys=True, ensure_ascii=False, default=str)
+
+
+class ToolFailure(str):
+    """A tool answer telling the agent the call failed; used like any string but never memoized."""
+
+
+class JobMemo:
+    def __init__(self):
+        self.lock = Lock()
+        self.results: Dict[Tuple[str, str], Tuple[Future, float]] = {}
+        self.calls = 0
+        self.hits = 0
+        self.saved_seconds = 0.0
+
+
+class ToolMemo:
+    """Job-scoped memo of tool results shared by every agent and task of a crew run.
+
+    A repeated (tool, normalized arguments) call within the same job returns
+    the stored result, or waits for the identical call still running in a
+    parallel task. Exceptions, empty results and ToolFailure answers are not
+    kept, so a failed call is retried next time.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.max_entries = max_entries
+        self._jobs = TTLCache(maxsize=10000, ttl=ttl)
+        self._lock = Lock()
+        self.calls = 0
+        self.hits = 0
+        self.saved_seconds = 0.0
+
+    def _memo(self, job_id: str) -> JobMemo:
+        with self._lock:
+            memo = self._jobs.get(job_id)
+            if memo is None:
+                memo = JobMemo()
+                self._jobs.set(job_id, memo)
+            return memo
+
+    def call(self, job_id: str, tool: str, func, args: tuple, kwargs: dict):
+        key = call_key(tool, args, kwargs)
+        memo = self._memo(job_id)
+        future = None
+        with memo.lock:
+            memo.calls += 1
+            entry = memo.results.get(key)
+            if entry is None and len(memo.results) < self.max_entries:
+                future = Future()
+                memo.results[key] = (future, 0.0)
+        self.calls += 1
+        if entry is None:
+            return self._run(memo, key, future, func, args, kwargs)
+
+        result = entry[0].result()
+        with memo.lock:
+            # 记的是第一次调用的耗时，命中时算作节省的时间
+            seconds = memo.results.get(key, (None, 0.0))[1]
+            memo.hits += 1
+            memo.saved_seconds += seconds
+            hits, calls = memo.hits, memo.calls
+        self.hits += 1
+        self.saved_seconds += seconds
+        append_event(job_id, f"Reused {tool} result from earlier in this job "
+                             f"({hits}/{calls} tool calls reused, {hits / calls:.0%})")
+        return result
+
+    @staticmethod
+    def _run(memo: JobMemo, key, future: Future, func, args: tuple, kwargs: dict):
+        if future is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            with memo.lock:
+                memo.results.pop(key, None)
+            future.set_exception(e)
+            raise
+        with memo.lock:
+            if result and not isinstance(result, ToolFailure):
+                memo.results[key] = (future, time.perf_counter() - started)
+            else:
+                memo.results.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def release(self, job_id: str, *_):
+        self._jobs.pop(job_id)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": TOOL_MEMO_ENABLED,
+            "jobs": len(self._jobs),
+            "calls": self.calls,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.calls if self.calls else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+tool_memo = ToolMemo(ttl=TOOL_MEMO_TTL, max_entries=TOOL_MEMO_MAX_ENTRIES)
+on_finish(tool_memo.release)
+
+
+def memoize(name: str, func):
+    """Wrap a tool function so repeated calls within the job running on the calling thread are served from the memo."""
+    if not TOOL_MEMO_ENABLED or getattr(func, '_tool_memo', False):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # usage 依赖本模块，延迟导入
+        from usage import current
+        context = current()
+        if context is None:
+            return func(*args, **kwargs)
+        return tool_memo.call(context.job_id, name, func, args, kwargs)
+
+    wrapper._tool_memo = True
+    return wrapper
@@ -1,12 +1,13 @@
-import requests
 import json
 
+from utils.http import get_session
+
 
 def send_post_request(url, data):
     headers = {
         "Content-Type": "application/json"
     }
-    response = requests.post(url, json=data, headers=headers)
+    response = get_session().post(url, json=data, headers=headers)
     return response.json()
 
 
@@ -1,10 +1,109 @@
+import contextvars
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
-import requests
-from crewai import Agent, Task
 from langchain.tools import tool
-from unstructured.partition.html import partition_html
+from langchain_core.messages import HumanMessage, SystemMessage
+
+import usage
+from llm_cache import bypassed
+from llm_registry import get_llm
+from tools.chunking import SUMMARY_CHUNK_TOKENS, count_tokens, deduper
+from tools.html_text import extract_text
+from tools.page_cache import normalize_url, page_cache
+from utils.http import get_session
+
+# 一次工具调用内同时总结的段数；各任务之间的总并发由 rate_governor 控制
+SUMMARY_MAX_PARALLEL = int(os.getenv("SUMMARY_MAX_PARALLEL", "4"))
+# 是否把各段摘要再合并成一份；关闭时按原文顺序拼接各段摘要
+SUMMARY_REDUCE = os.getenv("SUMMARY_REDUCE", "false").lower() in ("1", "true", "yes")
+
+RESEARCHER = SystemMessage(content=(
+    "You are Principal Researcher. You're a Principal Researcher at a big company and you need to do a "
+    "research about a given topic.\nYour personal goal is: Do amazing researches and summaries based on "
+    "the content you are working with"))
+
+
+def _cached(kind: str, llm, text: str, produce) -> str:
+  # 要求跳过 LLM 缓存的任务同样不复用已有摘要
+  if page_cache is None or bypassed():
+    return produce()
+  summary = page_cache.get_summary(kind, llm.model_name, text)
+  if summary is None:
+    summary = produce()
+    page_cache.put_summary(kind, llm.model_name, text, summary)
+  return summary
+
+
+def _summarize(llm, chunk: str) -> str:
+  prompt = ('Analyze and summarize the content bellow, make sure to include the most relevant information '
+            f'in the summary, return only the summary nothing else.\n\nCONTENT\n----------\n{chunk}')
+  return _cached("chunk", llm, chunk, lambda: llm.invoke([RESEARCHER, HumanMessage(content=prompt)]).content)
+
+
+def _combine(llm, summaries: List[str]) -> str:
+  prompt = ('Combine the partial summaries bellow, taken in order from one web page, into a single summary. '
+            'Keep every relevant fact and figure, drop repetitions, return only the summary nothing else.'
+            '\n\nSUMMARIES\n----------\n' + "\n\n".join(summaries))
+  return _cached("combine", llm, prompt, lambda: llm.invoke([RESEARCHER, HumanMessage(content=prompt)]).content)
+
+
+def parallel_map(func, items: list) -> list:
+  """Run func over items on a bounded pool, in the calling job's usage/rate-limit context; keeps order."""
+  if len(items) <= 1:
+    return [func(item) for item in items]
+  func = usage.bind(func)
+  with ThreadPoolExecutor(max_workers=min(SUMMARY_MAX_PARALLEL, len(items)),
+                          thread_name_prefix="summarize") as pool:
+    # 每个调用复制一份 contextvars，llm_cache.bypass() 等设置随之带到工作线程
+    futures = [pool.submit(contextvars.copy_context().run, func, item) for item in items]
+    return [future.result() for future in futures]
+
+
+def summarize(content: str, reduce: bool = SUMMARY_REDUCE, source: Optional[str] = None) -> str:
+  """Map-reduce summary of a long text: chunks are summarized concurrently, then optionally merged.
+
+  `source` identifies the page, so paragraphs repeated across many pages can be dropped as boilerplate.
+  """
+  llm = usage.track_llm(get_llm())
+  summaries = parallel_map(lambda chunk: _summarize(llm, chunk), deduper.chunks_of(content, page=source))
+  if not reduce:
+    return "\n\n".join(summaries)
+  # 摘要合起来仍超过一段时分组合并，直到剩下一份
+  while len(summaries) > 1:
+    groups, group, size = [], [], 0
+    for summary in summaries:
+      tokens = count_tokens(summary)
+      if group and size + tokens > SUMMARY_CHUNK_TOKENS:
+        groups.append(group)
+        group, size = [], 0
+      group.append(summary)
+      size += tokens
+    groups.append(group)
+    if len(groups) == len(summaries):
+      # 每份摘要都单独占满一段，再合并也不会变短
+      groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+    summaries = parallel_map(lambda group: _combine(llm, group), groups)
+  return summaries[0] if summaries else ""
+
+
+def fetch_html(website: str):
+  """Render `website` with browserless and return the HTML; raises HTTPError for non-2xx responses."""
+  url = f"https://chrome.browserless.io/content?token={os.environ['BROWSERLESS_API_KEY']}"
+  payload = json.dumps({"url": website})
+  headers = {'cache-control': 'no-cache', 'content-type': 'application/json'}
+  response = get_session().request("POST", url, headers=headers, data=payload)
+  # 错误页不交给摘要，也不写入页面缓存
+  response.raise_for_status()
+  return response.text
+
+
+def page_text(website: str) -> str:
+  if page_cache is None:
+    return extract_text(fetch_html(website))
+  return page_cache.get_page(website, fetch_html, extract_text).text
 
 
 class BrowserTools():
@@ -12,27 +111,4 @@ class BrowserTools():
   @tool("Scrape website content")
   def scrape_and_summarize_website(website):
     """Useful to scrape and summarize a website content"""
-    url = f"https://chrome.browserless.io/content?token={os.environ['BROWSERLESS_API_KEY']}"
-    payload = json.dumps({"url": website})
-    headers = {'cache-control': 'no-cache', 'content-type': 'application/json'}
-    response = requests.request("POST", url, headers=headers, data=payload)
-    elements = partition_html(text=response.text)
-    content = "\n\n".join([str(el) for el in elements])
-    content = [content[i:i + 8000] for i in range(0, len(content), 8000)]
-    summaries = []
-    for chunk in content:
-      agent = Agent(
-          role='Principal Researcher',
-          goal=
-          'Do amazing researches and summaries based on the content you are working with',
-          backstory=
-          "You're a Principal Researcher at a big company and you need to do a research about a given topic.",
-          allow_delegation=False)
-      task = Task(
-          agent=agent,
-          description=
-          f'Analyze and summarize the content bellow, make sure to include the most relevant information in the summary, return only the summary nothing else.\n\nCONTENT\n----------\n{chunk}'
-      )
-      summary = task.execute()
-      summaries.append(summary)
-    return "\n\n".join(summaries)
+    return summarize(page_text(website), source=normalize_url(website))
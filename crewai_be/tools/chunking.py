@@ -0,0 +1,195 @@
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+from threading import Lock
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from utils.cache import TTLCache
+from utils.logging import logger
+
+# 每段交给 LLM 总结的 token 数（约等于原来 8000 个英文字符）
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "2000"))
+# SimHash 汉明距离不超过这个值的两段视为近似重复
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", "3"))
+# 同一段落出现在同一站点这么多个不同页面上就当作模板文字丢掉
+BOILERPLATE_MIN_PAGES = int(os.getenv("BOILERPLATE_MIN_PAGES", "3"))
+BOILERPLATE_TTL = int(os.getenv("BOILERPLATE_TTL_SECONDS", str(24 * 3600)))
+# 太短的段落（标题、按钮文字）不参与模板判断
+BOILERPLATE_MIN_CHARS = 40
+
+# 平假名/片假名、CJK 统一汉字（含扩展 A）、兼容汉字和韩文音节
+_CJK_CHARS = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK = re.compile(f"[{_CJK_CHARS}]")
+_TOKEN = re.compile(rf"[{_CJK_CHARS}]|\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+|(?<=[。！？；])")
+_HEADING_END = tuple(".。!！?？:：;；,，")
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # 离线环境拿不到 BPE 文件时退回按字符估算
+            _encoding_failed = True
+            logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of `text` for the GPT-4 family; estimated per script when tiktoken is unavailable."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # 中日韩文字大约每字 1 个多 token，其它文字大约每 4 个字符 1 个 token
+    cjk = len(_CJK.findall(text))
+    return math.ceil(cjk * 1.3 + (len(text) - cjk) / 4)
+
+
+def _is_heading(paragraph: str) -> bool:
+    return (len(paragraph) <= 120 and '\n' not in paragraph and ' | ' not in paragraph
+            and not paragraph.endswith(_HEADING_END))
+
+
+def _split_long(paragraph: str, budget: int) -> List[str]:
+    """Split a paragraph over the budget at sentence ends, cutting single overlong sentences evenly."""
+    pieces, current, size = [], [], 0
+    for sentence in _SENTENCE_END.split(paragraph):
+        tokens = count_tokens(sentence)
+        if tokens > budget:
+            parts = math.ceil(tokens / budget)
+            step = math.ceil(len(sentence) / parts)
+            sentences = [(sentence[i:i + step], math.ceil(tokens / parts)) for i in range(0, len(sentence), step)]
+        else:
+            sentences = [(sentence, tokens)]
+        for text, tokens in sentences:
+            if current and size + tokens > budget:
+                pieces.append(" ".join(current))
+                current, size = [], 0
+            current.append(text)
+            size += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text: str, budget: int = SUMMARY_CHUNK_TOKENS) -> List[str]:
+    """Pack blank-line separated paragraphs into chunks of at most `budget` tokens.
+
+    Chunks break between paragraphs, and preferably before a heading once
+    half full, so sentences and table rows stay together; only a paragraph
+    that alone exceeds the budget is split, at sentence ends.
+    """
+    units: List[Tuple[str, int, bool]] = []
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens <= budget:
+            units.append((paragraph, tokens, _is_heading(paragraph)))
+        else:
+            units.extend((piece, count_tokens(piece), False) for piece in _split_long(paragraph, budget))
+    chunks, current, size = [], [], 0
+    for paragraph, tokens, heading in units:
+        if current and (size + tokens > budget or (heading and size >= budget // 2)):
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        # 段落之间的空行大约占 1 个 token
+        size += tokens + 1
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word trigrams (single characters count as words for CJK)."""
+    tokens = [token.lower() for token in _TOKEN.findall(text)]
+    shingles = Counter(" ".join(tokens[i:i + 3]) for i in range(max(1, len(tokens) - 2)))
+    weights = [0] * 64
+    for shingle, count in shingles.items():
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+class ChunkDeduper:
+    """Drops near-duplicate chunks within a page and paragraphs repeated across many pages.
+
+    Paragraphs are fingerprinted per site by exact normalized text and
+    remembered (per process, for BOILERPLATE_TTL) with the pages they
+    appeared on; once one has been seen on BOILERPLATE_MIN_PAGES different
+    pages of the same host it is treated as site boilerplate (cookie
+    banners, disclaimers, footers) and dropped. The same text on other
+    sites, e.g. a syndicated press release, is kept.
+    """
+
+    def __init__(self, min_pages: int, ttl: float, max_distance: int):
+        self.min_pages = min_pages
+        self.max_distance = max_distance
+        self._seen = TTLCache(maxsize=100000, ttl=ttl)
+        self._lock = Lock()
+        self.chunks = 0
+        self.near_duplicates = 0
+        self.boilerplate = 0
+
+    def _repeated(self, paragraph: str, site: str, page: str) -> bool:
+        key = (site, hashlib.sha1(" ".join(paragraph.lower().split()).encode('utf-8')).hexdigest())
+        with self._lock:
+            pages = self._seen.get(key) or frozenset()
+            if page not in pages and len(pages) < self.min_pages:
+                pages = pages | {page}
+                self._seen.set(key, pages)
+        return len(pages) >= self.min_pages
+
+    def strip_boilerplate(self, text: str, page: Optional[str]) -> str:
+        site = urlsplit(page).hostname if page else None
+        if not site or self.min_pages <= 1:
+            return text
+        site = site.removeprefix("www.")
+        kept = []
+        for paragraph in text.split("\n\n"):
+            if len(paragraph) >= BOILERPLATE_MIN_CHARS and self._repeated(paragraph, site, page):
+                self.boilerplate += 1
+                continue
+            kept.append(paragraph)
+        return "\n\n".join(kept)
+
+    def unique(self, chunks: List[str]) -> List[str]:
+        kept, hashes = [], []
+        for chunk in chunks:
+            fingerprint = simhash(chunk)
+            if any(bin(fingerprint ^ other).count('1') <= self.max_distance for other in hashes):
+                self.near_duplicates += 1
+                continue
+            kept.append(chunk)
+            hashes.append(fingerprint)
+        self.chunks += len(kept)
+        return kept
+
+    def chunks_of(self, text: str, page: Optional[str] = None, budget: int = SUMMARY_CHUNK_TOKENS) -> List[str]:
+        """Chunks of `text` worth summarizing: boilerplate removed, near-duplicates dropped, order kept."""
+        return self.unique(chunk_text(self.strip_boilerplate(text, page), budget))
+
+    def stats(self) -> dict:
+        return {
+            "chunk_tokens": SUMMARY_CHUNK_TOKENS,
+            "token_counter": "tiktoken" if _get_encoding() is not None else "estimate",
+            "chunks": self.chunks,
+            "near_duplicates": self.near_duplicates,
+            "boilerplate_paragraphs": self.boilerplate,
+            "fingerprints": len(self._seen),
+        }
+
+
+deduper = ChunkDeduper(BOILERPLATE_MIN_PAGES, BOILERPLATE_TTL, SIMHASH_MAX_DISTANCE)
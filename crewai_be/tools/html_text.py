@@ -0,0 +1,117 @@
+import os
+import re
+
+from lxml import etree
+
+from utils.logging import logger
+
+# fast：先用 lxml 流式提取，质量不够时再用 unstructured；unstructured：总是用 partition_html
+HTML_EXTRACTOR = os.getenv("HTML_EXTRACTOR", "fast")
+# 快速提取结果少于这么多字符时认为没有抓到正文
+MIN_TEXT_CHARS = int(os.getenv("HTML_MIN_TEXT_CHARS", "200"))
+# 每次喂给解析器的字符数
+FEED_CHARS = 64 * 1024
+
+# 整棵子树都不要的标签：脚本样式、导航、页眉页脚和表单控件
+SKIP_TAGS = frozenset([
+    'head', 'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object',
+    'nav', 'header', 'footer', 'aside', 'form', 'button', 'select', 'textarea',
+])
+SKIP_ROLES = frozenset(['navigation', 'banner', 'contentinfo', 'search', 'menu', 'menubar'])
+# 前后断开成独立段落的标签
+BLOCK_TAGS = frozenset([
+    'p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'dl', 'dt', 'dd',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'thead', 'tbody', 'tfoot', 'tr', 'caption',
+    'blockquote', 'pre', 'figure', 'figcaption', 'br', 'hr', 'address', 'details', 'summary',
+])
+CELL_TAGS = frozenset(['td', 'th'])
+
+_SPACE = re.compile(r"\s+")
+# 段落分隔标记：lxml 的文本里不能有 NUL，换用一个不会出现在正文里的 C1 控制字符；
+# 选 Latin-1 范围内的字符，纯英文页面的中间字符串仍是每字符一个字节
+BREAK = '\x9c'
+_PARAGRAPH = re.compile(f"[^{BREAK}]+")
+
+
+def _skipped(element) -> bool:
+    return (element.get('role') in SKIP_ROLES
+            or element.get('aria-hidden') == 'true'
+            or element.get('hidden') is not None)
+
+
+def fast_extract(html: str) -> str:
+    """Text of the page body, one paragraph per block element, table cells joined with " | ".
+
+    The document is fed to lxml's pull parser in pieces. When an element
+    ends, its text and its children's (already collapsed) text and tails are
+    folded into its own `.text` and the children are dropped, so only the
+    open path and the strings gathered so far are kept in memory. Block
+    boundaries are marked with a control character and split out at the end.
+    """
+    # 传入的已是解码后的文本，按 utf-8 编码喂给解析器，忽略页面里声明的 charset
+    parser = etree.HTMLPullParser(events=('end',), encoding='utf-8', remove_comments=True, remove_pis=True)
+
+    def collapse(events):
+        for _, element in events:
+            tag = element.tag
+            if tag in SKIP_TAGS or (element.attrib and _skipped(element)):
+                text = ''
+            else:
+                text = ''.join([element.text or '', *[(child.text or '') + (child.tail or '') for child in element]])
+                if tag in BLOCK_TAGS:
+                    text = f"{BREAK}{text}{BREAK}"
+                elif tag in CELL_TAGS:
+                    text = f" | {text}"
+            del element[:]
+            element.text = text
+
+    html = html.replace(BREAK, '')
+    for offset in range(0, len(html), FEED_CHARS):
+        parser.feed(html[offset:offset + FEED_CHARS].encode('utf-8'))
+        collapse(parser.read_events())
+    root = parser.close()
+    collapse(parser.read_events())
+    if root is None:
+        return ''
+    paragraphs = []
+    for match in _PARAGRAPH.finditer(root.text or ''):
+        paragraph = _SPACE.sub(' ', match.group()).strip(' |')
+        if paragraph:
+            paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def partition_text(html: str) -> str:
+    """The original extractor: unstructured's partition_html elements joined by blank lines."""
+    # unstructured 导入很慢，只在需要时加载
+    from unstructured.partition.html import partition_html
+    elements = partition_html(text=html)
+    return "\n\n".join([str(el) for el in elements])
+
+
+def good_enough(text: str, html: str) -> bool:
+    """Heuristic check that the fast extractor found the page's text."""
+    if not text.strip():
+        return False
+    # 很小的页面本身就没多少字
+    if len(text) < MIN_TEXT_CHARS and len(html) > 20 * MIN_TEXT_CHARS:
+        return False
+    # 编码识别错误时会出现大量替换字符
+    return text.count('�') <= len(text) // 100
+
+
+def extract_text(html: str) -> str:
+    if HTML_EXTRACTOR == "unstructured":
+        return partition_text(html)
+    try:
+        text = fast_extract(html)
+    except Exception as e:
+        logger.warning(f"Fast HTML extraction failed, using partition_html: {e}")
+        return partition_text(html)
+    if good_enough(text, html):
+        return text
+    try:
+        return partition_text(html) or text
+    except Exception as e:
+        logger.error(f"partition_html failed, keeping the fast extraction: {e}")
+        return text
@@ -0,0 +1,292 @@
+import hashlib
+import os
+import sqlite3
+import time
+from threading import Lock, local
+from typing import Callable, Dict, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from utils.logging import logger
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                                            ".cache", "page_cache.sqlite"))
+# 在这段时间内直接使用缓存的页面，过期后重新抓取并按内容哈希判断是否变化
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL_SECONDS", str(6 * 3600)))
+# 过期页面最多保留多久，用于重新验证和抓取失败时兜底
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+EVICT_EVERY = 50
+
+# 不影响页面内容的跟踪参数
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "spm")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL: lower-case scheme/host, no default port, fragment or tracking params, sorted query."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'http').lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not key.lower().startswith(_TRACKING_PARAMS))
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+def _sha(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode('utf-8')).hexdigest()
+
+
+class Page(NamedTuple):
+    url: str
+    content_hash: str
+    text: str
+    fetched_at: float
+
+
+class PageCache:
+    """Disk cache of scraped pages: raw HTML and extracted text by content hash, plus chunk summaries.
+
+    URLs map to the hash of the HTML last fetched for them, so pages with the
+    same content share one parse, and a page re-fetched after its TTL that
+    has not changed keeps its text and summaries. Summaries are keyed by the
+    hash of the chunk text and the model, independent of the URL.
+    """
+
+    def __init__(self, path: str, ttl: float, max_age: float, max_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._local = local()
+        self._lock = Lock()
+        self._inflight: Dict[str, Lock] = {}
+        self._writes_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.changed = 0
+        self.stale_served = 0
+        self.summary_hits = 0
+        self.summary_misses = 0
+        self.evictions = 0
+        self._schema_ready = False
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+                url_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS contents (
+                content_hash TEXT PRIMARY KEY,
+                html TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL)""")
+
+    def _connect(self) -> sqlite3.Connection:
+        # 文件和表在第一次用到时才创建，导入模块不写磁盘
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._lock:
+                if not self._schema_ready:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                if not self._schema_ready:
+                    self._create_schema(conn)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _lookup(self, url_key: str) -> Optional[Page]:
+        row = self._connect().execute(
+            """SELECT p.url, p.content_hash, c.text, p.fetched_at FROM pages p
+               JOIN contents c ON c.content_hash = p.content_hash WHERE p.url_key = ?""", (url_key,)).fetchone()
+        return Page(*row) if row else None
+
+    def _text(self, content_hash: str) -> Optional[str]:
+        try:
+            row = self._connect().execute("SELECT text FROM contents WHERE content_hash = ?",
+                                          (content_hash,)).fetchone()
+        except Exception as e:
+            logger.error(f"Page cache lookup failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def _store(self, url_key: str, page: Page, html: str, parsed: bool):
+        conn = self._connect()
+        with conn:
+            if parsed:
+                conn.execute("INSERT OR REPLACE INTO contents VALUES (?, ?, ?, ?, ?)",
+                             (page.content_hash, html, page.text, len(html) + len(page.text), page.fetched_at))
+            else:
+                conn.execute("UPDATE contents SET accessed_at = ? WHERE content_hash = ?",
+                             (page.fetched_at, page.content_hash))
+            conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                         (url_key, page.url, page.content_hash, page.fetched_at))
+        self._wrote()
+
+    def get_page(self, url: str, fetch: Callable[[str], str], extract: Callable[[str], str]) -> Page:
+        """Return the cached page for `url`, or fetch it and extract its text.
+
+        `fetch` returns the HTML and raises on failure, including non-2xx
+        responses, so error pages are never cached and a stale copy is served
+        instead. Concurrent requests for the same URL wait for one fetch.
+        """
+        url_key = normalize_url(url)
+        with self._lock:
+            inflight = self._inflight.setdefault(url_key, Lock())
+        with inflight:
+            try:
+                cached = self._lookup(url_key)
+            except Exception as e:
+                logger.error(f"Page cache lookup failed: {e}")
+                cached = None
+            if cached is not None and time.time() - cached.fetched_at < self.ttl:
+                self.hits += 1
+                return cached
+            self.misses += 1
+            try:
+                html = fetch(url)
+            except Exception:
+                if cached is not None and time.time() - cached.fetched_at < self.max_age:
+                    # 抓取失败时返回过期的页面
+                    self.stale_served += 1
+                    logger.warning(f"Serving stale copy of {url} after a failed fetch")
+                    return cached
+                raise
+            content_hash = _sha(html)
+            # 内容没变（或别的 URL 已抓到同样的内容）时不再解析
+            text = self._text(content_hash)
+            parsed = text is None
+            page = Page(url, content_hash, extract(html) if parsed else text, time.time())
+            try:
+                self._store(url_key, page, html, parsed)
+            except Exception as e:
+                logger.error(f"Page cache write failed: {e}")
+            if cached is not None:
+                if cached.content_hash == page.content_hash:
+                    self.revalidated += 1
+                else:
+                    self.changed += 1
+            return page
+
+    def get_summary(self, kind: str, model: str, text: str) -> Optional[str]:
+        key = _sha(kind, model, text)
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT summary FROM summaries WHERE key = ? AND accessed_at >= ?",
+                               (key, time.time() - self.max_age)).fetchone()
+            if row is not None:
+                with conn:
+                    conn.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        except Exception as e:
+            logger.error(f"Page cache summary lookup failed: {e}")
+            row = None
+        if row is None:
+            self.summary_misses += 1
+            return None
+        self.summary_hits += 1
+        return row[0]
+
+    def put_summary(self, kind: str, model: str, text: str, summary: str):
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                             (_sha(kind, model, text), summary, len(summary), time.time()))
+        except Exception as e:
+            logger.error(f"Page cache summary write failed: {e}")
+            return
+        self._wrote()
+
+    def _wrote(self):
+        with self._lock:
+            self._writes_since_evict += 1
+            if self._writes_since_evict < EVICT_EVERY:
+                return
+            self._writes_since_evict = 0
+            # 顺带清理已完成抓取的锁
+            for url_key in [key for key, lock in self._inflight.items() if not lock.locked()]:
+                del self._inflight[url_key]
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop pages and summaries older than max_age, then the least recently used until under max_bytes."""
+        cutoff = time.time() - self.max_age
+        removed = 0
+        try:
+            conn = self._connect()
+            with conn:
+                removed += conn.execute("DELETE FROM pages WHERE fetched_at < ?", (cutoff,)).rowcount
+                removed += conn.execute("DELETE FROM summaries WHERE accessed_at < ?", (cutoff,)).rowcount
+                removed += conn.execute(
+                    "DELETE FROM contents WHERE content_hash NOT IN (SELECT content_hash FROM pages)").rowcount
+                for table in ("contents", "summaries"):
+                    total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+                    # 页面和摘要各占一半的空间
+                    excess = total - self.max_bytes // 2
+                    if excess <= 0:
+                        continue
+                    row = conn.execute(
+                        f"""SELECT accessed_at FROM (
+                               SELECT accessed_at, SUM(size) OVER (ORDER BY accessed_at) AS freed
+                               FROM {table}) WHERE freed >= ? LIMIT 1""", (excess,)).fetchone()
+                    if row is not None:
+                        removed += conn.execute(f"DELETE FROM {table} WHERE accessed_at <= ?", (row[0],)).rowcount
+                removed += conn.execute(
+                    "DELETE FROM pages WHERE content_hash NOT IN (SELECT content_hash FROM contents)").rowcount
+        except Exception as e:
+            logger.error(f"Page cache eviction failed: {e}")
+            return 0
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> dict:
+        try:
+            conn = self._connect()
+            pages = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            contents, content_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM contents").fetchone()
+            summaries, summary_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries").fetchone()
+        except Exception:
+            pages = contents = content_bytes = summaries = summary_bytes = None
+        lookups = self.hits + self.misses
+        summary_lookups = self.summary_hits + self.summary_misses
+        return {
+            "enabled": True,
+            "pages": pages,
+            "contents": contents,
+            "summaries": summaries,
+            "bytes": (content_bytes or 0) + (summary_bytes or 0),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "max_age": self.max_age,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "changed": self.changed,
+            "stale_served": self.stale_served,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "summary_hits": self.summary_hits,
+            "summary_misses": self.summary_misses,
+            "summary_hit_rate": self.summary_hits / summary_lookups if summary_lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+page_cache = PageCache(PAGE_CACHE_PATH, PAGE_CACHE_TTL, PAGE_CACHE_MAX_AGE,
+                       PAGE_CACHE_MAX_BYTES) if PAGE_CACHE_ENABLED else None
@@ -0,0 +1,97 @@
+import json
+import os
+import re
+import time
+import unicodedata
+from typing import Optional
+
+import requests
+
+from utils.cache import TTLCache, bypassed
+from utils.http import get_session
+
+SERPER_URL = "https://google.serper.dev/search"
+SEARCH_CONNECT_TIMEOUT = float(os.getenv("SEARCH_CONNECT_TIMEOUT_SECONDS", "5"))
+SEARCH_READ_TIMEOUT = float(os.getenv("SEARCH_READ_TIMEOUT_SECONDS", "15"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "2048"))
+# 过期结果再保留这么久，Serper 出错或熔断时拿来兜底
+SEARCH_STALE_SECONDS = int(os.getenv("SEARCH_STALE_SECONDS", str(24 * 3600)))
+
+_EDGE_PUNCTUATION = "\"'“”‘’`.,;:!?。，；：！？ "
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: NFKC, case-folded, single spaces, no surrounding quotes or punctuation."""
+    query = unicodedata.normalize("NFKC", str(query)).casefold()
+    return re.sub(r"\s+", " ", query).strip(_EDGE_PUNCTUATION)
+
+
+class SerperClient:
+    """Serper web search over the shared keep-alive session, with timeouts and a TTL/LRU result cache.
+
+    Only successful responses are cached, keyed by the normalized query and
+    result count, so an agent rephrasing "Tesla revenue 2023" as
+    "tesla  revenue 2023?" gets the cached answer. Results past their TTL
+    are kept for another `stale` seconds and served when Serper fails.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, stale: float = 0):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl + stale)
+        self.requests = 0
+        self.errors = 0
+        self.stale_served = 0
+        self.request_seconds = 0.0
+
+    def search(self, query: str, num: Optional[int] = None) -> dict:
+        """Return Serper's parsed JSON for `query`; raises on timeouts, connection errors and non-JSON replies."""
+        key = (normalize_query(query), num)
+        # 要求跳过缓存的任务重新搜索，结果仍写回缓存
+        cached = None if bypassed() else self._cache.get(key, max_age=self.ttl)
+        if cached is not None:
+            return cached
+        payload = {"q": query} if num is None else {"q": query, "num": num}
+        headers = {
+            'X-API-KEY': os.environ['SERPER_API_KEY'],
+            'content-type': 'application/json'
+        }
+        started = time.perf_counter()
+        self.requests += 1
+        try:
+            response = get_session().post(SERPER_URL, headers=headers, data=json.dumps(payload),
+                                          timeout=(SEARCH_CONNECT_TIMEOUT, SEARCH_READ_TIMEOUT))
+            # 401/403 等也带 JSON 错误信息，交给调用方按没有 organic 处理
+            results = response.json()
+        except (requests.RequestException, ValueError):
+            self.errors += 1
+            stale = self._cache.get(key)
+            if stale is None:
+                raise
+            self.stale_served += 1
+            return stale
+        finally:
+            self.request_seconds += time.perf_counter() - started
+        if response.status_code == 200 and results.get('organic'):
+            self._cache.set(key, results)
+        elif response.status_code != 200:
+            self.errors += 1
+            stale = self._cache.get(key) if response.status_code >= 500 else None
+            if stale is not None:
+                self.stale_served += 1
+                return stale
+        return results
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "ttl": self.ttl,
+            "requests": self.requests,
+            "errors": self.errors,
+            "stale_served": self.stale_served,
+            "avg_request_seconds": self.request_seconds / self.requests if self.requests else 0.0,
+        }
+
+
+serper = SerperClient(ttl=SEARCH_CACHE_TTL, maxsize=SEARCH_CACHE_SIZE, stale=SEARCH_STALE_SECONDS)
+
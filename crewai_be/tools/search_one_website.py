@@ -1,28 +1,46 @@
-from crewai_tools import WebsiteSearchTool
-import json
 import os
 
 import requests
 from langchain.tools import tool
 
+from tool_memo import ToolFailure
+from tools.browser_tools import page_text, parallel_map, summarize
+from tools.page_cache import normalize_url
+from tools.sec_search import format_results, sec_search
+from utils.logging import logger
+
+# 每次最多顺带抓取并总结几份排在前面的文件
+SEC_MAX_FOLLOW_UP = int(os.getenv("SEC_MAX_FOLLOW_UP", "3"))
+
 
 class SearchWebsiteTools():
 
   @tool("Search on authoritative websites")
-  def search_authoritative_websites(query):
+  def search_authoritative_websites(query: str, fetch_top: int = 0):
     """Useful to search on authoritative websites
-    about  a company's condition"""
-    url = f"https://secsearch.sec.gov/search?utf8=%3F&affiliate=secsearch&query={query}"
+    about  a company's condition. Returns the title, link, snippet and date
+    of each SEC result; set fetch_top to also get summaries of the first few results."""
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-          return response.text
-        else:
-          print(f"Failed to fetch content from {url}. Status code: {response.status_code}")
-          return None
-    except Exception as e:
-        print(f"Error occurred while fetching content from {url}: {e}")
-        return None
-
-
+      results = sec_search.search(query)
+    except requests.RequestException as e:
+      logger.error(f"SEC search for {query!r} failed: {e}")
+      return ToolFailure(f"Sorry, the SEC search failed ({type(e).__name__}), please try again later.")
+    if not results:
+      return ToolFailure("No results found on sec.gov for that query.")
+    output = format_results(results)
+    fetch_top = max(0, min(int(fetch_top or 0), SEC_MAX_FOLLOW_UP, len(results)))
+    if fetch_top:
+      # 与网页抓取工具共用页面缓存和摘要缓存
+      def follow_up(result):
+        try:
+          return f"## {result.title}\n{summarize(page_text(result.url), source=normalize_url(result.url))}"
+        except Exception as e:
+          logger.error(f"Could not fetch {result.url}: {e}")
+          return ToolFailure(f"## {result.title}\nCould not fetch this document ({type(e).__name__}).")
 
+      summaries = parallel_map(follow_up, results[:fetch_top])
+      output += "\n\n" + "\n\n".join(summaries)
+      # 有文件没抓到时不让这次结果被记住，下次调用重新抓取
+      if any(isinstance(summary, ToolFailure) for summary in summaries):
+        return ToolFailure(output)
+    return output
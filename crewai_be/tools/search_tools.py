@@ -1,9 +1,10 @@
-import json
-import os
-
 import requests
 from langchain.tools import tool
 
+from tool_memo import ToolFailure
+from tools.search_client import serper
+from utils.logging import logger
+
 
 class SearchTools():
 
@@ -12,20 +13,17 @@ class SearchTools():
     """Useful to search the internet
     about  a given topic and return relevant results"""
     top_result_to_return = 4
-    url = "https://google.serper.dev/search"
-    payload = json.dumps({"q": query})
-    headers = {
-        'X-API-KEY': os.environ['SERPER_API_KEY'],
-        'content-type': 'application/json'
-    }
-    response = requests.request("POST", url, headers=headers, data=payload)
+    try:
+      results = serper.search(query)
+    except (requests.RequestException, ValueError) as e:
+      logger.error(f"Serper search for {query!r} failed: {e}")
+      return ToolFailure(f"Sorry, the search failed ({type(e).__name__}), please try again or use a different query.")
     # check if there is an organic key
-    if 'organic' not in response.json():
-      return "Sorry, I couldn't find anything about that, there could be an error with you serper api key."
+    if 'organic' not in results:
+      return ToolFailure("Sorry, I couldn't find anything about that, there could be an error with you serper api key.")
     else:
-      results = response.json()['organic']
       string = []
-      for result in results[:top_result_to_return]:
+      for result in results['organic'][:top_result_to_return]:
         try:
           string.append('\n'.join([
               f"Title: {result['title']}", f"Link: {result['link']}",
@@ -0,0 +1,180 @@
+import json
+import os
+import re
+from typing import Iterator, List, NamedTuple, Optional
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from lxml import etree
+from lxml import html as lxml_html
+
+from tools.search_client import normalize_query
+from utils.cache import TTLCache, bypassed
+from utils.http import get_session
+
+SEC_SEARCH_URL = "https://secsearch.sec.gov/search"
+SEC_TIMEOUT = (float(os.getenv("SEC_CONNECT_TIMEOUT_SECONDS", "5")),
+               float(os.getenv("SEC_READ_TIMEOUT_SECONDS", "20")))
+SEC_CACHE_TTL = int(os.getenv("SEC_CACHE_TTL_SECONDS", str(6 * 3600)))
+SEC_CACHE_SIZE = int(os.getenv("SEC_CACHE_SIZE", "1024"))
+SEC_STALE_SECONDS = int(os.getenv("SEC_STALE_SECONDS", str(24 * 3600)))
+# 返回给 agent 的结果条数和每条摘要的长度
+SEC_MAX_RESULTS = int(os.getenv("SEC_MAX_RESULTS", "8"))
+SEC_SNIPPET_CHARS = int(os.getenv("SEC_SNIPPET_CHARS", "300"))
+
+_SPACE = re.compile(r"\s+")
+# search.gov 用私有区字符标记高亮的关键词
+_HIGHLIGHT = re.compile("[\ue000\ue001]")
+_DATE = re.compile(
+    r"\b(?:(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\.? \d{1,2}, \d{4}"
+    r"|\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{4})\b")
+_DATE_PREFIX = re.compile(rf"^\s*({_DATE.pattern})\s*(?:[-—–.:|]+\s*)?")
+# 结果块的 class（旧版 content-block-item result，新版 result / result-item 等）
+_RESULT_CLASS = re.compile(r"(?:^|\s)(?:result|result-item|content-block-item|search-result)(?:\s|$)")
+_SNIPPET_CLASS = re.compile(r"desc|snippet|summary", re.I)
+
+
+class SecResult(NamedTuple):
+    title: str
+    url: str
+    snippet: str
+    date: str
+
+
+def _clean(text: Optional[str]) -> str:
+    return _SPACE.sub(" ", _HIGHLIGHT.sub("", text or "")).strip()
+
+
+def _result(title: str, url: str, snippet: str, date: str = "") -> SecResult:
+    title, snippet, date = _clean(title), _clean(snippet), _clean(date)
+    if not date:
+        match = _DATE_PREFIX.match(snippet)
+        if match:
+            date, snippet = match.group(1), snippet[match.end():]
+        else:
+            match = _DATE.search(snippet)
+            date = match.group() if match else ""
+    if len(snippet) > SEC_SNIPPET_CHARS:
+        snippet = snippet[:SEC_SNIPPET_CHARS].rsplit(" ", 1)[0] + " ..."
+    return SecResult(title, url, snippet, date)
+
+
+def _from_props(value) -> Iterator[SecResult]:
+    """Results in the JSON props the React front end of search.gov is rendered from."""
+    if isinstance(value, dict):
+        url, title = value.get("url") or value.get("link"), value.get("title")
+        if isinstance(url, str) and isinstance(title, str) and url.startswith("http"):
+            snippet = value.get("description") or value.get("snippet") or value.get("body") or ""
+            date = value.get("publishedAt") or value.get("published_at") or value.get("publicationDate") or ""
+            yield _result(title, url, str(snippet), str(date))
+            return
+        for item in value.values():
+            yield from _from_props(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _from_props(item)
+
+
+def _from_blocks(document, base_url: str) -> Iterator[SecResult]:
+    """Results in server-rendered result blocks: a title link, a description and maybe a date."""
+    for block in document.iter():
+        if not isinstance(block.tag, str) or not _RESULT_CLASS.search(block.get("class") or ""):
+            continue
+        link = next((a for a in block.iter("a") if a.get("href") and _clean(a.text_content())), None)
+        if link is None:
+            continue
+        snippet = next((element.text_content() for element in block.iter()
+                        if isinstance(element.tag, str) and _SNIPPET_CLASS.search(element.get("class") or "")), "")
+        date = next((element.get("datetime") or element.text_content() for element in block.iter("time")), "")
+        yield _result(link.text_content(), urljoin(base_url, link.get("href")), snippet, date)
+
+
+def parse_results(page: str, base_url: str = SEC_SEARCH_URL) -> List[SecResult]:
+    """(title, url, snippet, date) of each hit on a secsearch.sec.gov results page, in page order."""
+    if not page.strip():
+        return []
+    try:
+        document = lxml_html.fromstring(page)
+    except (etree.ParserError, ValueError):
+        # 只有注释/空白的页面，或带 XML 编码声明的字符串
+        return []
+    results = []
+    for element in document.xpath("//*[@data-react-props]"):
+        try:
+            results.extend(_from_props(json.loads(element.get("data-react-props"))))
+        except ValueError:
+            continue
+    if not results:
+        results = list(_from_blocks(document, base_url))
+    unique, seen = [], set()
+    for result in results:
+        # 站内搜索自身的链接（翻页、相关搜索）不算结果
+        if result.url in seen or urlsplit(result.url).hostname in (None, "secsearch.sec.gov", "search.usa.gov"):
+            continue
+        seen.add(result.url)
+        unique.append(result)
+    return unique
+
+
+def format_results(results: List[SecResult]) -> str:
+    lines = []
+    for number, result in enumerate(results, 1):
+        title = f"{result.title} ({result.date})" if result.date else result.title
+        lines.append(f"{number}. {title}\n   {result.url}" + (f"\n   {result.snippet}" if result.snippet else ""))
+    return "\n".join(lines)
+
+
+class SecSearchClient:
+    """secsearch.sec.gov queries parsed into compact results, cached per normalized query.
+
+    Like the Serper client, results past their TTL are kept for another
+    `stale` seconds and served when the search fails.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, stale: float = 0):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl + stale)
+        self.requests = 0
+        self.errors = 0
+        self.stale_served = 0
+        self.page_bytes = 0
+        self.output_chars = 0
+
+    def search(self, query: str) -> List[SecResult]:
+        key = normalize_query(query)
+        cached = None if bypassed() else self._cache.get(key, max_age=self.ttl)
+        if cached is not None:
+            return cached
+        self.requests += 1
+        try:
+            response = get_session().get(SEC_SEARCH_URL, timeout=SEC_TIMEOUT,
+                                         params={"utf8": "?", "affiliate": "secsearch", "query": query})
+            response.raise_for_status()
+        except requests.RequestException:
+            self.errors += 1
+            stale = self._cache.get(key)
+            if stale is None:
+                raise
+            self.stale_served += 1
+            return stale
+        self.page_bytes += len(response.content)
+        results = parse_results(response.text, response.url)[:SEC_MAX_RESULTS]
+        if results:
+            self._cache.set(key, results)
+        self.output_chars += len(format_results(results))
+        return results
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "ttl": self.ttl,
+            "requests": self.requests,
+            "errors": self.errors,
+            "stale_served": self.stale_served,
+            # 原始页面和交给 agent 的文本大小，看解析省下了多少上下文
+            "page_bytes": self.page_bytes,
+            "output_chars": self.output_chars,
+        }
+
+
+sec_search = SecSearchClient(ttl=SEC_CACHE_TTL, maxsize=SEC_CACHE_SIZE, stale=SEC_STALE_SECONDS)
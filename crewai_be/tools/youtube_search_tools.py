@@ -1,15 +1,185 @@
-from typing import List, Type
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, List, Tuple, Type
+from zoneinfo import ZoneInfo
 from pydantic.v1 import BaseModel, Field
 import os
-import requests
+import time
 from crewai_tools import BaseTool
 
+import usage
+from tools.search_client import normalize_query
+from utils.cache import TTLCache, bypassed
+from utils.http import get_session
+from utils.logging import logger
+
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+YOUTUBE_TIMEOUT = (float(os.getenv("YOUTUBE_CONNECT_TIMEOUT_SECONDS", "5")),
+                   float(os.getenv("YOUTUBE_READ_TIMEOUT_SECONDS", "15")))
+YOUTUBE_CACHE_TTL = int(os.getenv("YOUTUBE_CACHE_TTL_SECONDS", str(24 * 3600)))
+YOUTUBE_CACHE_SIZE = int(os.getenv("YOUTUBE_CACHE_SIZE", "4096"))
+# 过期结果再保留这么久，接口出错、熔断或配额用完时拿来兜底
+YOUTUBE_STALE_SECONDS = int(os.getenv("YOUTUBE_STALE_SECONDS", str(7 * 24 * 3600)))
+# search.list 每次调用消耗 100 个配额单位，默认每天 10000 个
+SEARCH_QUOTA_UNITS = 100
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+# YouTube 配额在太平洋时间午夜重置
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+MAX_RESULTS_LIMIT = 50
+
+
+class YoutubeQuotaExceeded(RuntimeError):
+    pass
+
 
 class VideoSearchResult(BaseModel):
     title: str
     video_url: str
 
 
+def quota_day() -> str:
+    return datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+
+def _next_reset() -> float:
+    now = datetime.now(QUOTA_TIMEZONE)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return tomorrow.timestamp()
+
+
+class YoutubeSearchClient:
+    """YouTube video search with a keyword cache, singleflight and quota accounting.
+
+    Results are cached per normalized keyword together with the max_results
+    they were fetched with, so a cached search for 10 results also answers
+    a request for 3. Concurrent searches for the same keyword (e.g. the
+    research tasks of one company) wait for the call already in flight
+    instead of spending another 100 quota units each. Expired results are
+    kept for another `stale` seconds and served when the API fails.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, stale: float = 0):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl + stale)
+        self._lock = Lock()
+        self._inflight: Dict[str, Tuple[int, Future]] = {}
+        self._exhausted_until = 0.0
+        self.requests = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.stale_served = 0
+
+    def _charge(self, saved: bool):
+        context = usage.current()
+        usage.tracker.record_quota(context.job_id if context else None, "youtube", SEARCH_QUOTA_UNITS,
+                                   quota_day(), saved=saved)
+
+    def search(self, keyword: str, max_results: int = 10) -> List[dict]:
+        """Up to `max_results` videos for `keyword` as {"title", "video_url"} dicts."""
+        max_results = max(1, min(int(max_results), MAX_RESULTS_LIMIT))
+        key = normalize_query(keyword)
+        cached = None if bypassed() else self._cache.get(key, max_age=self.ttl)
+        # 结果数少于当时请求的数量说明已经没有更多结果
+        if cached is not None and (cached[0] >= max_results or len(cached[1]) < cached[0]):
+            self._charge(saved=True)
+            return cached[1][:max_results]
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            leader = pending is None or pending[0] < max_results
+            if leader:
+                future = Future()
+                self._inflight[key] = (max_results, future)
+        if not leader:
+            self.coalesced += 1
+            videos = pending[1].result()
+            self._charge(saved=True)
+            return videos[:max_results]
+
+        try:
+            videos = self._fetch(keyword, max_results)
+        except Exception as e:
+            stale = self._cache.get(key)
+            if stale is None:
+                future.set_exception(e)
+                raise
+            self.stale_served += 1
+            logger.warning(f"YouTube search for {keyword!r} failed, serving a stale result: {e}")
+            videos = stale[1]
+            future.set_result(videos)
+            return videos[:max_results]
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self._cache.set(key, (max_results, videos))
+            future.set_result(videos)
+            return videos
+        finally:
+            with self._lock:
+                if self._inflight.get(key, (0, None))[1] is future:
+                    del self._inflight[key]
+
+    def _fetch(self, keyword: str, max_results: int) -> List[dict]:
+        if time.time() < self._exhausted_until:
+            raise YoutubeQuotaExceeded("YouTube daily quota exhausted, try again after midnight Pacific Time")
+        params = {
+            "part": "snippet",
+            "q": keyword,
+            "maxResults": max_results,
+            "type": "video",
+            "key": os.getenv("YOUTUBE_API_KEY")
+        }
+        self.requests += 1
+        try:
+            response = get_session().get(YOUTUBE_SEARCH_URL, params=params, timeout=YOUTUBE_TIMEOUT)
+        except Exception:
+            self.errors += 1
+            raise
+        # 被拒绝的请求同样计入配额
+        self._charge(saved=False)
+        if response.status_code == 403 and self._quota_error(response):
+            self._exhausted_until = _next_reset()
+            self.errors += 1
+            logger.error("YouTube daily quota exhausted, skipping searches until it resets")
+            raise YoutubeQuotaExceeded("YouTube daily quota exhausted, try again after midnight Pacific Time")
+        if response.status_code != 200:
+            self.errors += 1
+        response.raise_for_status()
+        items = response.json().get("items", [])
+        return [{"title": item["snippet"]["title"],
+                 "video_url": f"https://www.youtube.com/watch?v={item['id']['videoId']}"}
+                for item in items]
+
+    @staticmethod
+    def _quota_error(response) -> bool:
+        try:
+            errors = response.json().get("error", {}).get("errors", [])
+        except ValueError:
+            return False
+        return any(error.get("reason") in ("quotaExceeded", "dailyLimitExceeded") for error in errors)
+
+    def stats(self) -> dict:
+        daily = usage.tracker.daily_quota("youtube")
+        return {
+            **self._cache.stats(),
+            "ttl": self.ttl,
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "stale_served": self.stale_served,
+            "inflight": len(self._inflight),
+            "quota_exhausted": time.time() < self._exhausted_until,
+            "daily_quota": YOUTUBE_DAILY_QUOTA,
+            "quota_used_today": daily["units"] if daily["day"] == quota_day() else 0,
+            "quota_saved_today": daily["saved_units"] if daily["day"] == quota_day() else 0,
+        }
+
+
+youtube = YoutubeSearchClient(ttl=YOUTUBE_CACHE_TTL, maxsize=YOUTUBE_CACHE_SIZE, stale=YOUTUBE_STALE_SECONDS)
+
+
 class YoutubeVideoSearchToolInput(BaseModel):
     """Input for YoutubeVideoSearchTool."""
     keyword: str = Field(..., description="The search keyword.")
@@ -23,27 +193,4 @@ class YoutubeVideoSearchTool(BaseTool):
     args_schema: Type[BaseModel] = YoutubeVideoSearchToolInput
 
     def _run(self, keyword: str, max_results: int = 10) -> List[VideoSearchResult]:
-        api_key = os.getenv("YOUTUBE_API_KEY")
-        url = "https://www.googleapis.com/youtube/v3/search"
-        params = {
-            "part": "snippet",
-            "q": keyword,
-            "maxResults": max_results,
-            "type": "video",
-            "key": api_key
-        }
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        items = response.json().get("items", [])
-
-        results = []
-        for item in items:
-            title = item["snippet"]["title"]
-            video_id = item["id"]["videoId"]
-            video_url = f"https://www.youtube.com/watch?v={video_id}"
-            results.append(VideoSearchResult(
-                title=title,
-                video_url=video_url,
-            ))
-
-        return results
+        return [VideoSearchResult(**video) for video in youtube.search(keyword, max_results)]
@@ -1,4 +1,5 @@
 from crewai import Agent
+from llm_registry import get_llm
 from langchain_community.llms import OpenAI
 from crewai_tools import WebsiteSearchTool
 from tools.browser_tools import BrowserTools
@@ -19,6 +20,7 @@ class TripAgents():
             BrowserTools.scrape_and_summarize_website,
             # WebsiteSearchTool()
         ],
+        llm=get_llm(),
         verbose=True)
 
   def local_expert(self):
@@ -32,6 +34,7 @@ class TripAgents():
             BrowserTools.scrape_and_summarize_website,
             # WebsiteSearchTool()
         ],
+        llm=get_llm(),
         verbose=True)
 
   def travel_concierge(self):
@@ -47,4 +50,5 @@ class TripAgents():
             CalculatorTools.calculate,
             # WebsiteSearchTool()
         ],
+        llm=get_llm(),
         verbose=True)
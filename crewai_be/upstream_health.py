@@ -0,0 +1,189 @@
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Callable, Dict, Optional
+
+import requests
+
+from rate_governor import governor
+from utils.logging import logger
+
+# 受熔断保护的工具上游（rate_governor 里的上游名）；LLM 不在其中
+BREAKER_UPSTREAMS = frozenset(os.getenv("BREAKER_UPSTREAMS", "serper,youtube,browserless,sec").split(","))
+# 连续失败这么多次后熔断，熔断期间直接失败，之后放一个探测请求
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+# 可以安全重复发送的上游：请求超过 p95 延迟仍未返回时再发一份，取先返回的。
+# YouTube 每次搜索都扣 100 个每日配额，对冲请求不计入配额统计，默认不对冲
+HEDGE_UPSTREAMS = frozenset(os.getenv("HEDGE_UPSTREAMS", "serper,sec").split(","))
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.2"))
+# 对冲请求最多占总请求数的比例，避免上游整体变慢时请求量翻倍
+HEDGE_MAX_FRACTION = float(os.getenv("HEDGE_MAX_FRACTION", "0.1"))
+LATENCY_WINDOW = 200
+
+Response = requests.Response
+
+
+def _percentile(ordered: list, percent: float) -> float:
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(len(ordered) * percent / 100) - 1))]
+
+
+class UpstreamUnavailable(requests.ConnectionError):
+    """Raised without sending when an upstream's circuit breaker is open."""
+
+
+class UpstreamHealth:
+    """Latency window and circuit breaker of one upstream.
+
+    The breaker opens after BREAKER_FAILURES consecutive failures (connection
+    errors, timeouts, 5xx), rejects calls for BREAKER_OPEN_SECONDS, then lets
+    a single probe through; its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = Lock()
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probing = False
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.opened = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.failures < BREAKER_FAILURES:
+                return True
+            if time.monotonic() >= self.opened_until and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, seconds: Optional[float], ok: bool):
+        with self._lock:
+            self.calls += 1
+            self._probing = False
+            if ok:
+                self.failures = 0
+                if seconds is not None:
+                    self._latencies.append(seconds)
+                return
+            self.errors += 1
+            self.failures += 1
+            if self.failures >= BREAKER_FAILURES:
+                if time.monotonic() >= self.opened_until:
+                    self.opened += 1
+                    logger.warning(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+                self.opened_until = time.monotonic() + BREAKER_OPEN_SECONDS
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a duplicate request is worth sending, or None when hedging is not allowed now."""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES or self.hedges >= self.calls * HEDGE_MAX_FRACTION:
+                return None
+            return max(HEDGE_MIN_DELAY, _percentile(sorted(self._latencies), HEDGE_PERCENTILE))
+
+    def stats(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._latencies)
+            return {
+                "state": ("closed" if self.failures < BREAKER_FAILURES
+                          else "open" if time.monotonic() < self.opened_until else "half-open"),
+                "consecutive_failures": self.failures,
+                "calls": self.calls,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "opened": self.opened,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "p50_seconds": round(_percentile(ordered, 50), 3) if ordered else None,
+                "p95_seconds": round(_percentile(ordered, 95), 3) if ordered else None,
+            }
+
+
+def _failed(response: Response) -> bool:
+    return response.status_code >= 500
+
+
+def _discard(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class HealthMonitor:
+    """Circuit breakers and hedged requests for the tool upstreams, mounted on utils.http's session."""
+
+    def __init__(self):
+        self._upstreams: Dict[str, UpstreamHealth] = {}
+        self._lock = Lock()
+        self._pool = ThreadPoolExecutor(max_workers=int(os.getenv("HEDGE_MAX_WORKERS", "32")),
+                                        thread_name_prefix="hedge")
+
+    def upstream(self, url: str) -> Optional[UpstreamHealth]:
+        upstream = governor.upstream_for(url)
+        if upstream is None or upstream.name not in BREAKER_UPSTREAMS:
+            return None
+        with self._lock:
+            if upstream.name not in self._upstreams:
+                self._upstreams[upstream.name] = UpstreamHealth(upstream.name)
+            return self._upstreams[upstream.name]
+
+    def call(self, url: str, send: Callable[[], Response]) -> Response:
+        health = self.upstream(url)
+        if health is None:
+            return send()
+        if not health.allow():
+            raise UpstreamUnavailable(f"{health.name} is failing, circuit breaker open")
+        delay = health.hedge_delay() if health.name in HEDGE_UPSTREAMS else None
+        started = time.monotonic()
+        try:
+            response = send() if delay is None else self._hedged(health, send, delay)
+        except requests.RequestException:
+            health.record(None, ok=False)
+            raise
+        health.record(time.monotonic() - started, ok=not _failed(response))
+        return response
+
+    def _hedged(self, health: UpstreamHealth, send: Callable[[], Response], delay: float) -> Response:
+        # 延迟导入：usage 间接依赖 utils.http
+        from usage import bind
+        send = bind(send)
+        primary = self._pool.submit(send)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        with health._lock:
+            health.hedges += 1
+        hedge = self._pool.submit(send)
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        winner = primary if primary in done else hedge
+        if winner.exception() is not None or _failed(winner.result()):
+            # 先返回的失败了，等另一份；都失败时按原请求的结果处理
+            wait([primary, hedge])
+            good = [future for future in (primary, hedge)
+                    if future.exception() is None and not _failed(future.result())]
+            winner = good[0] if good else primary
+        # 另一份请求返回后关闭连接
+        (hedge if winner is primary else primary).add_done_callback(_discard)
+        if winner is hedge:
+            with health._lock:
+                health.hedge_wins += 1
+        return winner.result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            upstreams = dict(self._upstreams)
+        return {name: health.stats() for name, health in upstreams.items()}
+
+
+upstream_health = HealthMonitor()
@@ -0,0 +1,412 @@
+import functools
+import os
+import time
+from threading import Lock, local
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from typing_extensions import override
+
+from job_manager import forward, forwardable
+from model_router import estimate_cost
+from tool_deadline import with_deadline
+from tool_memo import memoize
+from utils.cache import TTLCache
+
+# 任务用量在内存中保留的时间（秒）
+USAGE_TTL_SECONDS = int(os.getenv("USAGE_TTL_SECONDS", "86400"))
+
+_context = local()
+
+
+class JobContext(NamedTuple):
+    job_id: str
+    agent: str
+    task: str
+
+
+def current() -> Optional[JobContext]:
+    """The job/agent/task whose agent executor is running on this thread, if any."""
+    stack = getattr(_context, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def task_label(task) -> str:
+    if task is None:
+        return ''
+    lines = task.description.strip().splitlines()
+    return lines[0][:80] if lines else ''
+
+
+def _totals() -> Dict[str, float]:
+    return {
+        "runs": 0,
+        "seconds": 0.0,
+        "llm_calls": 0,
+        "cached_llm_calls": 0,
+        "llm_errors": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "llm_seconds": 0.0,
+        "cost_usd": 0.0,
+        "tool_calls": 0,
+        "tool_errors": 0,
+        "tool_seconds": 0.0,
+    }
+
+
+class JobUsage:
+    def __init__(self, crew: str):
+        self.crew = crew
+        self.started_at = time.time()
+        self.totals = _totals()
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.agents: Dict[str, Dict[str, float]] = {}
+        self.tools: Dict[str, Dict[str, float]] = {}
+        self.models: Dict[str, Dict[str, float]] = {}
+        self.quota: Dict[str, Dict[str, int]] = {}
+
+    def buckets(self, agent: str, task: str, model: Optional[str] = None) -> List[Dict[str, float]]:
+        if task not in self.tasks:
+            self.tasks[task] = {"task": task, "agent": agent, "model": model, **_totals()}
+        elif model and not self.tasks[task]["model"]:
+            self.tasks[task]["model"] = model
+        if agent not in self.agents:
+            self.agents[agent] = _totals()
+        return [self.totals, self.tasks[task], self.agents[agent]]
+
+    def to_dict(self) -> dict:
+        return {
+            "crew": self.crew,
+            "totals": _rounded(self.totals),
+            # 按耗时从高到低排列，最慢的阶段排在最前
+            "tasks": sorted((_rounded(task) for task in self.tasks.values()),
+                            key=lambda task: task["seconds"], reverse=True),
+            "agents": {agent: _rounded(totals) for agent, totals in self.agents.items()},
+            "tools": {tool: _rounded(totals) for tool, totals in self.tools.items()},
+            "models": {model: _rounded(totals) for model, totals in self.models.items()},
+            "quota": {api: dict(units) for api, units in self.quota.items()},
+        }
+
+
+def _quota_totals() -> Dict[str, int]:
+    return {"calls": 0, "units": 0, "saved_calls": 0, "saved_units": 0}
+
+
+def _rounded(totals: dict) -> dict:
+    return {key: round(value, 6 if key == "cost_usd" else 3) if isinstance(value, float) else value
+            for key, value in totals.items()}
+
+
+class UsageTracker:
+    """Per-job token and latency totals, broken down by task, agent and tool."""
+
+    def __init__(self, ttl: float):
+        self._jobs = TTLCache(maxsize=10000, ttl=ttl)
+        self._lock = Lock()
+        # api -> (配额日, 当日用量)；配额按上游自己的日期重置
+        self._daily_quota: Dict[str, Tuple[str, Dict[str, int]]] = {}
+
+    def start(self, job_id: str, crew: str):
+        if forward('usage.start', job_id, crew):
+            return
+        self._jobs.set(job_id, JobUsage(crew))
+
+    def _job(self, job_id: str) -> JobUsage:
+        usage = self._jobs.get(job_id)
+        if usage is None:
+            usage = JobUsage('')
+            self._jobs.set(job_id, usage)
+        return usage
+
+    def record_run(self, job_id: str, agent: str, task: str, seconds: float):
+        """One agent executor run, i.e. the wall time of a task."""
+        if forward('usage.record_run', job_id, agent, task, seconds):
+            return
+        with self._lock:
+            usage = self._job(job_id)
+            for bucket in usage.buckets(agent, task)[1:]:
+                bucket["runs"] += 1
+                bucket["seconds"] += seconds
+            usage.totals["runs"] += 1
+            # 异步任务并行执行，任务耗时之和大于整个任务的墙钟时间
+            usage.totals["seconds"] = time.time() - usage.started_at
+
+    def record_llm(self, job_id: str, agent: str, task: str, model: str, prompt_tokens: int,
+                   completion_tokens: int, seconds: float, cached: bool = False, error: bool = False):
+        if forward('usage.record_llm', job_id, agent, task, model, prompt_tokens, completion_tokens,
+                   seconds, cached, error):
+            return
+        cost = estimate_cost(model, prompt_tokens, completion_tokens) or 0.0
+        with self._lock:
+            usage = self._job(job_id)
+            if model not in usage.models:
+                usage.models[model] = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                       "llm_seconds": 0.0, "cost_usd": 0.0}
+            usage.models[model]["llm_calls"] += 1
+            usage.models[model]["prompt_tokens"] += prompt_tokens
+            usage.models[model]["completion_tokens"] += completion_tokens
+            usage.models[model]["llm_seconds"] += seconds
+            usage.models[model]["cost_usd"] += cost
+            for bucket in usage.buckets(agent, task, model):
+                bucket["llm_calls"] += 1
+                bucket["cached_llm_calls"] += int(cached)
+                bucket["llm_errors"] += int(error)
+                bucket["prompt_tokens"] += prompt_tokens
+                bucket["completion_tokens"] += completion_tokens
+                bucket["total_tokens"] += prompt_tokens + completion_tokens
+                bucket["llm_seconds"] += seconds
+                bucket["cost_usd"] += cost
+
+    def record_tool(self, job_id: str, agent: str, task: str, tool: str, seconds: float, error: bool = False):
+        if forward('usage.record_tool', job_id, agent, task, tool, seconds, error):
+            return
+        with self._lock:
+            usage = self._job(job_id)
+            if tool not in usage.tools:
+                usage.tools[tool] = {"calls": 0, "errors": 0, "seconds": 0.0}
+            usage.tools[tool]["calls"] += 1
+            usage.tools[tool]["errors"] += int(error)
+            usage.tools[tool]["seconds"] += seconds
+            for bucket in usage.buckets(agent, task):
+                bucket["tool_calls"] += 1
+                bucket["tool_errors"] += int(error)
+                bucket["tool_seconds"] += seconds
+
+    def record_quota(self, job_id: Optional[str], api: str, units: int, day: str, saved: bool = False):
+        """Quota `units` spent on (or, when `saved`, avoided by a cache hit for) one call to `api`.
+
+        `day` is the upstream's quota day; daily totals restart when it changes.
+        Calls made outside a job still count towards the daily totals.
+        """
+        if forward('usage.record_quota', job_id, api, units, day, saved):
+            return
+        prefix = "saved_" if saved else ""
+        with self._lock:
+            quota_day, daily = self._daily_quota.get(api, (day, _quota_totals()))
+            if quota_day != day:
+                daily = _quota_totals()
+            self._daily_quota[api] = (day, daily)
+            buckets = [daily]
+            if job_id is not None:
+                buckets.append(self._job(job_id).quota.setdefault(api, _quota_totals()))
+            for bucket in buckets:
+                bucket[prefix + "calls"] += 1
+                bucket[prefix + "units"] += units
+
+    def daily_quota(self, api: str) -> dict:
+        with self._lock:
+            day, daily = self._daily_quota.get(api, ('', _quota_totals()))
+            return {"day": day, **daily}
+
+    def get(self, job_id: str) -> Optional[dict]:
+        usage = self._jobs.get(job_id)
+        if usage is None:
+            return None
+        with self._lock:
+            return usage.to_dict()
+
+    def summary(self, job_id: str) -> Optional[dict]:
+        usage = self._jobs.get(job_id)
+        if usage is None:
+            return None
+        with self._lock:
+            return _rounded(usage.totals)
+
+
+tracker = UsageTracker(ttl=USAGE_TTL_SECONDS)
+forwardable('usage.start', tracker.start)
+forwardable('usage.record_run', tracker.record_run)
+forwardable('usage.record_llm', tracker.record_llm)
+forwardable('usage.record_tool', tracker.record_tool)
+forwardable('usage.record_quota', tracker.record_quota)
+
+
+class LLMUsageHandler(BaseCallbackHandler):
+    """Times LLM calls and charges them to the job/agent/task running on the calling thread."""
+
+    def __init__(self):
+        self._started: Dict[UUID, Tuple[float, str]] = {}
+
+    def _where(self) -> Optional[JobContext]:
+        return current()
+
+    def _start(self, run_id: UUID, kwargs: dict):
+        params = kwargs.get('invocation_params') or {}
+        self._started[run_id] = (time.perf_counter(), params.get('model_name') or params.get('model') or '')
+
+    def _stop(self, run_id: UUID) -> Tuple[float, str]:
+        started, model = self._started.pop(run_id, (time.perf_counter(), ''))
+        return time.perf_counter() - started, model
+
+    @override
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._start(run_id, kwargs)
+
+    @override
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._start(run_id, kwargs)
+
+    @override
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        seconds, model = self._stop(run_id)
+        where = self._where()
+        if where is None:
+            return
+        llm_output = response.llm_output or {}
+        token_usage = llm_output.get('token_usage') or {}
+        tracker.record_llm(
+            where.job_id, where.agent, where.task, llm_output.get('model_name') or model,
+            token_usage.get('prompt_tokens', 0), token_usage.get('completion_tokens', 0), seconds,
+            # 命中 LLM 缓存的调用没有 token_usage
+            cached=not token_usage,
+        )
+
+    @override
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        seconds, model = self._stop(run_id)
+        where = self._where()
+        if where is not None:
+            tracker.record_llm(where.job_id, where.agent, where.task, model, 0, 0, seconds, error=True)
+
+
+class UsageCallbackHandler(LLMUsageHandler):
+    """Attached to one agent of one job; times its LLM calls and marks the thread as running that job.
+
+    crewai runs async tasks in their own threads, so the job context is set
+    when the agent executor starts on whatever thread that is.
+    """
+
+    def __init__(self, job_id: str, agent):
+        super().__init__()
+        self.job_id = job_id
+        self.agent = agent
+        self._contexts: Dict[UUID, Tuple[JobContext, float]] = {}
+
+    def _task(self) -> str:
+        executor = self.agent.agent_executor
+        return task_label(getattr(executor, 'task', None))
+
+    def _where(self) -> JobContext:
+        context = current()
+        return JobContext(self.job_id, self.agent.role, context.task if context else self._task())
+
+    @override
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        if parent_run_id is not None:
+            return
+        context = JobContext(self.job_id, self.agent.role, self._task())
+        self._contexts[run_id] = (context, time.perf_counter())
+        if not hasattr(_context, 'stack'):
+            _context.stack = []
+        _context.stack.append(context)
+
+    def _end_chain(self, run_id: UUID):
+        entry = self._contexts.pop(run_id, None)
+        if entry is None:
+            return
+        context, started = entry
+        stack = getattr(_context, 'stack', None)
+        if stack and stack[-1] is context:
+            stack.pop()
+        tracker.record_run(context.job_id, context.agent, context.task, time.perf_counter() - started)
+
+    @override
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._end_chain(run_id)
+
+    @override
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs):
+        self._end_chain(run_id)
+
+
+def _timed(name: str, func):
+    if getattr(func, '_usage_timed', False):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        context = current()
+        started = time.perf_counter()
+        error = False
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            if context is not None:
+                tracker.record_tool(context.job_id, context.agent, context.task, name,
+                                    time.perf_counter() - started, error)
+
+    wrapper._usage_timed = True
+    return wrapper
+
+
+def instrument_tools(tools: Optional[List[Any]]) -> Optional[List[Any]]:
+    """Wrap tool functions with a timer that charges the job running on the calling thread.
+
+    Inside the timer, calls are held to tool_deadline's per-call deadline and
+    per-job budget, and repeated calls within the job are served from tool_memo.
+    crewai calls `tool._run` directly, bypassing langchain tool callbacks.
+    Shared langchain tools are wrapped in place once; crewai_tools tools are
+    converted to langchain tools first, the same way crewai does before running them.
+    """
+    if not tools:
+        return tools
+    instrumented = []
+    for tool in tools:
+        if hasattr(tool, 'to_langchain'):
+            tool = tool.to_langchain()
+        if getattr(tool, 'func', None) is not None:
+            tool.func = _timed(tool.name, with_deadline(tool.name, memoize(tool.name, tool.func)))
+        instrumented.append(tool)
+    return instrumented
+
+
+def _attach_handler(agent, handler: UsageCallbackHandler):
+    # Agent.callbacks 只作用于 agent executor 这一层（不会传给子运行），用来设置线程上的任务上下文；
+    # LLM 调用的回调挂在 agent 自己的 llm 副本上（见 llm_registry.PooledChatOpenAI）
+    agent.callbacks = [handler]
+    if hasattr(agent.llm, 'extra_callbacks'):
+        agent.llm.extra_callbacks = [handler]
+
+
+def attach(job_id: str, name: str, crew):
+    """Account every LLM and tool call made by `crew` to `job_id`; `name` identifies the kind of crew."""
+    tracker.start(job_id, name)
+    for agent in crew.agents:
+        _attach_handler(agent, UsageCallbackHandler(job_id, agent))
+        agent.tools = instrument_tools(agent.tools)
+    for task in crew.tasks:
+        task.tools = instrument_tools(task.tools)
+
+
+def bind(func):
+    """Wrap `func` to run on a worker thread as part of the job/agent/task active on this thread."""
+    context = current()
+    if context is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not hasattr(_context, 'stack'):
+            _context.stack = []
+        _context.stack.append(context)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _context.stack.pop()
+
+    return wrapper
+
+
+def track_llm(llm):
+    """Charge calls of an LLM used directly inside a tool to the job running on the calling thread."""
+    if hasattr(llm, 'extra_callbacks'):
+        llm.extra_callbacks = [LLMUsageHandler()]
+    return llm
+
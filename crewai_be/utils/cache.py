@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Hashable, Optional, Tuple
+
+_bypass: ContextVar[bool] = ContextVar("cache_bypass", default=False)
+
+
+@contextmanager
+def bypass():
+    """Skip reading the tool result caches for calls made inside this block; fresh results are still stored."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def bypassed() -> bool:
+    return _bypass.get()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time-to-live."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, float, Any]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_entry(self, key: Hashable, max_age: Optional[float] = None) -> Optional[Tuple[Any, float]]:
+        """Return `(value, stored_at)` or None if missing, expired or older than `max_age`."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, stored_at, value = entry
+                if expires_at <= now:
+                    del self._data[key]
+                elif max_age is None or now - stored_at <= max_age:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value, stored_at
+            self.misses += 1
+            return None
+
+    def get(self, key: Hashable, default: Any = None, max_age: Optional[float] = None) -> Any:
+        entry = self.get_entry(key, max_age)
+        return default if entry is None else entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, stored_at: Optional[float] = None):
+        stored_at = time.time() if stored_at is None else stored_at
+        expires_at = stored_at + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, stored_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,82 @@
+import os
+from threading import Lock
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_governor import estimate_tokens, governor
+from upstream_health import upstream_health
+
+# 每个上游主机保持的长连接数，应不小于同时运行的 crew 数 × 每个 crew 的并发请求数
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+# 调用方没有指定超时时使用，避免一个卡住的连接拖住整个 crew
+HTTP_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10")),
+                float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "60")))
+
+_lock = Lock()
+_session = None
+_httpx_client = None
+
+
+class GovernedAdapter(HTTPAdapter):
+    """HTTPAdapter that passes every request through the rate governor and the upstream's circuit breaker.
+
+    Requests without a timeout get HTTP_TIMEOUT.
+    """
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = HTTP_TIMEOUT
+        tokens = estimate_tokens(request.body)
+        return upstream_health.call(request.url, lambda: governor.call(
+            request.url, lambda: super(GovernedAdapter, self).send(request, **kwargs), tokens))
+
+
+class GovernedTransport(httpx.HTTPTransport):
+    """httpx transport that passes every request through the rate governor."""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            body = request.content
+        except httpx.RequestNotRead:
+            body = b''
+        return governor.call(str(request.url), lambda: super(GovernedTransport, self).handle_request(request),
+                             estimate_tokens(body))
+
+
+def get_session() -> requests.Session:
+    """Process-wide requests.Session with a keep-alive connection pool per host.
+
+    Session.request is safe to call from several crew threads at once as long
+    as nobody mutates the shared headers/cookies; pass per-call headers instead.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = GovernedAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def get_httpx_client() -> httpx.Client:
+    """Process-wide httpx.Client shared by the OpenAI clients in llm_registry."""
+    global _httpx_client
+    if _httpx_client is None:
+        with _lock:
+            if _httpx_client is None:
+                _httpx_client = httpx.Client(
+                    transport=GovernedTransport(limits=httpx.Limits(
+                        max_connections=HTTP_POOL_SIZE,
+                        max_keepalive_connections=HTTP_POOL_SIZE,
+                        keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+                    )),
+                    timeout=httpx.Timeout(600.0, connect=10.0),
+                    follow_redirects=True,
+                )
+    return _httpx_client